@@ -11,6 +11,9 @@ import time
 import ipaddress
 import logging
 
+import anyio
+from starlette.concurrency import run_in_threadpool
+
 from db.session import SessionLocal
 from db.models.api_key import APIKey, APIUsageLog, APIKeyWhitelist
 
@@ -176,62 +179,93 @@ async def verify_api_key(request: Request, call_next):
         start_time = time.time()
 
         # Process request
+        api_key_id = api_key_obj.id
         response = await call_next(request)
+        
+        async def body_then_log():
+            # Streamed responses are only complete once their body is sent,
+            # so usage (and TTFT) is logged after the last chunk
+            try:
+                async for chunk in body_iterator:
+                    yield chunk
+            finally:
+                with anyio.CancelScope(shield=True):
+                    await run_in_threadpool(
+                        _log_usage, api_key_id, request, response.status_code,
+                        response.headers.get("X-TTFT"), start_time
+                    )
+        
+        body_iterator = response.body_iterator
+        response.body_iterator = body_then_log()
+        
+        return response
 
-        # Calculate response time
-        response_time_ms = int((time.time() - start_time) * 1000)
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        # Don't fail the request if logging fails
+        return await call_next(request)
+    finally:
+        db.close()
 
-        # Extract TTFT from response headers if available
-        ttft_ms = None
-        if "X-TTFT" in response.headers:
-            try:
-                ttft_ms = int(response.headers["X-TTFT"])
-            except:
-                pass
-
-        # Determine error type
-        error_type = None
-        if response.status_code >= 400:
-            if response.status_code == 401:
-                error_type = "auth_error"
-            elif response.status_code == 429:
-                error_type = "rate_limit"
-            elif response.status_code >= 500:
-                error_type = "server_error"
-            else:
-                error_type = "client_error"
 
+def _log_usage(api_key_id: int, request: Request, status_code: int, ttft_header, start_time: float) -> None:
+    """Log one API key request and count it against the key's quota"""
+    # Calculate response time
+    response_time_ms = int((time.time() - start_time) * 1000)
+    
+    # Streaming endpoints measure TTFT themselves; others send it as X-TTFT
+    ttft_ms = getattr(request.state, "ttft_ms", None)
+    if ttft_ms is None and ttft_header:
+        try:
+            ttft_ms = int(ttft_header)
+        except ValueError:
+            pass
+    
+    # Determine error type
+    error_type = None
+    if status_code >= 400:
+        if status_code == 401:
+            error_type = "auth_error"
+        elif status_code == 429:
+            error_type = "rate_limit"
+        elif status_code >= 500:
+            error_type = "server_error"
+        else:
+            error_type = "client_error"
+    
+    db = SessionLocal()
+    try:
+        api_key_obj = db.query(APIKey).filter(APIKey.id == api_key_id).first()
+        if not api_key_obj:
+            return
+        
         # Log usage
         usage_log = APIUsageLog(
             api_key_id=api_key_obj.id,
             assistant_id=api_key_obj.assistant_id,
             endpoint=request.url.path,
             method=request.method,
-            status_code=response.status_code,
+            status_code=status_code,
             response_time_ms=response_time_ms,
             time_to_first_token_ms=ttft_ms,
             error_type=error_type,
-            ip_address=client_ip,
+            ip_address=request.client.host if request.client else None,
             user_agent=request.headers.get("User-Agent", "")
         )
-
         db.add(usage_log)
-
+        
         # Update API key usage and last used
         api_key_obj.last_used_at = datetime.utcnow()
         if api_key_obj.usage_quota:
             api_key_obj.current_usage += 1
-
+        
         db.commit()
-
-        return response
-
-    except HTTPException:
-        raise
     except Exception as e:
         db.rollback()
         # Don't fail the request if logging fails
-        return await call_next(request)
+        logger.error(f"[API Key Middleware] Failed to log usage: {e}")
     finally:
         db.close()
 
@@ -1,8 +1,8 @@
 import os
-import time
 from typing import Optional, List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from mlflow.types.chat import ChatMessage
 from sqlalchemy import func, or_
 from sqlalchemy.exc import SQLAlchemyError
@@ -18,7 +18,11 @@ from schemas.assistant import AssistantCreate, AssistantResponse, AssistantEndpo
 import mlflow
 
 from schemas.chat import ChatResponse, ChatRequest
+from core.chat_streaming import MEDIA_TYPES, STREAM_HEADERS, TokenStream, stream_format
+from core.timing import RequestTimer, latency_registry, ollama_ttft_ms
+from services.ollama_service import get_ollama_client
 from fastapi import BackgroundTasks
+from starlette.background import BackgroundTask
 from sqlalchemy import desc
 
 
@@ -442,59 +446,69 @@ def stop_assistant(assistant_id: int, token_info: dict = Depends(get_current_use
         raise HTTPException(status_code=500, detail=f"Failed to stop assistant: {str(e)}")
 
 
+def _get_chat_assistant(session, assistant_id: int, token_info: dict) -> Assistant:
+    """Assistant to chat with, after access and status checks"""
+    assistant = session.query(Assistant).filter_by(id=assistant_id).first()
+    if not assistant:
+        raise HTTPException(status_code=404, detail="Assistant not found")
+    
+    # Check access permissions
+    user_id = token_info.get('sub')
+    if not user_can_access_assistant(session, user_id, assistant, token_info):
+        raise HTTPException(status_code=403, detail="You don't have permission to access this assistant")
+
+    if assistant.status == 'initializing':
+        raise HTTPException(status_code=202, detail="Assistant is still initializing. Please try again later.")
+    
+    if assistant.status == 'failed':
+        raise HTTPException(status_code=500, detail="Assistant initialization failed")
+    return assistant
+
+
+def _ollama_options(request: ChatRequest) -> dict:
+    """Ollama generation options from the optional chat parameters"""
+    options = {}
+    if request.temperature is not None:
+        options["temperature"] = request.temperature
+    if request.max_tokens is not None:
+        options["num_predict"] = request.max_tokens
+    if request.top_p is not None:
+        options["top_p"] = request.top_p
+    return options
+
+
 @router.post("/{assistant_id}/chat/", response_model=ChatResponse)
-async def chat_with_assistant(assistant_id: int, request: ChatRequest, token_info: dict = Depends(get_current_user)):
+async def chat_with_assistant(
+    assistant_id: int,
+    request: ChatRequest,
+    response: Response,
+    token_info: dict = Depends(get_current_user)
+):
     """Chat with an assistant using Ollama directly."""
     import httpx
-    from core.config import settings
     
+    timer = RequestTimer()
     try:
         with SessionLocal() as session:
-            assistant = session.query(Assistant).filter_by(id=assistant_id).first()
-            if not assistant:
-                raise HTTPException(status_code=404, detail="Assistant not found")
-            
-            # Check access permissions
-            user_id = token_info.get('sub')
-            if not user_can_access_assistant(session, user_id, assistant, token_info):
-                raise HTTPException(status_code=403, detail="You don't have permission to access this assistant")
-
-            if assistant.status == 'initializing':
-                raise HTTPException(status_code=202, detail="Assistant is still initializing. Please try again later.")
-            
-            if assistant.status == 'failed':
-                raise HTTPException(status_code=500, detail="Assistant initialization failed")
+            with timer.span("metadata_lookup"):
+                assistant = _get_chat_assistant(session, assistant_id, token_info)
 
             try:
                 # Prepare messages for Ollama
                 messages = [{"role": m.role, "content": m.content} for m in request.messages]
                 
                 # Call Ollama directly
-                url = f"{settings.OLLAMA_HOST.rstrip('/')}/api/chat"
-                
-                payload = {
-                        "model": assistant.model,
-                    "messages": messages,
-                    "stream": False,
-                    "options": {}
-                }
-                
-                # Add optional parameters
-                if request.temperature is not None:
-                    payload["options"]["temperature"] = request.temperature
-                if request.max_tokens is not None:
-                    payload["options"]["num_predict"] = request.max_tokens
-                if request.top_p is not None:
-                    payload["options"]["top_p"] = request.top_p
-                
-                    start_time = time.time()
+                with timer.span("llm_generation"):
+                    result = await get_ollama_client().chat(assistant.model, messages, options=_ollama_options(request))
                 
-                async with httpx.AsyncClient(timeout=120.0) as client:
-                    response = await client.post(url, json=payload)
-                    response.raise_for_status()
-                    result = response.json()
-                
-                    duration = time.time() - start_time
+                ttft_ms = ollama_ttft_ms(result)
+                if ttft_ms is not None:
+                    timer.record("llm_ttft", ttft_ms)
+                    # Model-side TTFT; the API key middleware logs it with the usage
+                    response.headers["X-TTFT"] = str(round(ttft_ms))
+                timer.finish()
+                response.headers["Server-Timing"] = timer.server_timing_header()
+                latency_registry.observe(timer, model=assistant.model)
 
                 # Extract the response content
                 response_content = result.get("message", {}).get("content", "")
@@ -518,3 +532,67 @@ async def chat_with_assistant(assistant_id: int, request: ChatRequest, token_inf
 
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@router.post("/{assistant_id}/chat/stream/")
+async def stream_chat_with_assistant(
+    assistant_id: int,
+    request: ChatRequest,
+    http_request: Request,
+    format: Optional[str] = None,
+    token_info: dict = Depends(get_current_user)
+):
+    """
+    Chat with an assistant, relaying tokens as Ollama generates them.
+
+    Responds with Server-Sent Events, or NDJSON with format=ndjson (or
+    Accept: application/x-ndjson). Events are token, done (with ttft_ms and
+    response_time_ms) and error.
+    """
+    import httpx
+    
+    timer = RequestTimer()
+    try:
+        fmt = stream_format(format, http_request.headers.get("accept"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        with SessionLocal() as session:
+            with timer.span("metadata_lookup"):
+                assistant = _get_chat_assistant(session, assistant_id, token_info)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    
+    def first_token(ttft_ms: float) -> None:
+        # Read by the API key middleware once the stream is complete
+        http_request.state.ttft_ms = round(ttft_ms)
+    
+    messages = [{"role": m.role, "content": m.content} for m in request.messages]
+    token_stream = TokenStream(
+        get_ollama_client().stream_chat(assistant.model, messages, options=_ollama_options(request)),
+        fmt,
+        started=timer.start_time,
+        on_first_token=first_token
+    )
+    try:
+        await token_stream.start()
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to communicate with model: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to process chat: {str(e)}")
+    
+    def record_latency() -> None:
+        if token_stream.response_time_ms is not None:
+            timer.record("llm_generation", token_stream.response_time_ms - timer.spans.get("metadata_lookup", 0.0))
+        if token_stream.ttft_ms is not None:
+            timer.record("llm_ttft", token_stream.ttft_ms)
+        timer.finish()
+        latency_registry.observe(timer, model=assistant.model)
+    
+    return StreamingResponse(
+        token_stream,
+        media_type=MEDIA_TYPES[fmt],
+        headers=STREAM_HEADERS,
+        background=BackgroundTask(record_latency)
+    )
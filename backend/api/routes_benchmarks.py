@@ -7,12 +7,12 @@ import random
 import threading
 from datetime import datetime
 
-import requests
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.exc import SQLAlchemyError
 from datasets import load_dataset
 
 from api.deps import get_current_user
+from services.ollama_service import get_ollama_client
 from schemas.benchmark import (
     BenchmarkDataset,
     BenchmarkRunRequest,
@@ -139,14 +139,10 @@ def _build_prompt(model: str, val_rows: list[dict], ex: dict) -> tuple[str, list
         return prompt, stop
 
 def _ollama_chat(model: str, prompt: str, stop: list[str] = None) -> str:
-    url = f"{OLLAMA_HOST}/api/chat"
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "user", "content": prompt},
-        ],
-        "stream": False,
-    }
+    url = f"{OLLAMA_HOST.rstrip('/')}/api/chat"
+    messages = [
+        {"role": "user", "content": prompt},
+    ]
     # Deterministic, constrained decoding; allow caller stop sequences
     opts = {
         "temperature": 0.0,
@@ -159,11 +155,9 @@ def _ollama_chat(model: str, prompt: str, stop: list[str] = None) -> str:
         opts["num_predict"] = MAX_NEW_TOKENS
     if stop:
         opts["stop"] = stop
-    payload["options"] = opts
     try:
-        r = requests.post(url, json=payload, timeout=60)
-        r.raise_for_status()
-        data = r.json()
+        # Shared keep-alive pool; runs on the benchmark worker thread
+        data = get_ollama_client().chat_sync(model, messages, options=opts, timeout=60, url=url)
         # ollama chat returns {'message': {'content': ...}, ...}
         msg = data.get("message", {})
         return msg.get("content", "")
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List, Optional
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Response
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 from db.session import SessionLocal
 from core.config import settings
 from core.embeddings import EmbeddingService
+from core.embedding_store import PartitionedEmbeddingStore, RESULT_COLUMNS, resolve_embeddings_location
+from core.timing import RequestTimer, latency_registry
+from core.retrieval import neighbor_chunk_indexes, merge_contiguous_chunks
+import json
 import logging
 import psycopg2
 from psycopg2.extras import RealDictCursor
@@ -20,6 +24,12 @@ class RAGChatRequest(BaseModel):
     collection_id: int
     messages: List[ChatMessage]
     model: str = "mistral:7b"
+    top_k: int = Field(default=3, ge=1, le=50)
+    # Document collections only: also fetch the ±N chunks around every hit
+    neighbor_chunks: int = Field(default=0, ge=0, le=10)
+    # Document collections only: only search chunks whose metadata contains
+    # these keys, e.g. {"section": "Installation"} or {"page_start": 3}
+    metadata_filter: Optional[Dict[str, Any]] = None
 
 def get_connection(use_timescale=False):
     """Get a database connection"""
@@ -47,16 +57,47 @@ def get_connection(use_timescale=False):
         )
     return conn
 
-def retrieve_relevant_documents(query: str, collection_id: int, top_k: int = 3) -> List[dict]:
-    """Retrieve relevant documents from the specified collection"""
+def _has_chunk_index(results: List[dict]) -> bool:
+    """Whether search results come from a document collection"""
+    return bool(results) and results[0].get('chunk_index') is not None
+
+
+def _expand_neighbors(cur, neighbor_sql: str, params: tuple, hits: List[dict], window: int, timer: RequestTimer, transform=dict) -> List[dict]:
+    """Fetch the neighbors of all hits in one indexed query and merge contiguous chunks"""
+    hit_indexes = [hit['chunk_index'] for hit in hits]
+    with timer.span("neighbor_expansion"):
+        cur.execute(neighbor_sql, params + (neighbor_chunk_indexes(hit_indexes, window),))
+        rows = [transform(dict(row)) for row in cur.fetchall()]
+        return merge_contiguous_chunks(rows, hit_indexes)
+
+
+def retrieve_relevant_documents(
+    query: str,
+    collection_id: int,
+    top_k: int = 3,
+    timer: Optional[RequestTimer] = None,
+    neighbor_chunks: int = 0,
+    metadata_filter: Optional[Dict[str, Any]] = None
+) -> List[dict]:
+    """
+    Retrieve relevant documents from the specified collection.
+    
+    For document collections, neighbor_chunks > 0 expands every hit with its
+    ±neighbor_chunks surrounding chunks and merges contiguous chunks into one span,
+    and metadata_filter restricts the search to chunks whose metadata contains it
+    (JSONB containment, served by the metadata GIN index).
+    """
+    timer = timer or RequestTimer()
+    
     # First get collection metadata from main PostgreSQL
-    meta_conn = get_connection(use_timescale=False)
+    with timer.span("db_connect"):
+        meta_conn = get_connection(use_timescale=False)
     embedding_model_name = "nomic-embed-text"  # Default fallback
     try:
-        with meta_conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with timer.span("metadata_lookup"), meta_conn.cursor(cursor_factory=RealDictCursor) as cur:
             # Get the collection info and embedding model
             cur.execute("""
-                SELECT dc.file_path, m.name as embedding_model_name
+                SELECT dc.file_path, dc.content_type, dc.embeddings_metadata, m.name as embedding_model_name
                 FROM data_collections dc
                 LEFT JOIN models m ON dc.embedding_model_id = m.id
                 WHERE dc.id = %s AND dc.embeddings_status = 'completed'
@@ -66,55 +107,102 @@ def retrieve_relevant_documents(query: str, collection_id: int, top_k: int = 3)
             if not result:
                 raise HTTPException(status_code=404, detail="Collection not found or embeddings not ready")
             
+            location = resolve_embeddings_location(collection_id, result.get('embeddings_metadata'))
+            # Tabular rows carry no chunk metadata; the partitioned table has the column regardless
+            if metadata_filter and location.is_partitioned and result.get('content_type') != 'document':
+                raise HTTPException(status_code=400, detail="Collection has no chunk metadata to filter on")
+            
             # Get the embedding model name if available
             if result.get('embedding_model_name'):
                 embedding_model_name = result['embedding_model_name']
-            else:
-                # Try to get from embeddings_metadata
-                cur.execute("""
-                    SELECT embeddings_metadata->>'embedding_model' as embedding_model_name
-                    FROM data_collections
-                    WHERE id = %s
-                """, (collection_id,))
-                metadata_result = cur.fetchone()
-                if metadata_result and metadata_result.get('embedding_model_name'):
-                    embedding_model_name = metadata_result['embedding_model_name']
+            elif (result.get('embeddings_metadata') or {}).get('embedding_model'):
+                embedding_model_name = result['embeddings_metadata']['embedding_model']
     finally:
         meta_conn.close()
     
     # Now query embeddings from TimescaleDB
-    table_name = f"embeddings_collection_{collection_id}"
-    conn = get_connection(use_timescale=True)
+    table_name = location.table_name
+    with timer.span("db_connect"):
+        conn = get_connection(use_timescale=True)
     try:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            # Embed the query on its own so embedding and scan time are measured separately
+            with timer.span("query_embedding"):
+                cur.execute(
+                    "SELECT ai.ollama_embed(%s, %s, host => %s)::text AS embedding",
+                    (embedding_model_name, query, settings.OLLAMA_HOST)
+                )
+                query_embedding = cur.fetchone()['embedding']
+            
+            metadata_clause = " AND t.metadata @> %s::jsonb" if metadata_filter else ""
+            filter_params = (json.dumps(metadata_filter),) if metadata_filter else ()
+            
+            if location.is_partitioned:
+                # Partition pruning on collection_id keeps the scan on one partition
+                search_sql = f"""
+                    SELECT {', '.join(f't.{col}' for col in RESULT_COLUMNS)}
+                    FROM {table_name} t
+                    WHERE t.collection_id = %s AND t.embedding IS NOT NULL{metadata_clause}
+                    ORDER BY t.embedding <=> %s::vector
+                    LIMIT %s
+                """
+                with timer.span("vector_search"):
+                    cur.execute(search_sql, (location.collection_id, *filter_params, query_embedding, top_k))
+                    results = [PartitionedEmbeddingStore.flatten_row(dict(row)) for row in cur.fetchall()]
+                
+                if neighbor_chunks and _has_chunk_index(results):
+                    neighbor_sql = f"""
+                        SELECT {', '.join(f't.{col}' for col in RESULT_COLUMNS)}
+                        FROM {table_name} t
+                        WHERE t.collection_id = %s AND t.chunk_index = ANY(%s)
+                        ORDER BY t.chunk_index
+                    """
+                    return _expand_neighbors(
+                        cur, neighbor_sql, (location.collection_id,), results, neighbor_chunks, timer,
+                        transform=PartitionedEmbeddingStore.flatten_row
+                    )
+                return results
+            
             # Get the column names for the table
-            cur.execute("""
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_name = %s 
-                AND column_name NOT IN ('id', 'embedding', 'created_at')
-            """, (table_name,))
+            with timer.span("metadata_lookup"):
+                cur.execute("""
+                    SELECT column_name 
+                    FROM information_schema.columns 
+                    WHERE table_name = %s 
+                    AND column_name NOT IN ('id', 'embedding', 'duplicate_of', 'created_at')
+                """, (table_name,))
+                columns = [row['column_name'] for row in cur.fetchall()]
             
-            columns = [row['column_name'] for row in cur.fetchall()]
             if not columns:
                 raise HTTPException(status_code=400, detail="No queryable columns found in collection")
+            if metadata_filter and 'metadata' not in columns:
+                raise HTTPException(status_code=400, detail="Collection has no chunk metadata to filter on")
             
-            # Create a query that searches the embeddings using the same model
+            # Search the embeddings with the query vector produced by the same model
             search_sql = f"""
-                WITH query_embedding AS (
-                    SELECT ai.ollama_embed(%s, %s, host => %s) AS embedding
-                )
                 SELECT {', '.join(f't."{col}"' for col in columns)}
-                FROM {table_name} t, query_embedding
-                ORDER BY t.embedding <=> query_embedding.embedding
+                FROM {table_name} t
+                WHERE t.embedding IS NOT NULL{metadata_clause}
+                ORDER BY t.embedding <=> %s::vector
                 LIMIT %s
             """
             
-            cur.execute(search_sql, (embedding_model_name, query, settings.OLLAMA_HOST, top_k))
-            results = cur.fetchall()
+            with timer.span("vector_search"):
+                cur.execute(search_sql, (*filter_params, query_embedding, top_k))
+                # Convert results to a list of dictionaries
+                results = [dict(row) for row in cur.fetchall()]
             
-            # Convert results to a list of dictionaries
-            return [dict(row) for row in results]
+            if neighbor_chunks and _has_chunk_index(results):
+                neighbor_sql = f"""
+                    SELECT {', '.join(f't."{col}"' for col in columns)}
+                    FROM {table_name} t
+                    WHERE t.chunk_index = ANY(%s)
+                    ORDER BY t.chunk_index
+                """
+                return _expand_neighbors(cur, neighbor_sql, (), results, neighbor_chunks, timer)
+            return results
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error retrieving documents: {str(e)}")
         raise HTTPException(status_code=500, detail="Error retrieving documents")
@@ -122,7 +210,8 @@ def retrieve_relevant_documents(query: str, collection_id: int, top_k: int = 3)
         conn.close()
 
 @router.post("/rag/")
-async def rag_chat(request: RAGChatRequest):
+async def rag_chat(request: RAGChatRequest, response: Response):
+    timer = RequestTimer()
     db = SessionLocal()
     try:
         """
@@ -139,24 +228,29 @@ async def rag_chat(request: RAGChatRequest):
         # Retrieve relevant documents
         relevant_docs = retrieve_relevant_documents(
             query=user_message.content,
-            collection_id=request.collection_id
+            collection_id=request.collection_id,
+            top_k=request.top_k,
+            timer=timer,
+            neighbor_chunks=request.neighbor_chunks,
+            metadata_filter=request.metadata_filter
         )
         
-        # Format the context from relevant documents
-        context = "\n\n".join([
-            "\n".join([f"{k}: {v}" for k, v in doc.items() if v is not None])
-            for doc in relevant_docs
-        ])
-        
-        # Prepare the prompt with context
-        system_prompt = f"""You are a helpful assistant that answers questions based on the provided context.
-        If you don't know the answer, just say that you don't know, don't try to make up an answer.
-        
-        Context:
-        {context}
-        
-        Question: {user_message.content}
-        Answer:"""
+        with timer.span("context_assembly"):
+            # Format the context from relevant documents
+            context = "\n\n".join([
+                "\n".join([f"{k}: {v}" for k, v in doc.items() if v is not None])
+                for doc in relevant_docs
+            ])
+            
+            # Prepare the prompt with context
+            system_prompt = f"""You are a helpful assistant that answers questions based on the provided context.
+            If you don't know the answer, just say that you don't know, don't try to make up an answer.
+            
+            Context:
+            {context}
+            
+            Question: {user_message.content}
+            Answer:"""
         
         # Initialize the embedding service with TimescaleDB for embeddings
         embedding_service = EmbeddingService(
@@ -171,17 +265,22 @@ async def rag_chat(request: RAGChatRequest):
         ]
         
         # Generate the response using the model
-        response = await embedding_service.generate_response(
+        answer = await embedding_service.generate_response(
             messages=messages,
-            model=request.model
+            model=request.model,
+            timer=timer
         )
         
+        timer.finish()
+        response.headers["Server-Timing"] = timer.server_timing_header()
+        latency_registry.observe(timer, collection_id=request.collection_id, model=request.model)
+        
         # Format the response to match the expected format
         return {
             "choices": [{
                 "message": {
                     "role": "assistant",
-                    "content": response
+                    "content": answer
                 }
             }]
         }
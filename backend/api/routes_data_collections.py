@@ -1,11 +1,11 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, status, Response, BackgroundTasks, Form, Depends, Request
 from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 from typing import List, Optional
 import os
-import pandas as pd
-import json
 import uuid
 import logging
 import mimetypes
@@ -16,8 +16,20 @@ from db.models.model import Model
 from db.models.group import GroupMember
 from tasks.embedding_tasks import process_embeddings_task
 from core.text_chunking import TextChunker, ChunkingMethod
-from core.document_parser import DocumentParser
-from api.deps import get_current_user, is_platform_admin
+from core.document_cache import get_document_chunks
+from core.tabular_reader import TabularReader
+from core.config import settings
+from core.garbage_collector import CollectionState, GarbageCollector
+from core.uploads import (
+    ChecksumMismatch,
+    UploadSessionError,
+    UploadSessionNotFound,
+    UploadSessionStore,
+    UploadTooLarge,
+    parse_content_range,
+    save_upload,
+)
+from api.deps import get_current_user, is_platform_admin, require_platform_admin
 
 logger = logging.getLogger(__name__)
 
@@ -27,10 +39,44 @@ router = APIRouter()
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Resumable uploads write their parts straight into UPLOAD_DIR
+upload_sessions = UploadSessionStore(UPLOAD_DIR)
+
+
+def _collection_states() -> List[CollectionState]:
+    with SessionLocal() as db:
+        rows = db.query(
+            DataCollection.id,
+            DataCollection.file_path,
+            DataCollection.embeddings_status,
+            DataCollection.embeddings_metadata,
+            DataCollection.updated_at
+        ).all()
+    return [
+        CollectionState(
+            id=row.id,
+            file_path=row.file_path,
+            embeddings_status=row.embeddings_status,
+            embeddings_metadata=row.embeddings_metadata,
+            updated_at=row.updated_at.timestamp() if row.updated_at else None
+        )
+        for row in rows
+    ]
+
+
+# Removes embeddings, fingerprints and files left by deleted collections and failed uploads;
+# swept periodically from the app lifespan and on demand by admins
+garbage_collector = GarbageCollector(
+    db_url=settings.TIMESCALE_DATABASE_URL,
+    upload_dir=UPLOAD_DIR,
+    load_collections=_collection_states,
+    session_store=upload_sessions
+)
+
 # Tabular file extensions
-TABULAR_EXTENSIONS = {"csv", "xlsx"}
+TABULAR_EXTENSIONS = {"csv", "xlsx", "jsonl", "parquet"}
 # Document file extensions
-DOCUMENT_EXTENSIONS = {"txt", "pdf", "docx"}
+DOCUMENT_EXTENSIONS = {"txt", "pdf", "docx", "html", "htm", "md", "markdown"}
 # All allowed extensions
 ALLOWED_EXTENSIONS = TABULAR_EXTENSIONS | DOCUMENT_EXTENSIONS
 
@@ -38,14 +84,14 @@ def allowed_file(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 def is_document_file(filename: str) -> bool:
-    """Check if file is a document type (txt, pdf, docx)"""
+    """Check if file is a document type (txt, pdf, docx, html, md)"""
     if "." not in filename:
         return False
     ext = filename.rsplit(".", 1)[1].lower()
     return ext in DOCUMENT_EXTENSIONS
 
 def is_tabular_file(filename: str) -> bool:
-    """Check if file is a tabular type (csv, xlsx)"""
+    """Check if file is a tabular type (csv, xlsx, jsonl, parquet)"""
     if "." not in filename:
         return False
     ext = filename.rsplit(".", 1)[1].lower()
@@ -76,10 +122,14 @@ async def upload_file(
     - embedding_model_id: ID of the embedding model to use (optional, defaults to nomic-embed-text)
     - group_id: Optional group ID to associate this collection with a group
     
-    For document files (txt, pdf, docx), you can also specify:
-    - chunking_method: 'fixed_size', 'sentence', 'paragraph', 'semantic', 'recursive'
-    - chunk_size: Size of each chunk (for fixed_size and recursive methods)
-    - chunk_overlap: Overlap between chunks
+    For document files (txt, pdf, docx, html, md), you can also specify:
+    - chunking_method: 'fixed_size', 'sentence', 'paragraph', 'semantic', 'recursive', 'token', 'embedding_semantic'
+    - chunk_size: Size of each chunk (characters; tokens for the token method)
+    - chunk_overlap: Overlap between chunks (characters; tokens for the token method)
+    
+    Returns as soon as the file is on disk, with embeddings_status
+    'pending_analysis'. Parsing, chunking and counting rows run in the
+    background before the embeddings are computed.
     """
     user_id = token_info.get('sub')
     
@@ -93,91 +143,37 @@ async def upload_file(
             )
 
         # Validate embedding_model_id if provided
-        if embedding_model_id is not None:
-            model = db.query(Model).filter(Model.id == embedding_model_id).first()
-            if not model:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Embedding model with ID {embedding_model_id} not found"
-                )
-            # Check if the model is actually an embedding model
-            if model.family and model.family.tags and 'embedding' not in model.family.tags.lower():
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Model {model.name} is not an embedding model"
-                )
+        embedding_model_name = _resolve_embedding_model(db, embedding_model_id)
 
         # Generate a unique filename
         file_ext = file.filename.rsplit(".", 1)[1].lower()
         unique_filename = f"{uuid.uuid4()}.{file_ext}"
         file_path = os.path.join(UPLOAD_DIR, unique_filename)
 
-        # Ensure upload directory exists
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-
-        # Save the file
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-
+        # Stream the file to disk in blocks, hashing it and enforcing the size limit
         try:
-            # Determine if this is a document or tabular file
-            if is_document_file(file.filename):
-                # Process document file
-                collection = await _process_document_upload(
-                    db=db,
-                    file_path=file_path,
-                    file_ext=file_ext,
-                    original_filename=file.filename,
-                    chunking_method=chunking_method,
-                    chunk_size=chunk_size,
-                    chunk_overlap=chunk_overlap,
-                    embedding_model_id=embedding_model_id,
-                    owner_id=user_id,
-                    group_id=group_id
-                )
-            else:
-                # Process tabular file (csv, xlsx)
-                collection = await _process_tabular_upload(
-                    db=db,
-                    file_path=file_path,
-                    file_ext=file_ext,
-                    original_filename=file.filename,
-                    embedding_model_id=embedding_model_id,
-                    owner_id=user_id,
-                    group_id=group_id
-                )
-
-            # Start background task for embeddings
-            background_tasks.add_task(
-                process_embeddings_task,
-                collection_id=collection.id
-            )
-
-            return {
-                "id": collection.id,
-                "name": collection.name,
-                "file_type": collection.file_type,
-                "content_type": collection.content_type,
-                "row_count": collection.row_count,
-                "chunking_method": collection.chunking_method,
-                "document_metadata": collection.document_metadata,
-                "created_at": collection.created_at.isoformat() if collection.created_at else None,
-                "embeddings_status": collection.embeddings_status,
-                "message": "File uploaded successfully. Embedding process has started in the background."
-            }
-
-        except Exception as e:
-            # Clean up the uploaded file if there was an error
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            logger.error(f"Error processing file: {str(e)}")
-            db.rollback()
-            db.close()
+            stored = await save_upload(file, file_path)
+        except UploadTooLarge as e:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error processing file: {str(e)}"
+                status_code=413,
+                detail=str(e)
             )
+        logger.info(f"Received {file.filename}: {stored.size} bytes, sha256 {stored.sha256}")
+
+        return await _register_upload(
+            db=db,
+            background_tasks=background_tasks,
+            file_path=file_path,
+            original_filename=file.filename,
+            embedding_model_id=embedding_model_id,
+            embedding_model_name=embedding_model_name,
+            chunking_method=chunking_method,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            owner_id=user_id,
+            group_id=group_id,
+            content_hash=stored.sha256
+        )
 
     except HTTPException:
         db.close()
@@ -191,6 +187,335 @@ async def upload_file(
         )
 
 
+class CreateUploadRequest(BaseModel):
+    filename: str
+    size: int = Field(gt=0)
+    # Optional SHA-256 (hex) of the whole file, verified on finalize
+    sha256: Optional[str] = None
+    embedding_model_id: Optional[int] = None
+    chunking_method: Optional[str] = None
+    chunk_size: Optional[int] = None
+    chunk_overlap: Optional[int] = None
+    group_id: Optional[int] = None
+
+
+def _get_upload_session(upload_id: str, user_id: Optional[str]):
+    """The caller's upload session, 404 for unknown ids and other users' sessions"""
+    try:
+        session = upload_sessions.get(upload_id)
+    except UploadSessionNotFound:
+        session = None
+    if session is None or session.owner_id != user_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+    return session
+
+
+@router.post("/uploads/")
+def create_resumable_upload(
+    body: CreateUploadRequest,
+    token_info: dict = Depends(get_current_user)
+):
+    """
+    Start a resumable upload.
+    
+    Send the file as byte ranges with PUT /uploads/{upload_id} (any order,
+    any size, optionally in parallel), then POST /uploads/{upload_id}/complete.
+    After a dropped connection, GET /uploads/{upload_id} lists the ranges
+    still missing.
+    """
+    if not allowed_file(body.filename):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid file type. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+    valid_methods = [m.value for m in ChunkingMethod]
+    if body.chunking_method and body.chunking_method not in valid_methods:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid chunking method. Valid options: {', '.join(valid_methods)}"
+        )
+    with SessionLocal() as db:
+        _resolve_embedding_model(db, body.embedding_model_id)
+
+    try:
+        session = upload_sessions.create(
+            body.filename,
+            body.size,
+            owner_id=token_info.get('sub'),
+            options=body.model_dump(exclude={'filename', 'size', 'sha256'}),
+            sha256=body.sha256
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UploadSessionError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return session.to_dict()
+
+
+@router.get("/uploads/{upload_id}")
+def get_resumable_upload(upload_id: str, token_info: dict = Depends(get_current_user)):
+    """Progress of a resumable upload: received and missing byte ranges"""
+    return _get_upload_session(upload_id, token_info.get('sub')).to_dict()
+
+
+@router.put("/uploads/{upload_id}")
+async def upload_part(
+    upload_id: str,
+    request: Request,
+    token_info: dict = Depends(get_current_user)
+):
+    """
+    Write one byte range of a resumable upload.
+    
+    The body is the raw bytes, with a 'Content-Range: bytes first-last/total'
+    header. An optional 'X-Content-SHA256' header (hex) is checked against
+    the body; on a mismatch the range is not recorded and can be resent.
+    """
+    session = _get_upload_session(upload_id, token_info.get('sub'))
+    try:
+        start, end, total = parse_content_range(request.headers.get('content-range'))
+        if total is not None and total != session.total_size:
+            raise UploadSessionError(f"Content-Range total {total} does not match the upload size {session.total_size}")
+        session = await upload_sessions.write_part(
+            upload_id, start, end, request.stream(),
+            sha256=request.headers.get('x-content-sha256')
+        )
+    except UploadSessionNotFound:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+    except ChecksumMismatch as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except UploadSessionError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return session.to_dict()
+
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_resumable_upload(
+    upload_id: str,
+    background_tasks: BackgroundTasks,
+    token_info: dict = Depends(get_current_user)
+):
+    """
+    Finish a resumable upload and create its collection.
+    
+    The assembled file is renamed into the uploads directory (not copied)
+    and goes through the same background analysis and embedding as
+    POST /upload/.
+    """
+    user_id = token_info.get('sub')
+    _get_upload_session(upload_id, user_id)
+    try:
+        session, stored = await run_in_threadpool(upload_sessions.finalize, upload_id)
+    except UploadSessionNotFound:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+    except ChecksumMismatch as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except UploadSessionError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    logger.info(f"Received {session.filename}: {stored.size} bytes, sha256 {stored.sha256}")
+
+    options = session.options
+    db = SessionLocal()
+    try:
+        embedding_model_name = _resolve_embedding_model(db, options.get('embedding_model_id'))
+        return await _register_upload(
+            db=db,
+            background_tasks=background_tasks,
+            file_path=stored.path,
+            original_filename=session.filename,
+            embedding_model_id=options.get('embedding_model_id'),
+            embedding_model_name=embedding_model_name,
+            chunking_method=options.get('chunking_method'),
+            chunk_size=options.get('chunk_size'),
+            chunk_overlap=options.get('chunk_overlap'),
+            owner_id=user_id,
+            group_id=options.get('group_id'),
+            content_hash=stored.sha256
+        )
+    except HTTPException:
+        db.close()
+        raise
+
+
+@router.delete("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+def abort_resumable_upload(upload_id: str, token_info: dict = Depends(get_current_user)):
+    """Cancel a resumable upload and delete what was received"""
+    _get_upload_session(upload_id, token_info.get('sub'))
+    try:
+        upload_sessions.abort(upload_id)
+    except UploadSessionNotFound:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.get("/gc/", dependencies=[Depends(require_platform_admin)])
+def get_garbage_collection_report():
+    """Report of the last garbage collection sweep"""
+    report = garbage_collector.last_report
+    return {"report": report.to_dict() if report else None}
+
+
+@router.post("/gc/", dependencies=[Depends(require_platform_admin)])
+async def run_garbage_collection(dry_run: bool = False):
+    """
+    Sweep orphaned embeddings tables, fingerprints, upload sessions and files now.
+
+    With dry_run=true nothing is removed and the report lists what would be reclaimed.
+    """
+    report = await run_in_threadpool(garbage_collector.sweep, dry_run)
+    if report.skipped:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=report.skipped)
+    return report.to_dict()
+
+
+def _resolve_embedding_model(db, embedding_model_id: Optional[int]) -> str:
+    """Name of the embedding model to use, validating embedding_model_id if given"""
+    if embedding_model_id is None:
+        return "nomic-embed-text"
+    model = db.query(Model).filter(Model.id == embedding_model_id).first()
+    if not model:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Embedding model with ID {embedding_model_id} not found"
+        )
+    # Check if the model is actually an embedding model
+    if model.family and model.family.tags and 'embedding' not in model.family.tags.lower():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Model {model.name} is not an embedding model"
+        )
+    return model.name
+
+
+async def _register_upload(
+    db,
+    background_tasks: BackgroundTasks,
+    file_path: str,
+    original_filename: str,
+    embedding_model_id: Optional[int],
+    embedding_model_name: str,
+    chunking_method: Optional[str],
+    chunk_size: Optional[int],
+    chunk_overlap: Optional[int],
+    owner_id: Optional[str],
+    group_id: Optional[int],
+    content_hash: Optional[str] = None
+) -> dict:
+    """
+    Create the collection for a file stored on disk and queue its analysis and embeddings.
+    
+    A file that duplicates a completed collection (see _reuse_embeddings)
+    is ready immediately and queues nothing.
+    """
+    file_ext = original_filename.rsplit(".", 1)[1].lower()
+    try:
+        # Determine if this is a document or tabular file
+        if is_document_file(original_filename):
+            # Process document file
+            collection = await _process_document_upload(
+                db=db,
+                file_path=file_path,
+                file_ext=file_ext,
+                original_filename=original_filename,
+                chunking_method=chunking_method,
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                embedding_model_id=embedding_model_id,
+                embedding_model_name=embedding_model_name,
+                owner_id=owner_id,
+                group_id=group_id,
+                content_hash=content_hash
+            )
+        else:
+            # Process tabular file (csv, xlsx, jsonl, parquet)
+            collection = await _process_tabular_upload(
+                db=db,
+                file_path=file_path,
+                file_ext=file_ext,
+                original_filename=original_filename,
+                embedding_model_id=embedding_model_id,
+                embedding_model_name=embedding_model_name,
+                owner_id=owner_id,
+                group_id=group_id,
+                content_hash=content_hash
+            )
+
+        if collection.embeddings_status == 'completed':
+            message = "File uploaded successfully. Embeddings were reused from an identical collection."
+        else:
+            # Analyze the file, then compute embeddings, after the response is sent
+            background_tasks.add_task(
+                process_embeddings_task,
+                collection_id=collection.id
+            )
+            message = "File uploaded successfully. Analysis and embedding will run in the background."
+
+        return {
+            "id": collection.id,
+            "name": collection.name,
+            "file_type": collection.file_type,
+            "content_type": collection.content_type,
+            "row_count": collection.row_count,
+            "chunking_method": collection.chunking_method,
+            "document_metadata": collection.document_metadata,
+            "created_at": collection.created_at.isoformat() if collection.created_at else None,
+            "embeddings_status": collection.embeddings_status,
+            "message": message
+        }
+
+    except Exception as e:
+        # Clean up the uploaded file if there was an error
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        logger.error(f"Error processing file: {str(e)}")
+        db.rollback()
+        db.close()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error processing file: {str(e)}"
+        )
+
+
+def _reuse_embeddings(db, collection: DataCollection, embedding_model_name: str) -> bool:
+    """
+    Point a new collection at the embeddings of an identical completed one.
+    
+    A completed collection matches when it has the same content hash, file
+    type, embedding model and chunking configuration. The new collection
+    takes over its counts and metadata and records the collection that owns
+    the embedding rows as embeddings_metadata.source_collection_id, which
+    retrieval follows. Nothing is copied: if the new collection is ever
+    re-processed, the embedding task writes its own rows and drops the reference.
+    """
+    if not collection.content_hash:
+        return False
+    
+    candidates = db.query(DataCollection).filter(
+        DataCollection.content_hash == collection.content_hash,
+        DataCollection.file_type == collection.file_type,
+        DataCollection.embeddings_status == 'completed'
+    ).order_by(DataCollection.id).all()
+    for source in candidates:
+        metadata = source.embeddings_metadata or {}
+        if metadata.get('embedding_model') != embedding_model_name:
+            continue
+        if (source.chunking_method != collection.chunking_method
+                or (source.chunking_config or {}) != (collection.chunking_config or {})):
+            continue
+        
+        collection.columns = source.columns
+        collection.row_count = source.row_count
+        collection.document_metadata = source.document_metadata
+        collection.embeddings_metadata = {
+            **metadata,
+            'source_collection_id': metadata.get('source_collection_id') or source.id
+        }
+        collection.embeddings_status = 'completed'
+        logger.info(f"Reusing embeddings of collection {source.id} for duplicate upload {collection.name}")
+        return True
+    return False
+
+
 async def _process_document_upload(
     db,
     file_path: str,
@@ -200,14 +525,17 @@ async def _process_document_upload(
     chunk_size: Optional[int],
     chunk_overlap: Optional[int],
     embedding_model_id: Optional[int] = None,
+    embedding_model_name: str = "nomic-embed-text",
     owner_id: Optional[str] = None,
-    group_id: Optional[int] = None
+    group_id: Optional[int] = None,
+    content_hash: Optional[str] = None
 ) -> DataCollection:
-    """Process a document file (txt, pdf, docx) upload"""
+    """
+    Create the collection record for a document upload.
     
-    # Parse the document
-    parser = DocumentParser()
-    parsed_doc = parser.parse(file_path)
+    Only the chunking options are validated here; parsing and chunking run in
+    the background task, which fills in document_metadata and row_count.
+    """
     
     # Set default chunking method if not provided
     if not chunking_method:
@@ -220,27 +548,23 @@ async def _process_document_upload(
     
     # Build chunking config
     chunking_config = {}
-    if chunk_size is not None:
-        chunking_config['chunk_size'] = chunk_size
-    if chunk_overlap is not None:
-        chunking_config['chunk_overlap'] = chunk_overlap
-    
-    # Perform chunking to get chunk count
-    chunker = TextChunker()
-    chunks = chunker.chunk(
-        parsed_doc.content,
-        method=ChunkingMethod(chunking_method),
-        config=chunking_config if chunking_config else None
-    )
-    
-    # Create document metadata
-    document_metadata = {
-        'word_count': parsed_doc.word_count,
-        'char_count': parsed_doc.char_count,
-        'page_count': parsed_doc.page_count,
-        'chunk_count': len(chunks),
-        **parsed_doc.metadata
-    }
+    if chunking_method == ChunkingMethod.TOKEN.value:
+        # Sizes are in tokens of the collection's embedding model
+        chunking_config['embedding_model'] = embedding_model_name
+        if chunk_size is not None:
+            chunking_config['max_tokens'] = chunk_size
+        if chunk_overlap is not None:
+            chunking_config['overlap_tokens'] = chunk_overlap
+    elif chunking_method == ChunkingMethod.EMBEDDING_SEMANTIC.value:
+        # Sentences are embedded with the collection's embedding model
+        chunking_config['embedding_model'] = embedding_model_name
+        if chunk_size is not None:
+            chunking_config['max_chunk_size'] = chunk_size
+    else:
+        if chunk_size is not None:
+            chunking_config['chunk_size'] = chunk_size
+        if chunk_overlap is not None:
+            chunking_config['chunk_overlap'] = chunk_overlap
     
     # Create collection record
     collection = DataCollection(
@@ -249,15 +573,17 @@ async def _process_document_upload(
         file_type=file_ext,
         content_type='document',
         columns=None,  # Documents don't have columns
-        row_count=len(chunks),  # Use chunk count as row count
+        row_count=None,  # Chunk count, filled in by the background analysis
         chunking_method=chunking_method,
         chunking_config=chunking_config if chunking_config else None,
-        document_metadata=document_metadata,
-        embeddings_status='pending',
+        document_metadata=None,
+        embeddings_status='pending_analysis',
         embedding_model_id=embedding_model_id,
+        content_hash=content_hash,
         owner_id=owner_id,
         group_id=group_id
     )
+    _reuse_embeddings(db, collection, embedding_model_name)
     
     db.add(collection)
     db.commit()
@@ -272,35 +598,35 @@ async def _process_tabular_upload(
     file_ext: str,
     original_filename: str,
     embedding_model_id: Optional[int] = None,
+    embedding_model_name: str = "nomic-embed-text",
     owner_id: Optional[str] = None,
-    group_id: Optional[int] = None
+    group_id: Optional[int] = None,
+    content_hash: Optional[str] = None
 ) -> DataCollection:
-    """Process a tabular file (csv, xlsx) upload"""
+    """
+    Create the collection record for a tabular upload.
+    
+    Columns and row count are filled in by the background task.
+    """
     
-    if file_ext == "csv":
-        df = pd.read_csv(file_path)
-    else:  # xlsx
-        df = pd.read_excel(file_path)
-
-    # Convert all columns to string and handle NaN values
-    df = df.astype(str).fillna('')
-
     # Create collection record
     collection = DataCollection(
         name=original_filename,
         file_path=file_path,
         file_type=file_ext,
         content_type='tabular',
-        columns=json.dumps(df.columns.tolist()),
-        row_count=len(df),
+        columns=None,
+        row_count=None,
         chunking_method=None,
         chunking_config=None,
         document_metadata=None,
-        embeddings_status='pending',
+        embeddings_status='pending_analysis',
         embedding_model_id=embedding_model_id,
+        content_hash=content_hash,
         owner_id=owner_id,
         group_id=group_id
     )
+    _reuse_embeddings(db, collection, embedding_model_name)
 
     db.add(collection)
     db.commit()
@@ -401,10 +727,7 @@ async def preview_collection(collection_id: int):
                 return await _preview_document(collection)
             
             # Handle tabular files
-            if collection.file_type == 'csv':
-                df = pd.read_csv(collection.file_path, nrows=50)
-            else:  # xlsx
-                df = pd.read_excel(collection.file_path, nrows=50)
+            df = await run_in_threadpool(TabularReader().preview, collection.file_path, nrows=50)
 
             # Convert to list of dicts for JSON serialization
             return {
@@ -425,21 +748,18 @@ async def preview_collection(collection_id: int):
 
 async def _preview_document(collection: DataCollection) -> dict:
     """Preview a document file by showing its chunks"""
-    parser = DocumentParser()
-    parsed_doc = parser.parse(collection.file_path)
-    
     # Get chunking config
     chunking_method = collection.chunking_method or ChunkingMethod.RECURSIVE.value
     chunking_config = collection.chunking_config or {}
     
-    # Chunk the document
-    chunker = TextChunker()
-    chunks = chunker.chunk(
-        parsed_doc.content,
+    # Chunk the document (cached by file content and chunking config)
+    _, chunks = await run_in_threadpool(
+        get_document_chunks,
+        collection.file_path,
         method=ChunkingMethod(chunking_method),
         config=chunking_config
     )
-    
+
     # Limit preview to first 10 chunks
     preview_chunks = chunks[:10]
     
@@ -528,6 +848,13 @@ async def delete_collection(collection_id: int):
                 else:
                     print(f"File not found at path: {file_path}")
 
+                # Parquet copy of tabular uploads
+                columnar_path = TabularReader().columnar_path(file_path)
+                if columnar_path != file_path and os.path.exists(columnar_path):
+                    os.remove(columnar_path)
+
+            # The embeddings table / partition is dropped by the garbage collector
+            # once no duplicate upload reuses it
             # Delete the database record
             print("Deleting database record...")
             db.delete(collection)
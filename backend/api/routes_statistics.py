@@ -14,6 +14,7 @@ from db.models.assistant import Assistant
 from db.models.group import GroupMember
 from db.session import SessionLocal
 from services.keycloack_service import get_keycloak_admin
+from core.timing import latency_registry
 from schemas.statistics import StatisticsResponse, SystemMetrics, AssistantStats, UserStats, GPUMetrics
 import mlflow
 from mlflow.tracking import MlflowClient
@@ -356,6 +357,31 @@ def get_system_metrics_only():
     return get_system_metrics()
 
 
+@router.get("/latency/", dependencies=[Depends(get_current_user)])
+def get_latency_statistics(
+        collection_id: Optional[int] = Query(None, description="Only return histograms for this collection"),
+        model: Optional[str] = Query(None, description="Only return histograms for this model"),
+        endpoint: Optional[str] = Query(None, description="Only return histograms for this Ollama endpoint, e.g. /api/chat")
+):
+    """
+    Per-stage latency histograms of RAG and chat requests handled by this process.
+
+    Stages: metadata_lookup, db_connect, query_embedding, vector_search,
+    neighbor_expansion, context_assembly, llm_ttft, llm_generation, total.
+    Ollama calls are also keyed by endpoint (ollama_request, ollama_error).
+    """
+    snapshot = latency_registry.snapshot()
+    if collection_id is not None:
+        snapshot["collections"] = {
+            key: value for key, value in snapshot["collections"].items() if key == str(collection_id)
+        }
+    if model is not None:
+        snapshot["models"] = {key: value for key, value in snapshot["models"].items() if key == model}
+    if endpoint is not None:
+        snapshot["endpoints"] = {key: value for key, value in snapshot["endpoints"].items() if key == endpoint}
+    return snapshot
+
+
 @router.get("/assistants/")
 def get_assistant_statistics_only(
         period: TimePeriod = Query(TimePeriod.SEVEN_DAYS, description="Time period for statistics"),
@@ -2,6 +2,8 @@
 Widget API routes for embeddable chat widget management
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
 from typing import List, Optional
@@ -9,13 +11,15 @@ from datetime import datetime, timedelta
 from pydantic import BaseModel, Field
 import secrets
 import uuid
-import httpx
 
 from api.deps import get_current_user
 from db.session import SessionLocal
 from db.models.widget import Widget, WidgetSession, WidgetMessage, WidgetUsageLog
 from db.models.assistant import Assistant
+from core.chat_streaming import MEDIA_TYPES, STREAM_HEADERS, TokenStream, stream_format
 from core.config import settings
+from core.timing import ollama_ttft_ms
+from services.ollama_service import get_ollama_client
 
 router = APIRouter(prefix="/widgets", tags=["Widgets"])
 
@@ -934,6 +938,151 @@ def get_embed_code(
         db.close()
 
 
+def _prepare_widget_chat(db: Session, widget_token: str, request: Request, chat_request: ChatRequest):
+    """
+    Authenticate a widget chat request, save the user message and return
+    (widget, session, messages for Ollama).
+    """
+    # Find widget by token
+    token_hash = Widget.hash_token(widget_token)
+    widget = db.query(Widget).filter(Widget.token_hash == token_hash).first()
+    
+    if not widget:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid widget token"
+        )
+    
+    if not widget.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Widget is inactive"
+        )
+    
+    # Check domain whitelist
+    origin = request.headers.get('origin', '')
+    if widget.allowed_domains:
+        domain_allowed = any(
+            domain in origin for domain in widget.allowed_domains
+        )
+        if not domain_allowed and origin:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Domain not whitelisted"
+            )
+    
+    # Get or create session
+    session = None
+    if chat_request.session_id:
+        session = db.query(WidgetSession).filter(
+            and_(
+                WidgetSession.widget_id == widget.id,
+                WidgetSession.session_id == chat_request.session_id
+            )
+        ).first()
+    
+    if not session:
+        session = WidgetSession(
+            widget_id=widget.id,
+            session_id=chat_request.session_id or str(uuid.uuid4()),
+            visitor_id=chat_request.visitor_id,
+            ip_address=request.client.host if request.client else None,
+            user_agent=request.headers.get('user-agent'),
+            referrer_url=request.headers.get('referer')
+        )
+        db.add(session)
+        db.commit()
+        db.refresh(session)
+    
+    # Save user message
+    user_message = WidgetMessage(
+        session_id=session.id,
+        role='user',
+        content=chat_request.message
+    )
+    db.add(user_message)
+    
+    # Get conversation history
+    history = db.query(WidgetMessage).filter(
+        WidgetMessage.session_id == session.id
+    ).order_by(WidgetMessage.created_at.asc()).all()
+    
+    messages = [{"role": msg.role, "content": msg.content} for msg in history]
+    messages.append({"role": "user", "content": chat_request.message})
+    
+    # Add start message as system prompt if first message
+    if widget.start_message and len(messages) == 1:
+        messages.insert(0, {"role": "system", "content": widget.start_message})
+    
+    return widget, session, messages
+
+
+def _record_widget_reply(
+    db: Session,
+    widget: Widget,
+    session: WidgetSession,
+    request: Request,
+    endpoint: str,
+    content: str,
+    response_time_ms: int,
+    ttft_ms: Optional[int],
+    error_type: Optional[str] = None
+) -> None:
+    """Save the assistant message, update session / widget activity and log usage"""
+    # Save assistant message
+    assistant_message = WidgetMessage(
+        session_id=session.id,
+        role='assistant',
+        content=content,
+        response_time_ms=response_time_ms,
+        ttft_ms=ttft_ms
+    )
+    db.add(assistant_message)
+    
+    # Update session
+    session.message_count = (session.message_count or 0) + 2
+    session.last_activity_at = datetime.utcnow()
+    
+    # Update widget last used
+    widget.last_used_at = datetime.utcnow()
+    
+    # Log usage
+    usage_log = WidgetUsageLog(
+        widget_id=widget.id,
+        session_id=session.id,
+        endpoint=endpoint,
+        method='POST',
+        status_code=500 if error_type else 200,
+        response_time_ms=response_time_ms,
+        ttft_ms=ttft_ms,
+        error_type=error_type,
+        ip_address=request.client.host if request.client else None,
+        user_agent=request.headers.get('user-agent'),
+        referrer=request.headers.get('referer')
+    )
+    db.add(usage_log)
+    
+    db.commit()
+
+
+def _log_widget_error(db: Session, widget: Optional[Widget], request: Request, endpoint: str, response_time_ms: int) -> None:
+    # Usage logs belong to a widget; failures before the token lookup are not logged
+    db.rollback()
+    if widget is None:
+        return
+    usage_log = WidgetUsageLog(
+        widget_id=widget.id,
+        endpoint=endpoint,
+        method='POST',
+        status_code=500,
+        response_time_ms=response_time_ms,
+        error_type='server_error',
+        ip_address=request.client.host if request.client else None
+    )
+    db.add(usage_log)
+    db.commit()
+
+
 # Public widget chat endpoint (no auth required, uses widget token)
 @router.post("/chat/{widget_token}/")
 async def widget_chat(
@@ -946,133 +1095,23 @@ async def widget_chat(
     
     db = SessionLocal()
     start_time = time_module.time()
+    widget = None
     
     try:
-        # Find widget by token
-        token_hash = Widget.hash_token(widget_token)
-        widget = db.query(Widget).filter(Widget.token_hash == token_hash).first()
-        
-        if not widget:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid widget token"
-            )
-        
-        if not widget.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Widget is inactive"
-            )
-        
-        # Check domain whitelist
-        origin = request.headers.get('origin', '')
-        if widget.allowed_domains:
-            domain_allowed = any(
-                domain in origin for domain in widget.allowed_domains
-            )
-            if not domain_allowed and origin:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Domain not whitelisted"
-                )
-        
-        # Get or create session
-        session = None
-        if chat_request.session_id:
-            session = db.query(WidgetSession).filter(
-                and_(
-                    WidgetSession.widget_id == widget.id,
-                    WidgetSession.session_id == chat_request.session_id
-                )
-            ).first()
-        
-        if not session:
-            session = WidgetSession(
-                widget_id=widget.id,
-                session_id=chat_request.session_id or str(uuid.uuid4()),
-                visitor_id=chat_request.visitor_id,
-                ip_address=request.client.host if request.client else None,
-                user_agent=request.headers.get('user-agent'),
-                referrer_url=request.headers.get('referer')
-            )
-            db.add(session)
-            db.commit()
-            db.refresh(session)
-        
-        # Save user message
-        user_message = WidgetMessage(
-            session_id=session.id,
-            role='user',
-            content=chat_request.message
-        )
-        db.add(user_message)
-        
-        # Get assistant and call Ollama
-        assistant = widget.assistant
-        
-        # Get conversation history
-        history = db.query(WidgetMessage).filter(
-            WidgetMessage.session_id == session.id
-        ).order_by(WidgetMessage.created_at.asc()).all()
-        
-        messages = [{"role": msg.role, "content": msg.content} for msg in history]
-        messages.append({"role": "user", "content": chat_request.message})
-        
-        # Add start message as system prompt if first message
-        if widget.start_message and len(messages) == 1:
-            messages.insert(0, {"role": "system", "content": widget.start_message})
+        widget, session, messages = _prepare_widget_chat(db, widget_token, request, chat_request)
         
         # Call Ollama
-        url = f"{settings.OLLAMA_HOST.rstrip('/')}/api/chat"
-        payload = {
-            "model": assistant.model,
-            "messages": messages,
-            "stream": False
-        }
-        
-        ttft_ms = None
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(url, json=payload)
-            response.raise_for_status()
-            result = response.json()
+        assistant = widget.assistant
+        result = await get_ollama_client().chat(assistant.model, messages)
         
         response_content = result.get("message", {}).get("content", "")
         
         response_time_ms = int((time_module.time() - start_time) * 1000)
+        # Model-side TTFT (load + prompt evaluation); the streaming endpoint measures it end to end
+        model_ttft_ms = ollama_ttft_ms(result)
+        ttft_ms = round(model_ttft_ms) if model_ttft_ms is not None else None
         
-        # Save assistant message
-        assistant_message = WidgetMessage(
-            session_id=session.id,
-            role='assistant',
-            content=response_content,
-            response_time_ms=response_time_ms,
-            ttft_ms=ttft_ms
-        )
-        db.add(assistant_message)
-        
-        # Update session
-        session.message_count = (session.message_count or 0) + 2
-        session.last_activity_at = datetime.utcnow()
-        
-        # Update widget last used
-        widget.last_used_at = datetime.utcnow()
-        
-        # Log usage
-        usage_log = WidgetUsageLog(
-            widget_id=widget.id,
-            session_id=session.id,
-            endpoint='/chat/',
-            method='POST',
-            status_code=200,
-            response_time_ms=response_time_ms,
-            ttft_ms=ttft_ms,
-            ip_address=request.client.host if request.client else None,
-            user_agent=request.headers.get('user-agent'),
-            referrer=request.headers.get('referer')
-        )
-        db.add(usage_log)
-        
-        db.commit()
+        _record_widget_reply(db, widget, session, request, '/chat/', response_content, response_time_ms, ttft_ms)
         
         return ChatResponse(
             session_id=session.session_id,
@@ -1085,17 +1124,7 @@ async def widget_chat(
         raise
     except Exception as e:
         # Log error
-        usage_log = WidgetUsageLog(
-            widget_id=widget.id if widget else None,
-            endpoint='/chat/',
-            method='POST',
-            status_code=500,
-            response_time_ms=int((time_module.time() - start_time) * 1000),
-            error_type='server_error',
-            ip_address=request.client.host if request.client else None
-        )
-        db.add(usage_log)
-        db.commit()
+        _log_widget_error(db, widget, request, '/chat/', int((time_module.time() - start_time) * 1000))
         
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1105,6 +1134,90 @@ async def widget_chat(
         db.close()
 
 
+# Public streaming widget chat endpoint (no auth required, uses widget token)
+@router.post("/chat/{widget_token}/stream/")
+async def widget_chat_stream(
+    widget_token: str,
+    request: Request,
+    chat_request: ChatRequest,
+    format: Optional[str] = None
+):
+    """
+    Handle chat messages from the widget, relaying tokens as they are generated.
+
+    Responds with Server-Sent Events, or NDJSON with format=ndjson (or
+    Accept: application/x-ndjson). The done event carries session_id,
+    ttft_ms and response_time_ms. The reply and its real time to first
+    token are saved once the stream completes.
+    """
+    import time as time_module
+    
+    try:
+        fmt = stream_format(format, request.headers.get('accept'))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    db = SessionLocal()
+    started = time_module.perf_counter()
+    widget = None
+    
+    try:
+        widget, session, messages = _prepare_widget_chat(db, widget_token, request, chat_request)
+        # The user message is kept even if the client disconnects mid-stream
+        db.commit()
+        
+        token_stream = TokenStream(
+            get_ollama_client().stream_chat(widget.assistant.model, messages),
+            fmt,
+            started=started
+        )
+        token_stream.meta["session_id"] = session.session_id
+        await token_stream.start()
+        widget_id, session_id = widget.id, session.id
+        
+    except HTTPException:
+        db.close()
+        raise
+    except Exception as e:
+        _log_widget_error(db, widget, request, '/chat/stream/', int((time_module.perf_counter() - started) * 1000))
+        db.close()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+    db.close()
+    
+    def record_reply() -> None:
+        error_type = None
+        if token_stream.error:
+            error_type = 'stream_error'
+        elif not token_stream.completed:
+            error_type = 'client_disconnected'
+        with SessionLocal() as reply_db:
+            reply_widget = reply_db.query(Widget).filter(Widget.id == widget_id).first()
+            reply_session = reply_db.query(WidgetSession).filter(WidgetSession.id == session_id).first()
+            if reply_widget is None or reply_session is None:
+                return
+            _record_widget_reply(
+                reply_db,
+                reply_widget,
+                reply_session,
+                request,
+                '/chat/stream/',
+                token_stream.content,
+                round(token_stream.response_time_ms or 0),
+                round(token_stream.ttft_ms) if token_stream.ttft_ms is not None else None,
+                error_type=error_type
+            )
+    
+    return StreamingResponse(
+        token_stream,
+        media_type=MEDIA_TYPES[fmt],
+        headers=STREAM_HEADERS,
+        background=BackgroundTask(record_reply)
+    )
+
+
 # Get session history for widget (public, uses widget token)
 @router.get("/session/{widget_token}/{session_id}/")
 async def get_widget_session(
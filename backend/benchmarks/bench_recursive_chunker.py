@@ -0,0 +1,79 @@
+"""
+Throughput benchmark for the recursive chunker on multi-megabyte documents.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_recursive_chunker
+    python -m benchmarks.bench_recursive_chunker --sizes 1 8 32 --chunk-size 512 --chunk-overlap 50
+"""
+
+import argparse
+import random
+import time
+
+from core.text_chunking import TextChunker, ChunkingMethod
+
+WORDS = (
+    "data model vector query index latency throughput retrieval context answer "
+    "document section table report analysis system user request response token "
+    "embedding chunk overlap sentence paragraph storage partition cache worker"
+).split()
+
+
+def generate_document(size_mb: float, seed: int = 42, unbroken_ratio: float = 0.02) -> str:
+    """
+    Build a deterministic synthetic document of roughly size_mb megabytes.
+
+    A small share of paragraphs are long runs without whitespace (base64 blobs,
+    URLs, log tokens), which exercise the character-level fallback.
+    """
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    parts = []
+    length = 0
+    while length < target:
+        if rng.random() < unbroken_ratio:
+            paragraph = "".join(rng.choice("abcdef0123456789") for _ in range(rng.randint(600, 3000)))
+        else:
+            sentences = []
+            for _ in range(rng.randint(2, 8)):
+                words = [rng.choice(WORDS) for _ in range(rng.randint(5, 25))]
+                sentences.append(" ".join(words).capitalize() + ".")
+            lines = []
+            for i in range(0, len(sentences), 3):
+                lines.append(" ".join(sentences[i:i + 3]))
+            paragraph = "\n".join(lines)
+        parts.append(paragraph)
+        length += len(paragraph) + 2
+    return "\n\n".join(parts)
+
+
+def run(sizes, chunk_size: int, chunk_overlap: int, repeat: int = 3):
+    chunker = TextChunker()
+    config = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap}
+    print(f"recursive chunker, chunk_size={chunk_size}, chunk_overlap={chunk_overlap}")
+    print(f"{'size_mb':>8} {'chunks':>9} {'best_s':>8} {'MB/s':>8} {'chunks/s':>10}")
+    for size_mb in sizes:
+        text = generate_document(size_mb)
+        best = None
+        chunks = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            chunks = chunker.chunk(text, method=ChunkingMethod.RECURSIVE, config=config)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        mb = len(text) / (1024 * 1024)
+        print(f"{mb:>8.1f} {len(chunks):>9} {best:>8.3f} {mb / best:>8.2f} {len(chunks) / best:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 16], help="Document sizes in MB")
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.sizes, args.chunk_size, args.chunk_overlap, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Sentences/sec of the sentence segmentation behind the sentence and semantic chunkers.
+
+Compares the vendored punkt tokenizer with the regex fallback, and semantic
+boundary detection with the precompiled alternation against the previous
+six uncompiled re.match calls per sentence. When NLTK's own punkt data is
+installed, also reports how many sentence boundaries of the vendored
+tokenizer agree with nltk.sent_tokenize.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_sentence_segmentation
+    python -m benchmarks.bench_sentence_segmentation --size-mb 4 --repeat 5
+"""
+
+import argparse
+import re
+import time
+
+from benchmarks.bench_recursive_chunker import generate_document
+from core.text_chunking import (
+    _SEMANTIC_BOUNDARY,
+    _SENTENCE_BREAK,
+    ChunkingMethod,
+    _load_punkt_tokenizer,
+    get_text_chunker,
+)
+
+LEGACY_BOUNDARY_PATTERNS = [
+    r'^(However|Nevertheless|Furthermore|Moreover|In conclusion|Therefore|Thus|Finally|Consequently|As a result)',
+    r'^(First|Second|Third|Next|Then|Lastly|Additionally)',
+    r'^(On the other hand|In contrast|Alternatively|Meanwhile)',
+    r'^(In summary|To summarize|Overall|In short)',
+    r'^\d+\.',
+    r'^[-•*]',
+]
+
+
+def best_of(repeat: int, func):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def nltk_agreement(text: str, spans):
+    """Share of nltk.sent_tokenize sentences the vendored tokenizer reproduces; None without NLTK data"""
+    try:
+        from nltk.tokenize import sent_tokenize
+        reference = sent_tokenize(text, language="english")
+    except LookupError:
+        return None
+    ours = {text[start:end] for start, end in spans}
+    return sum(1 for sentence in reference if sentence in ours) / max(1, len(reference))
+
+
+def run(size_mb: float, repeat: int):
+    text = generate_document(size_mb)
+    chunker = get_text_chunker()
+    punkt = _load_punkt_tokenizer()
+
+    print(f"{'case':<34} {'sentences':>10} {'best_s':>8} {'sentences/s':>12}")
+
+    def report(name, elapsed, count):
+        print(f"{name:<34} {count:>10} {elapsed:>8.3f} {count / elapsed:>12.0f}")
+
+    agreement = None
+    if punkt is not None:
+        elapsed, spans = best_of(repeat, lambda: list(punkt.span_tokenize(text)))
+        report("punkt (vendored)", elapsed, len(spans))
+        agreement = nltk_agreement(text, spans)
+
+    elapsed, parts = best_of(repeat, lambda: _SENTENCE_BREAK.split(text))
+    report("regex fallback", elapsed, len(parts))
+
+    spans = chunker._sentence_spans(text)
+    sentences = [text[start:end] for start, end in spans]
+
+    elapsed, _ = best_of(repeat, lambda: [
+        any(re.match(pattern, sentence, re.IGNORECASE) for pattern in LEGACY_BOUNDARY_PATTERNS)
+        for sentence in sentences
+    ])
+    report("boundaries: 6x re.match (legacy)", elapsed, len(spans))
+
+    elapsed, _ = best_of(repeat, lambda: [_SEMANTIC_BOUNDARY.match(text, start) is not None for start, _ in spans])
+    report("boundaries: compiled alternation", elapsed, len(spans))
+
+    elapsed, _ = best_of(repeat, lambda: chunker.chunk(text, method=ChunkingMethod.SEMANTIC))
+    report("semantic chunker end-to-end", elapsed, len(spans))
+
+    if agreement is None:
+        print("\nnltk punkt data not installed, sentence agreement not checked")
+    else:
+        print(f"\nsentences matching nltk.sent_tokenize: {agreement:.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=2, help="Synthetic document size in MB")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.size_mb, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Speed and output-quality benchmark for every chunking method.
+
+Runs each ChunkingMethod over the local corpus (benchmarks/corpus.py) and
+records per document and method:
+- chunks/sec and MB/s (best of --repeat runs)
+- peak Python memory while chunking (tracemalloc)
+- chunk size distribution in characters
+- offset correctness: share of chunks whose content equals
+  text[start_char:end_char], exactly and after whitespace normalization
+
+The embedding_semantic method uses an offline hashing embedder instead of
+Ollama, so the whole run needs no network.
+
+Usage (from the backend directory):
+    python -m benchmarks.chunking_benchmark                       # writes benchmarks/results/baseline.json
+    python -m benchmarks.chunking_benchmark --output /tmp/run.json --compare benchmarks/results/baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.corpus import ensure_corpus
+from core.document_parser import DocumentParser
+from core.sentence_embeddings import normalize_rows
+from core.text_chunking import ChunkingMethod, TextChunker
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_BASELINE = os.path.join(RESULTS_DIR, "baseline.json")
+
+HASH_EMBEDDING_DIM = 256
+
+# A comparison fails when throughput drops or offset correctness falls by more than this
+DEFAULT_TOLERANCE = 0.2
+
+
+def hashing_embedder(sentences: List[str], model: str) -> np.ndarray:
+    """Bag-of-words feature hashing; stands in for the embedding model offline"""
+    matrix = np.zeros((len(sentences), HASH_EMBEDDING_DIM), dtype=np.float32)
+    for row, sentence in enumerate(sentences):
+        for word in sentence.lower().split():
+            matrix[row, zlib.crc32(word.strip(".,;:!?").encode()) % HASH_EMBEDDING_DIM] += 1.0
+    return normalize_rows(matrix)
+
+
+def size_distribution(sizes: List[int]) -> Dict[str, Any]:
+    if not sizes:
+        return {"min": 0, "p50": 0, "p90": 0, "max": 0, "mean": 0.0, "stdev": 0.0}
+    ordered = sorted(sizes)
+    return {
+        "min": ordered[0],
+        "p50": ordered[len(ordered) // 2],
+        "p90": ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))],
+        "max": ordered[-1],
+        "mean": round(statistics.fmean(ordered), 1),
+        "stdev": round(statistics.pstdev(ordered), 1),
+    }
+
+
+def offset_correctness(text: str, chunks) -> Dict[str, float]:
+    if not chunks:
+        return {"exact": 1.0, "normalized": 1.0}
+    exact = normalized = 0
+    for chunk in chunks:
+        source = text[chunk.start_char:chunk.end_char]
+        if source == chunk.content:
+            exact += 1
+            normalized += 1
+        elif source.split() == chunk.content.split():
+            normalized += 1
+    return {"exact": round(exact / len(chunks), 4), "normalized": round(normalized / len(chunks), 4)}
+
+
+def benchmark_method(chunker: TextChunker, text: str, method: ChunkingMethod, repeat: int) -> Dict[str, Any]:
+    best = None
+    chunks = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = chunker.chunk(text, method=method)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    chunker.chunk(text, method=method)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mb = len(text) / (1024 * 1024)
+    return {
+        "chunks": len(chunks),
+        "seconds": round(best, 4),
+        "chunks_per_sec": round(len(chunks) / best, 1) if best else None,
+        "mb_per_sec": round(mb / best, 2) if best else None,
+        "peak_memory_mb": round(peak / (1024 * 1024), 2),
+        "chunk_chars": size_distribution([len(chunk.content) for chunk in chunks]),
+        "offsets": offset_correctness(text, chunks),
+    }
+
+
+def run(repeat: int, methods: List[ChunkingMethod]) -> Dict[str, Any]:
+    parser = DocumentParser()
+    chunker = TextChunker(sentence_embedder=hashing_embedder)
+    documents = {}
+
+    for path in ensure_corpus():
+        name = os.path.basename(path)
+        start = time.perf_counter()
+        parsed = parser.parse(path)
+        parse_seconds = time.perf_counter() - start
+        print(f"{name}: {parsed.char_count} chars, parsed in {parse_seconds:.2f}s")
+
+        results = {}
+        for method in methods:
+            result = benchmark_method(chunker, parsed.content, method, repeat)
+            results[method.value] = result
+            print(
+                f"  {method.value:<20} {result['chunks']:>7} chunks {result['chunks_per_sec'] or 0:>10.0f}/s "
+                f"{result['peak_memory_mb']:>8.1f} MB peak  p50 {result['chunk_chars']['p50']:>5} chars  "
+                f"offsets exact {result['offsets']['exact']:.2f} / normalized {result['offsets']['normalized']:.2f}"
+            )
+        documents[name] = {
+            "chars": parsed.char_count,
+            "pages": parsed.page_count,
+            "parse_seconds": round(parse_seconds, 4),
+            "methods": results,
+        }
+
+    return {
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "documents": documents,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of current against baseline, as printable lines"""
+    regressions = []
+    for name, document in current["documents"].items():
+        base_document = baseline.get("documents", {}).get(name)
+        if not base_document:
+            continue
+        for method, result in document["methods"].items():
+            base = base_document["methods"].get(method)
+            if not base:
+                continue
+            label = f"{name} / {method}"
+            if base["chunks_per_sec"] and result["chunks_per_sec"] is not None:
+                change = result["chunks_per_sec"] / base["chunks_per_sec"] - 1
+                print(f"{label:<40} chunks/s {base['chunks_per_sec']:>10.0f} -> {result['chunks_per_sec']:>10.0f} ({change:+.0%})")
+                if change < -tolerance:
+                    regressions.append(f"{label}: chunks/sec down {-change:.0%}")
+            for kind in ("exact", "normalized"):
+                if result["offsets"][kind] < base["offsets"][kind] - 1e-9:
+                    regressions.append(
+                        f"{label}: {kind} offset correctness {base['offsets'][kind]:.4f} -> {result['offsets'][kind]:.4f}"
+                    )
+            if result["chunks"] != base["chunks"]:
+                print(f"{label:<40} chunk count {base['chunks']} -> {result['chunks']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per document and method (best is kept)")
+    parser.add_argument("--methods", nargs="+", choices=[m.value for m in ChunkingMethod],
+                        help="Methods to run (default: all)")
+    parser.add_argument("--output", default=DEFAULT_BASELINE, help="Where to write the results JSON")
+    parser.add_argument("--compare", help="Baseline JSON to compare against; exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative chunks/sec drop before a comparison fails")
+    args = parser.parse_args()
+
+    methods = [ChunkingMethod(m) for m in args.methods] if args.methods else list(ChunkingMethod)
+    results = run(args.repeat, methods)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Deterministic local corpus for the document benchmarks.
+
+The corpus is generated on first use into benchmarks/corpus/ (git-ignored)
+and reused afterwards, so benchmarks run offline and every machine measures
+the same documents:
+
+- prose.txt: multi-megabyte plain text with paragraphs, lines and unbroken runs
+- report.pdf: long PDF with a repeated header/footer on every page
+- tables.docx: DOCX with headings, paragraphs and several tables
+
+Usage (from the backend directory):
+    python -m benchmarks.corpus            # (re)build the corpus
+"""
+
+import os
+import random
+from typing import Dict, List
+
+from benchmarks.bench_recursive_chunker import WORDS, generate_document
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+
+TEXT_SIZE_MB = 2
+PDF_PAGES = 400
+DOCX_SECTIONS = 60
+
+PDF_HEADER = "ACME Corp - Internal Quarterly Report - Confidential"
+PDF_FOOTER = "This document is provided for internal use only. Do not distribute."
+
+
+def _sentences(rng: random.Random, count: int) -> List[str]:
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 20))).capitalize() + "."
+        for _ in range(count)
+    ]
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: List[List[str]]) -> None:
+    """
+    Write a text-only PDF with one list of lines per page.
+
+    Hand-written PDF syntax (Helvetica, one content stream per page), so no
+    PDF generation library is needed.
+    """
+    objects: Dict[int, bytes] = {}
+    page_ids = []
+    next_id = 4  # 1: catalog, 2: page tree, 3: font
+    for lines in pages:
+        page_id, content_id = next_id, next_id + 1
+        next_id += 2
+        page_ids.append(page_id)
+        stream = "BT /F1 10 Tf 12 TL 50 760 Td " + " ".join(f"({_pdf_escape(line)}) '" for line in lines) + " ET"
+        data = stream.encode("latin-1")
+        objects[content_id] = b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream"
+        objects[page_id] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+
+    objects[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode()
+    objects[2] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+    objects[3] = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(out)
+        out += b"%d 0 obj\n" % obj_id + objects[obj_id] + b"\nendobj\n"
+    xref_at = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for obj_id in sorted(objects):
+        out += b"%010d 00000 n \n" % offsets[obj_id]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_at)
+
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def build_text(path: str, seed: int = 42) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(generate_document(TEXT_SIZE_MB, seed=seed))
+
+
+def build_pdf(path: str, seed: int = 43) -> None:
+    rng = random.Random(seed)
+    pages = []
+    for number in range(1, PDF_PAGES + 1):
+        lines = [PDF_HEADER, ""]
+        for sentence in _sentences(rng, rng.randint(12, 30)):
+            # Wrap at roughly 90 characters like a typeset page
+            line = ""
+            for word in sentence.split():
+                if len(line) + len(word) > 90:
+                    lines.append(line)
+                    line = word
+                else:
+                    line = f"{line} {word}".strip()
+            lines.append(line)
+        lines += ["", PDF_FOOTER, f"Page {number} of {PDF_PAGES}"]
+        pages.append(lines)
+    write_pdf(path, pages)
+
+
+def build_docx(path: str, seed: int = 44) -> None:
+    import docx
+
+    rng = random.Random(seed)
+    document = docx.Document()
+    for section in range(1, DOCX_SECTIONS + 1):
+        document.add_heading(f"Section {section}", level=1)
+        for _ in range(rng.randint(2, 5)):
+            document.add_paragraph(" ".join(_sentences(rng, rng.randint(3, 8))))
+        if section % 3 == 0:
+            rows, cols = rng.randint(4, 12), rng.randint(3, 6)
+            table = document.add_table(rows=rows, cols=cols)
+            for r in range(rows):
+                for c in range(cols):
+                    table.cell(r, c).text = f"{rng.choice(WORDS)} {rng.randint(0, 9999)}" if r else f"col_{c}"
+    document.save(path)
+
+
+BUILDERS = {
+    "prose.txt": build_text,
+    "report.pdf": build_pdf,
+    "tables.docx": build_docx,
+}
+
+
+def ensure_corpus(rebuild: bool = False) -> List[str]:
+    """Paths of the corpus documents, generating missing ones"""
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+    paths = []
+    for filename, builder in BUILDERS.items():
+        path = os.path.join(CORPUS_DIR, filename)
+        if rebuild or not os.path.exists(path):
+            builder(path)
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    for corpus_path in ensure_corpus(rebuild=True):
+        print(f"{corpus_path}: {os.path.getsize(corpus_path) / 1024:.0f} KB")
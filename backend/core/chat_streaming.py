@@ -0,0 +1,149 @@
+"""
+Streamed chat responses: Ollama chunks relayed to the client as they arrive.
+
+Two framings are supported:
+- sse: Server-Sent Events (text/event-stream), ``event: <name>`` plus a
+  JSON ``data:`` line per event
+- ndjson: one JSON object per line (application/x-ndjson), with the event
+  name in its ``event`` field
+
+Events:
+- token: ``{"content": "..."}`` for each piece of generated text
+- done: ``{"ttft_ms", "response_time_ms", ...}`` once generation finished,
+  plus endpoint-specific fields (e.g. the widget session id)
+- error: ``{"detail": "..."}`` when generation failed after the stream started
+
+Time to first token is measured from the start of the request to the first
+non-empty token, so it includes queueing, model load and prompt evaluation.
+"""
+
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STREAM_SSE = "sse"
+STREAM_NDJSON = "ndjson"
+
+MEDIA_TYPES = {
+    STREAM_SSE: "text/event-stream",
+    STREAM_NDJSON: "application/x-ndjson",
+}
+
+# Keep proxies (nginx) from buffering the stream
+STREAM_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def stream_format(requested: Optional[str] = None, accept: Optional[str] = None) -> str:
+    """
+    Framing for a streamed response: the requested one, else NDJSON when the
+    Accept header asks for it, else SSE.
+
+    Raises:
+        ValueError: If requested is not a supported format
+    """
+    if requested:
+        if requested not in MEDIA_TYPES:
+            raise ValueError(f"Unsupported stream format: {requested}. Use one of: {', '.join(MEDIA_TYPES)}")
+        return requested
+    if accept and MEDIA_TYPES[STREAM_NDJSON] in accept:
+        return STREAM_NDJSON
+    return STREAM_SSE
+
+
+def encode_event(fmt: str, event: str, data: Dict[str, Any]) -> bytes:
+    if fmt == STREAM_NDJSON:
+        return (json.dumps({"event": event, **data}) + "\n").encode("utf-8")
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+class TokenStream:
+    """
+    Relays Ollama /api/chat stream chunks as token events and measures TTFT.
+
+    Call start() before returning the response. It waits for the first
+    chunk, so an unreachable or unknown model fails the request with an
+    error status instead of an error event inside a 200 stream.
+    """
+
+    def __init__(
+        self,
+        chunks: AsyncIterator[Dict[str, Any]],
+        fmt: str = STREAM_SSE,
+        started: Optional[float] = None,
+        on_first_token: Optional[Callable[[float], None]] = None
+    ):
+        self._chunks = chunks
+        self.fmt = fmt
+        # time.perf_counter() at the start of the request
+        self.started = started if started is not None else time.perf_counter()
+        self.on_first_token = on_first_token
+        # Extra fields of the done event
+        self.meta: Dict[str, Any] = {}
+        self.ttft_ms: Optional[float] = None
+        self.response_time_ms: Optional[float] = None
+        # Last Ollama chunk (done=True), with load / eval durations
+        self.final: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self._parts: List[str] = []
+        self._first: Optional[Dict[str, Any]] = None
+
+    @property
+    def content(self) -> str:
+        return "".join(self._parts)
+
+    @property
+    def completed(self) -> bool:
+        return self.final is not None
+
+    def _elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    async def start(self) -> None:
+        try:
+            self._first = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            self._first = None
+
+    def _token_event(self, chunk: Dict[str, Any]) -> Optional[bytes]:
+        if chunk.get("done"):
+            self.final = chunk
+        content = (chunk.get("message") or {}).get("content") or ""
+        if not content:
+            return None
+        if self.ttft_ms is None:
+            self.ttft_ms = self._elapsed_ms()
+            if self.on_first_token is not None:
+                self.on_first_token(self.ttft_ms)
+        self._parts.append(content)
+        return encode_event(self.fmt, "token", {"content": content})
+
+    async def __aiter__(self):
+        try:
+            if self._first is not None:
+                event = self._token_event(self._first)
+                if event:
+                    yield event
+            async for chunk in self._chunks:
+                event = self._token_event(chunk)
+                if event:
+                    yield event
+            self.response_time_ms = self._elapsed_ms()
+            yield encode_event(self.fmt, "done", {
+                "ttft_ms": round(self.ttft_ms) if self.ttft_ms is not None else None,
+                "response_time_ms": round(self.response_time_ms),
+                **self.meta,
+            })
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Chat stream failed: {e}")
+            yield encode_event(self.fmt, "error", {"detail": str(e)})
+        finally:
+            if self.response_time_ms is None:
+                self.response_time_ms = self._elapsed_ms()
+            await self._chunks.aclose()
@@ -0,0 +1,199 @@
+"""
+SQL column types for tabular collections.
+
+Types are inferred from the first batch in which a column appears:
+- BIGINT: integer columns, and float columns whose values are all whole
+  numbers (CSV integer columns with gaps are read as floats)
+- DOUBLE PRECISION: other numeric columns
+- TIMESTAMP / TIMESTAMPTZ: datetime columns and text columns holding ISO 8601
+  dates
+- BOOLEAN: boolean columns
+- TEXT: everything else
+
+A later value that does not fit its column widens the column (BIGINT to
+DOUBLE PRECISION when it is numeric, TIMESTAMP to TIMESTAMPTZ when it carries
+a UTC offset, otherwise TEXT), so ingestion never fails on a type drift.
+"""
+
+import math
+import re
+from datetime import date, datetime
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+SQL_BIGINT = "BIGINT"
+SQL_DOUBLE = "DOUBLE PRECISION"
+SQL_TIMESTAMP = "TIMESTAMP"
+SQL_TIMESTAMPTZ = "TIMESTAMPTZ"
+SQL_BOOLEAN = "BOOLEAN"
+SQL_TEXT = "TEXT"
+
+# Types worth a btree index for range filters and aggregates
+INDEXED_TYPES = {SQL_BIGINT, SQL_DOUBLE, SQL_TIMESTAMP, SQL_TIMESTAMPTZ}
+
+_INT64_MIN, _INT64_MAX = -(2 ** 63), 2 ** 63 - 1
+_ISO_DATETIME = re.compile(
+    r"^\d{4}-\d{2}-\d{2}"
+    r"(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?"
+    r"(Z|[+-]\d{2}:?\d{2})?$"
+)
+_BOOLEAN_TEXT = {"true": True, "false": False}
+
+
+def _is_missing(value: Any) -> bool:
+    if value is None or value is pd.NaT:
+        return True
+    if isinstance(value, (float, np.floating)):
+        return math.isnan(value)
+    return False
+
+
+def _is_bool(value: Any) -> bool:
+    return isinstance(value, (bool, np.bool_))
+
+
+def _is_whole(value: Any) -> bool:
+    return float(value).is_integer() and _INT64_MIN <= value <= _INT64_MAX
+
+
+def infer_sql_type(series: pd.Series) -> str:
+    """SQL type for the values of one column"""
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return SQL_BOOLEAN
+    if pd.api.types.is_integer_dtype(dtype):
+        return SQL_BIGINT
+    if pd.api.types.is_float_dtype(dtype):
+        values = series.dropna()
+        if len(values) and all(_is_whole(v) for v in values):
+            return SQL_BIGINT
+        return SQL_DOUBLE
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return SQL_TIMESTAMPTZ if getattr(dtype, "tz", None) is not None else SQL_TIMESTAMP
+
+    values = [v for v in series if not _is_missing(v)]
+    if not values:
+        return SQL_TEXT
+    if all(_is_bool(v) for v in values):
+        return SQL_BOOLEAN
+    if all(isinstance(v, str) for v in values):
+        matches = [_ISO_DATETIME.match(v.strip()) for v in values]
+        if all(matches):
+            return SQL_TIMESTAMPTZ if any(m.group(1) for m in matches) else SQL_TIMESTAMP
+        return SQL_TEXT
+    if all(isinstance(v, (datetime, date)) for v in values):
+        return SQL_TIMESTAMP
+    return SQL_TEXT
+
+
+def coerce_value(value: Any, sql_type: str) -> Any:
+    """
+    Convert a value to the Python type stored in a column of sql_type.
+
+    Missing values (None, NaN, NaT) become None.
+
+    Raises:
+        ValueError: If the value does not fit the type
+    """
+    if _is_missing(value):
+        return None
+    if sql_type == SQL_TEXT:
+        return str(value)
+    if sql_type == SQL_BOOLEAN:
+        if _is_bool(value):
+            return bool(value)
+        if isinstance(value, str) and value.strip().lower() in _BOOLEAN_TEXT:
+            return _BOOLEAN_TEXT[value.strip().lower()]
+        raise ValueError(f"{value!r} is not a boolean")
+    if sql_type in (SQL_TIMESTAMP, SQL_TIMESTAMPTZ):
+        if _is_bool(value) or isinstance(value, (int, float, np.number)):
+            raise ValueError(f"{value!r} is not a timestamp")
+        try:
+            timestamp = pd.Timestamp(value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"{value!r} is not a timestamp: {e}")
+        # A TIMESTAMP column would silently drop the offset
+        if sql_type == SQL_TIMESTAMP and timestamp.tzinfo is not None:
+            raise ValueError(f"{value!r} has a UTC offset")
+        return timestamp.to_pydatetime()
+    if _is_bool(value):
+        raise ValueError(f"{value!r} is not a number")
+    if sql_type == SQL_BIGINT:
+        if isinstance(value, (int, np.integer)):
+            number = int(value)
+        elif isinstance(value, (float, np.floating)) and _is_whole(value):
+            number = int(value)
+        elif isinstance(value, str):
+            number = int(value.strip())
+        else:
+            raise ValueError(f"{value!r} is not an integer")
+        if not _INT64_MIN <= number <= _INT64_MAX:
+            raise ValueError(f"{value!r} is out of BIGINT range")
+        return number
+    if sql_type == SQL_DOUBLE:
+        try:
+            return float(value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"{value!r} is not a number: {e}")
+    raise ValueError(f"Unknown column type {sql_type}")
+
+
+def widen_sql_type(sql_type: str, value: Any) -> str:
+    """Narrowest type wider than sql_type that holds value"""
+    if sql_type == SQL_BIGINT:
+        try:
+            coerce_value(value, SQL_DOUBLE)
+            return SQL_DOUBLE
+        except ValueError:
+            pass
+    if sql_type == SQL_TIMESTAMP:
+        try:
+            coerce_value(value, SQL_TIMESTAMPTZ)
+            return SQL_TIMESTAMPTZ
+        except ValueError:
+            pass
+    return SQL_TEXT
+
+
+class ColumnTypes:
+    """Column types of one tabular ingestion, widened as batches arrive"""
+
+    def __init__(self):
+        self.types: Dict[str, str] = {}
+
+    def add(self, df: pd.DataFrame) -> Dict[str, str]:
+        """Infer types for the columns of df not seen before and return them"""
+        new_types = {
+            str(column): infer_sql_type(df[column])
+            for column in df.columns
+            if str(column) not in self.types
+        }
+        self.types.update(new_types)
+        return new_types
+
+    def coerce_row(self, row: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """
+        Typed values of one row, and the columns widened to fit it.
+
+        The caller must apply the widened types to the table before
+        inserting the values.
+        """
+        values: Dict[str, Any] = {}
+        widened: Dict[str, str] = {}
+        for column, value in row.items():
+            column = str(column)
+            sql_type = self.types.get(column, SQL_TEXT)
+            while True:
+                try:
+                    values[column] = coerce_value(value, sql_type)
+                    break
+                except ValueError:
+                    sql_type = widen_sql_type(sql_type, value)
+                    widened[column] = sql_type
+            self.types[column] = sql_type
+        return values, widened
+
+    def indexed_columns(self) -> List[str]:
+        return [column for column, sql_type in self.types.items() if sql_type in INDEXED_TYPES]
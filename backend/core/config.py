@@ -24,7 +24,17 @@ class Settings(BaseSettings):
     # Embedding Settings
     OLLAMA_HOST: str = "http://host.docker.internal:11434"
     EMBEDDING_MODEL: str = "nomic-embed-text"
-    
+    # 'per_collection' keeps one embeddings_collection_{id} table per collection,
+    # 'partitioned' stores every collection in one LIST-partitioned table
+    EMBEDDINGS_STORAGE_LAYOUT: str = "per_collection"
+    # Duplicate chunks reuse the vector of the original instead of being embedded:
+    # 'off', 'exact', 'simhash' or 'minhash'; scope 'collection' or 'global'.
+    # Near-duplicate methods also merge chunks that differ in a number or name.
+    DEDUP_METHOD: str = "off"
+    DEDUP_SCOPE: str = "collection"
+    DEDUP_SIMHASH_MAX_DISTANCE: int = 3
+    DEDUP_MINHASH_THRESHOLD: float = 0.9
+
     # MLflow
     MLFLOW_TRACKING_URI: str = "http://mlflow:5000"
     
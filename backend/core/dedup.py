@@ -0,0 +1,366 @@
+"""
+Near-duplicate elimination between chunking and embedding.
+
+PDF exports repeat headers, footers and disclaimers on every page and
+tabular files often contain repeated rows. Each chunk is fingerprinted before
+it is embedded; a chunk matching an earlier one copies the canonical row's
+vector (``duplicate_of`` = id of the canonical row) instead of costing
+another embed call, so it stays searchable.
+
+Methods:
+- exact: identical text after lowercasing and whitespace normalization
+- simhash: 64-bit SimHash over words and word pairs, duplicate within a Hamming distance
+- minhash: MinHash signatures of 3-word shingles with LSH banding, duplicate
+  above a Jaccard estimate
+
+Scopes:
+- collection: duplicates are looked up within the collection being ingested
+- global: additionally, chunks embedded by other collections with the same
+  embedding model are looked up in ``chunk_fingerprints``; on a match the
+  existing vector is copied instead of recomputed
+"""
+
+import hashlib
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEDUP_OFF = "off"
+DEDUP_EXACT = "exact"
+DEDUP_SIMHASH = "simhash"
+DEDUP_MINHASH = "minhash"
+
+SCOPE_COLLECTION = "collection"
+SCOPE_GLOBAL = "global"
+
+FINGERPRINTS_TABLE = "chunk_fingerprints"
+
+SHINGLE_WORDS = 3
+# 16-bit bands: fingerprints within 3 bits always share a band, so larger
+# distances may miss candidates
+SIMHASH_BANDS = 4
+MINHASH_PERMUTATIONS = 128
+MINHASH_BANDS = 32
+
+_WHITESPACE = re.compile(r"\s+")
+
+FINGERPRINTS_DDL = f"""
+CREATE TABLE IF NOT EXISTS {FINGERPRINTS_TABLE} (
+    collection_id INTEGER NOT NULL,
+    row_id BIGINT NOT NULL,
+    table_name TEXT NOT NULL,
+    embedding_model TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    simhash BIGINT,
+    band0 INTEGER,
+    band1 INTEGER,
+    band2 INTEGER,
+    band3 INTEGER,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (collection_id, row_id)
+);
+CREATE INDEX IF NOT EXISTS idx_{FINGERPRINTS_TABLE}_hash ON {FINGERPRINTS_TABLE} (embedding_model, content_hash);
+CREATE INDEX IF NOT EXISTS idx_{FINGERPRINTS_TABLE}_band0 ON {FINGERPRINTS_TABLE} (embedding_model, band0);
+CREATE INDEX IF NOT EXISTS idx_{FINGERPRINTS_TABLE}_band1 ON {FINGERPRINTS_TABLE} (embedding_model, band1);
+CREATE INDEX IF NOT EXISTS idx_{FINGERPRINTS_TABLE}_band2 ON {FINGERPRINTS_TABLE} (embedding_model, band2);
+CREATE INDEX IF NOT EXISTS idx_{FINGERPRINTS_TABLE}_band3 ON {FINGERPRINTS_TABLE} (embedding_model, band3);
+"""
+
+
+@dataclass
+class DedupConfig:
+    """Deduplication settings for one ingestion"""
+    method: str = DEDUP_OFF
+    scope: str = SCOPE_COLLECTION
+    simhash_max_distance: int = 3
+    minhash_threshold: float = 0.9
+
+    @property
+    def enabled(self) -> bool:
+        return self.method != DEDUP_OFF
+
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+def content_hash(normalized: str) -> str:
+    return hashlib.sha256(normalized.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8", "surrogatepass"), digest_size=8).digest(), "little")
+
+
+def shingles(normalized: str, size: int = SHINGLE_WORDS) -> List[str]:
+    """Overlapping word n-grams; short texts form a single shingle"""
+    words = normalized.split(" ")
+    if len(words) <= size:
+        return [normalized]
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def simhash(normalized: str) -> int:
+    """
+    64-bit SimHash over words and word pairs.
+
+    Unigram and bigram features keep the fingerprint stable on chunk-sized
+    texts, where longer shingles let a single edited word flip many bits.
+    """
+    features = normalized.split(" ")
+    features += [f"{a} {b}" for a, b in zip(features, features[1:])]
+    hashes = np.array([_hash64(f) for f in features], dtype=np.uint64)
+    bits = (hashes[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)
+    votes = bits.sum(axis=0).astype(np.int64) * 2 - len(hashes)
+    return sum(1 << int(i) for i in np.flatnonzero(votes > 0))
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def simhash_bands(value: int) -> List[int]:
+    return [(value >> (16 * i)) & 0xFFFF for i in range(SIMHASH_BANDS)]
+
+
+def to_signed64(value: int) -> int:
+    """Store an unsigned 64-bit fingerprint in a BIGINT column"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+class MinHasher:
+    """MinHash signatures using multiply-shift hashing over 64-bit shingle hashes"""
+
+    def __init__(self, num_perm: int = MINHASH_PERMUTATIONS, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64)
+
+    def signature(self, normalized: str) -> np.ndarray:
+        hashes = np.array([_hash64(s) for s in set(shingles(normalized))], dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) >> np.uint64(32)
+        return permuted.min(axis=1)
+
+    @staticmethod
+    def jaccard(a: np.ndarray, b: np.ndarray) -> float:
+        return float(np.mean(a == b))
+
+
+class ChunkDeduplicator:
+    """
+    In-memory index of canonical chunks for one ingestion.
+
+    find() returns the key of an earlier near-duplicate; add() registers a
+    canonical chunk under a key (usually its row id).
+    """
+
+    def __init__(self, config: DedupConfig):
+        self.config = config
+        self._exact: Dict[str, Any] = {}
+        self._simhash_bands: List[Dict[int, List[Tuple[int, Any]]]] = [{} for _ in range(SIMHASH_BANDS)]
+        self._minhasher = MinHasher() if config.method == DEDUP_MINHASH else None
+        self._minhash_buckets: Dict[Tuple[int, bytes], List[Any]] = {}
+        self._signatures: Dict[Any, np.ndarray] = {}
+
+    def fingerprint(self, text: str) -> "Fingerprint":
+        normalized = normalize_text(text)
+        fingerprint = Fingerprint(normalized=normalized, content_hash=content_hash(normalized))
+        if self.config.method == DEDUP_SIMHASH or self.config.scope == SCOPE_GLOBAL:
+            fingerprint.simhash = simhash(normalized)
+        if self._minhasher is not None:
+            fingerprint.minhash = self._minhasher.signature(normalized)
+        return fingerprint
+
+    def _minhash_band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        rows = self._minhasher.num_perm // MINHASH_BANDS
+        return [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(MINHASH_BANDS)]
+
+    def find(self, fingerprint: "Fingerprint") -> Optional[Any]:
+        key = self._exact.get(fingerprint.content_hash)
+        if key is not None or self.config.method == DEDUP_EXACT:
+            return key
+
+        if self.config.method == DEDUP_SIMHASH:
+            for band, bucket in zip(simhash_bands(fingerprint.simhash), self._simhash_bands):
+                for candidate, key in bucket.get(band, ()):
+                    if hamming_distance(candidate, fingerprint.simhash) <= self.config.simhash_max_distance:
+                        return key
+
+        if self.config.method == DEDUP_MINHASH:
+            seen = set()
+            for band_key in self._minhash_band_keys(fingerprint.minhash):
+                for key in self._minhash_buckets.get(band_key, ()):
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    if MinHasher.jaccard(self._signatures[key], fingerprint.minhash) >= self.config.minhash_threshold:
+                        return key
+        return None
+
+    def add(self, fingerprint: "Fingerprint", key: Any) -> None:
+        self._exact.setdefault(fingerprint.content_hash, key)
+        if self.config.method == DEDUP_SIMHASH:
+            for band, bucket in zip(simhash_bands(fingerprint.simhash), self._simhash_bands):
+                bucket.setdefault(band, []).append((fingerprint.simhash, key))
+        elif self.config.method == DEDUP_MINHASH:
+            self._signatures[key] = fingerprint.minhash
+            for band_key in self._minhash_band_keys(fingerprint.minhash):
+                self._minhash_buckets.setdefault(band_key, []).append(key)
+
+
+@dataclass
+class Fingerprint:
+    normalized: str
+    content_hash: str
+    simhash: Optional[int] = None
+    minhash: Optional[np.ndarray] = None
+
+
+@dataclass
+class DedupDecision:
+    """How a chunk is stored: embedded, referenced or with a copied vector"""
+    fingerprint: Fingerprint
+    duplicate_of: Optional[int] = None
+    copied_embedding: Optional[str] = None
+
+    @property
+    def is_duplicate(self) -> bool:
+        return self.duplicate_of is not None
+
+
+@dataclass
+class DedupSession:
+    """
+    Deduplication state of one collection ingestion.
+
+    All database methods take an open cursor on the embeddings database; the
+    caller owns the transaction.
+    """
+    config: DedupConfig
+    collection_id: int
+    table_name: str
+    embedding_model: str
+    checked: int = 0
+    duplicates: int = 0
+    copied: int = 0
+    deduplicator: ChunkDeduplicator = field(init=False)
+
+    def __post_init__(self):
+        self.deduplicator = ChunkDeduplicator(self.config)
+
+    @property
+    def is_global(self) -> bool:
+        return self.config.scope == SCOPE_GLOBAL
+
+    def prepare(self, cur) -> None:
+        """Create the fingerprint table and forget fingerprints of a previous run"""
+        if not self.is_global:
+            return
+        cur.execute(FINGERPRINTS_DDL)
+        cur.execute(f"DELETE FROM {FINGERPRINTS_TABLE} WHERE collection_id = %s", (self.collection_id,))
+
+    def resolve(self, cur, text: str) -> DedupDecision:
+        self.checked += 1
+        fingerprint = self.deduplicator.fingerprint(text)
+        decision = DedupDecision(fingerprint=fingerprint)
+
+        canonical = self.deduplicator.find(fingerprint)
+        if canonical is not None:
+            decision.duplicate_of = canonical
+            self.duplicates += 1
+        elif self.is_global:
+            decision.copied_embedding = self._find_global_embedding(cur, fingerprint)
+            if decision.copied_embedding is not None:
+                self.copied += 1
+        return decision
+
+    def register(self, cur, decision: DedupDecision, row_id: int) -> None:
+        """Record a row that carries a vector as canonical for later chunks"""
+        if decision.is_duplicate:
+            return
+        self.deduplicator.add(decision.fingerprint, row_id)
+        if not self.is_global:
+            return
+
+        fingerprint = decision.fingerprint
+        value = fingerprint.simhash
+        bands = simhash_bands(value)
+        cur.execute(
+            f"""
+            INSERT INTO {FINGERPRINTS_TABLE} (
+                collection_id, row_id, table_name, embedding_model, content_hash,
+                simhash, band0, band1, band2, band3
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (collection_id, row_id) DO NOTHING
+            """,
+            (self.collection_id, row_id, self.table_name, self.embedding_model, fingerprint.content_hash,
+             to_signed64(value), *bands)
+        )
+
+    def _find_global_embedding(self, cur, fingerprint: Fingerprint) -> Optional[str]:
+        """Vector of a matching chunk in another collection, as pgvector text"""
+        cur.execute(
+            f"""
+            SELECT collection_id, row_id, table_name FROM {FINGERPRINTS_TABLE}
+            WHERE embedding_model = %s AND content_hash = %s AND collection_id <> %s
+            LIMIT 1
+            """,
+            (self.embedding_model, fingerprint.content_hash, self.collection_id)
+        )
+        match = cur.fetchone()
+
+        if match is None and self.config.method == DEDUP_SIMHASH:
+            bands = simhash_bands(fingerprint.simhash)
+            cur.execute(
+                f"""
+                SELECT collection_id, row_id, table_name, simhash FROM {FINGERPRINTS_TABLE}
+                WHERE embedding_model = %s AND collection_id <> %s
+                AND (band0 = %s OR band1 = %s OR band2 = %s OR band3 = %s)
+                LIMIT 200
+                """,
+                (self.embedding_model, self.collection_id, *bands)
+            )
+            for collection_id, row_id, table_name, candidate in cur.fetchall():
+                if hamming_distance(candidate & ((1 << 64) - 1), fingerprint.simhash) <= self.config.simhash_max_distance:
+                    match = (collection_id, row_id, table_name)
+                    break
+
+        if match is None:
+            return None
+
+        collection_id, row_id, table_name = match[:3]
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (table_name,))
+        if not cur.fetchone()[0]:
+            # The table was dropped (collection deleted or migrated away); not a match
+            cur.execute(f"DELETE FROM {FINGERPRINTS_TABLE} WHERE table_name = %s", (table_name,))
+            return None
+        cur.execute(
+            f"SELECT embedding::text FROM {table_name} WHERE collection_id = %s AND id = %s AND embedding IS NOT NULL",
+            (collection_id, row_id)
+        )
+        row = cur.fetchone()
+        if row is None:
+            # The source collection was deleted or re-ingested
+            cur.execute(
+                f"DELETE FROM {FINGERPRINTS_TABLE} WHERE collection_id = %s AND row_id = %s",
+                (collection_id, row_id)
+            )
+            return None
+        return row[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "method": self.config.method,
+            "scope": self.config.scope,
+            "checked_chunks": self.checked,
+            "duplicates": self.duplicates,
+            "copied_embeddings": self.copied,
+            "embed_calls_saved": self.duplicates + self.copied,
+        }
@@ -0,0 +1,256 @@
+"""
+Cache of parsed documents and chunk lists, keyed by file content.
+
+Upload validation, collection preview and ingestion all parse and chunk the
+same file; for long PDFs that is seconds of CPU each time. Results are keyed
+by the SHA-256 of the file (plus the chunking method and config for chunk
+lists), so renamed or re-uploaded copies hit the cache and a changed file
+never does.
+
+Two tiers, both LRU with a size limit:
+- memory: most recently used entries in this process
+- disk: pickles under DOCUMENT_CACHE_DIR, shared by API and worker processes
+
+Environment overrides:
+- DOCUMENT_CACHE_DIR: disk location (default: uploads/.cache)
+- DOCUMENT_CACHE_MEMORY_MB: memory budget (default 256, 0 disables the tier)
+- DOCUMENT_CACHE_DISK_MB: disk budget (default 2048, 0 disables the tier)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.document_parser import DocumentParser, ParsedDocument
+from core.text_chunking import Chunk, ChunkingMethod, TextChunker, get_text_chunker
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_CACHE_DIR = os.getenv("DOCUMENT_CACHE_DIR", os.path.join("uploads", ".cache"))
+DOCUMENT_CACHE_MEMORY_MB = int(os.getenv("DOCUMENT_CACHE_MEMORY_MB", 256))
+DOCUMENT_CACHE_DISK_MB = int(os.getenv("DOCUMENT_CACHE_DISK_MB", 2048))
+
+# Bump when ParsedDocument, Chunk or the parsers change what they produce
+CACHE_VERSION = 2
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class DocumentCache:
+    """Two-tier LRU of pickled values with byte budgets"""
+
+    def __init__(self, cache_dir: str, memory_bytes: int, disk_bytes: int):
+        self.cache_dir = cache_dir
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._memory_used = 0
+        # (path, size, mtime) -> sha256, so unchanged files are hashed once
+        self._digests: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def file_digest(self, file_path: str) -> str:
+        stat = os.stat(file_path)
+        key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._digests.get(key)
+        if digest is not None:
+            return digest
+
+        sha = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                sha.update(block)
+        digest = sha.hexdigest()
+        with self._lock:
+            self._digests[key] = digest
+            while len(self._digests) > 1024:
+                self._digests.popitem(last=False)
+        return digest
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pickle")
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        if self.disk_bytes > 0:
+            path = self._disk_path(key)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                value = pickle.loads(data)
+                os.utime(path)
+            except FileNotFoundError:
+                value = None
+            except Exception as e:
+                logger.warning(f"Dropping unreadable document cache entry {key}: {e}")
+                self._remove(path)
+                value = None
+            if value is not None:
+                self._remember(key, value, len(data))
+                with self._lock:
+                    self.hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: Any) -> None:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._remember(key, value, len(data))
+        if 0 < len(data) <= self.disk_bytes:
+            try:
+                self._write_disk(key, data)
+            except OSError as e:
+                logger.warning(f"Could not write document cache entry {key}: {e}")
+
+    def _remember(self, key: str, value: Any, size: int) -> None:
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_used -= previous[1]
+            self._memory[key] = (value, size)
+            self._memory_used += size
+            while self._memory_used > self.memory_bytes:
+                _, (_, evicted) = self._memory.popitem(last=False)
+                self._memory_used -= evicted
+
+    def _write_disk(self, key: str, data: bytes) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._disk_path(key))
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        """Delete least recently used files until the disk budget is met"""
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".pickle"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        used = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if used <= self.disk_bytes:
+                break
+            self._remove(path)
+            used -= size
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_used = 0
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".pickle"):
+                    self._remove(os.path.join(self.cache_dir, name))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_used,
+            }
+
+
+def chunking_key(method: ChunkingMethod, config: Optional[Dict[str, Any]]) -> str:
+    """Stable digest of a chunking method and config"""
+    payload = json.dumps([method.value, config or {}], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+document_cache = DocumentCache(
+    DOCUMENT_CACHE_DIR,
+    memory_bytes=DOCUMENT_CACHE_MEMORY_MB * 1024 * 1024,
+    disk_bytes=DOCUMENT_CACHE_DISK_MB * 1024 * 1024
+)
+
+
+def _cached(key: str, compute: Callable[[], Any], cache: DocumentCache) -> Any:
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.put(key, value)
+    return value
+
+
+def get_parsed_document(
+    file_path: str,
+    parser: Optional[DocumentParser] = None,
+    cache: DocumentCache = document_cache
+) -> ParsedDocument:
+    """DocumentParser.parse() through the cache"""
+    digest = cache.file_digest(file_path)
+    key = f"v{CACHE_VERSION}-{digest}-parsed"
+    return _cached(key, lambda: (parser or DocumentParser()).parse(file_path), cache)
+
+
+def get_document_chunks(
+    file_path: str,
+    method: ChunkingMethod,
+    config: Optional[Dict[str, Any]] = None,
+    parser: Optional[DocumentParser] = None,
+    chunker: Optional[TextChunker] = None,
+    cache: DocumentCache = document_cache
+) -> Tuple[ParsedDocument, List[Chunk]]:
+    """Parsed document and its chunks for a chunking configuration, through the cache"""
+    parsed = get_parsed_document(file_path, parser=parser, cache=cache)
+    key = f"v{CACHE_VERSION}-{cache.file_digest(file_path)}-chunks-{chunking_key(method, config)}"
+
+    def compute() -> List[Chunk]:
+        chunks = (chunker or get_text_chunker()).chunk(parsed.content, method=method, config=config)
+        if parsed.element_map is not None:
+            # Pages, section and tables of each chunk, shown in the preview
+            chunks = list(parsed.element_map.annotate(chunks))
+        return chunks
+
+    return parsed, _cached(key, compute, cache)
+
+
+def peek_document_chunks(
+    file_path: str,
+    method: ChunkingMethod,
+    config: Optional[Dict[str, Any]] = None,
+    cache: DocumentCache = document_cache
+) -> Optional[Tuple[ParsedDocument, List[Chunk]]]:
+    """Cached parse and chunks if both are present, without computing anything"""
+    digest = cache.file_digest(file_path)
+    parsed = cache.get(f"v{CACHE_VERSION}-{digest}-parsed")
+    if parsed is None:
+        return None
+    chunks = cache.get(f"v{CACHE_VERSION}-{digest}-chunks-{chunking_key(method, config)}")
+    if chunks is None:
+        return None
+    return parsed, chunks
@@ -5,15 +5,36 @@ Supported formats:
 - TXT (plain text)
 - PDF (using pypdf)
 - DOCX (using python-docx)
+- HTML (standard library html.parser, fed incrementally)
+- Markdown (split at headings)
 """
 
+import codecs
+import mmap
 import os
 import logging
-from typing import Optional, Dict, Any
-from dataclasses import dataclass
+import re
+import signal
+import threading
+from html.parser import HTMLParser
+from bisect import bisect_right
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Tuple
+from dataclasses import dataclass, field
+
+from core.parallel import PARALLEL_PDF_MIN_PAGES, PARALLEL_WORKERS, get_timeout_pool, map_ordered, parallel_enabled
 
 logger = logging.getLogger(__name__)
 
+# Bytes decoded per step when reading text files through mmap
+TXT_DECODE_WINDOW_BYTES = 64 * 1024
+# Leading bytes inspected to pick a text encoding
+ENCODING_SAMPLE_BYTES = 1024 * 1024
+
+# Pages taking longer than this to extract (scans, broken content streams)
+# are skipped; 0 disables the limit
+PDF_PAGE_TIMEOUT_SECONDS = float(os.getenv("PDF_PAGE_TIMEOUT_SECONDS", 30))
+
 
 @dataclass
 class ParsedDocument:
@@ -23,12 +44,285 @@ class ParsedDocument:
     page_count: Optional[int] = None
     word_count: int = 0
     char_count: int = 0
+    # Where each structural element starts in content (PDF, DOCX, HTML, Markdown)
+    element_map: Optional["ElementMap"] = None
+
+
+@dataclass
+class DocumentElement:
+    """
+    One structural piece of a document, in reading order.
+    
+    element_type is 'page' (PDF), 'heading', 'paragraph' or 'table' (DOCX),
+    'section' (HTML, Markdown) or 'text' (TXT blocks). heading_path holds the
+    titles of the enclosing headings, outermost first.
+    """
+    text: str
+    element_type: str
+    heading_path: Tuple[str, ...] = ()
+    page_number: Optional[int] = None
+    table_id: Optional[int] = None
+
+
+@dataclass
+class _ElementPosition:
+    element_type: str
+    heading_path: Tuple[str, ...]
+    page_number: Optional[int]
+    table_id: Optional[int]
+
+
+@dataclass
+class ElementMap:
+    """
+    Character offsets at which each structural element starts in a document.
+    
+    Filled by iter_segments() as segments are produced, so a chunk can be
+    mapped to its pages, section and tables as soon as the chunker emits it.
+    Element text is not kept.
+    """
+    starts: List[int] = field(default_factory=list)
+    positions: List[_ElementPosition] = field(default_factory=list)
+    
+    def add(self, offset: int, element: DocumentElement) -> None:
+        self.starts.append(offset)
+        self.positions.append(_ElementPosition(
+            element.element_type, tuple(element.heading_path), element.page_number, element.table_id
+        ))
+    
+    def chunk_metadata(self, start_char: int, end_char: int) -> Dict[str, Any]:
+        """
+        Structure of the text in [start_char, end_char).
+        
+        ``page_start`` / ``page_end``, ``heading_path`` and ``section`` (the
+        innermost heading) at the chunk start, ``table_ids`` and
+        ``element_types`` of every element the chunk overlaps. Empty for
+        documents without structure.
+        """
+        if not self.starts:
+            return {}
+        first = max(bisect_right(self.starts, start_char) - 1, 0)
+        last = max(bisect_right(self.starts, max(start_char, end_char - 1)) - 1, first)
+        covered = self.positions[first:last + 1]
+        
+        metadata: Dict[str, Any] = {}
+        pages = [p.page_number for p in covered if p.page_number is not None]
+        if pages:
+            metadata['page_start'] = min(pages)
+            metadata['page_end'] = max(pages)
+        heading_path = covered[0].heading_path
+        if heading_path:
+            metadata['heading_path'] = list(heading_path)
+            metadata['section'] = heading_path[-1]
+        table_ids = sorted({p.table_id for p in covered if p.table_id is not None})
+        if table_ids:
+            metadata['table_ids'] = table_ids
+        metadata['element_types'] = sorted({p.element_type for p in covered})
+        return metadata
+    
+    def annotate(self, chunks: Iterable[Any]) -> Iterator[Any]:
+        """Add chunk_metadata() to the metadata of each chunk as it passes through"""
+        for chunk in chunks:
+            chunk.metadata.update(self.chunk_metadata(chunk.start_char, chunk.end_char))
+            yield chunk
+
+
+class TextStats:
+    """
+    Word and character counts of a text read as a stream of segments.
+    
+    Counts match len(content.split()) and len(content) of the joined text,
+    including words that straddle two segments.
+    """
+    
+    def __init__(self):
+        self.word_count = 0
+        self.char_count = 0
+        self.segment_count = 0
+        self._in_word = False
+    
+    def add(self, segment: str) -> None:
+        if not segment:
+            return
+        words = len(segment.split())
+        if words and self._in_word and not segment[0].isspace():
+            words -= 1
+        self.word_count += words
+        self.char_count += len(segment)
+        self.segment_count += 1
+        self._in_word = not segment[-1].isspace()
+    
+    def track(self, segments: Iterable[str]) -> Iterator[str]:
+        """Count segments as they pass through"""
+        for segment in segments:
+            self.add(segment)
+            yield segment
+
+
+class PageTimeout(Exception):
+    pass
+
+
+def detect_encoding(sample: bytes, complete: bool = False) -> str:
+    """
+    Pick the encoding of a text file from its leading bytes.
+    
+    A BOM decides directly; otherwise the sample must decode as UTF-8, then
+    cp1252, with latin-1 (which decodes anything) as the last resort.
+    complete tells whether the sample is the whole file, so a multi-byte
+    sequence cut off at the end of a partial sample is not an error.
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    for encoding in ('utf-8', 'cp1252'):
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=complete)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1'
+
+
+HTML_EXTENSIONS = {'html', 'htm'}
+MARKDOWN_EXTENSIONS = {'md', 'markdown'}
+
+_MARKDOWN_HEADING = re.compile(r'^ {0,3}#{1,6}(\s|$)')
+_MARKDOWN_FENCE = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+_HTML_WHITESPACE = re.compile(r'\s+')
+
+
+def _push_heading(headings: List[Tuple[int, str]], level: int, title: str) -> None:
+    """Make title the innermost heading, closing headings of the same or a deeper level"""
+    while headings and headings[-1][0] >= level:
+        headings.pop()
+    headings.append((level, title))
+
+
+class _HTMLSectionParser(HTMLParser):
+    """
+    Collects the visible text of an HTML document as sections.
+    
+    Block elements become lines, table cells are joined with ' | ' and every
+    heading starts a new section. Completed sections accumulate in
+    ``sections`` as (heading_path, text) while the document is fed in pieces.
+    """
+    
+    HEADINGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+    BLOCKS = HEADINGS | {
+        'p', 'div', 'li', 'tr', 'br', 'hr', 'pre', 'blockquote', 'section', 'article',
+        'header', 'footer', 'main', 'aside', 'nav', 'table', 'ul', 'ol', 'dl', 'dt', 'dd',
+        'figcaption', 'title'
+    }
+    CELLS = {'td', 'th'}
+    SKIPPED = {'script', 'style', 'noscript', 'template', 'svg'}
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.sections: List[Tuple[Tuple[str, ...], str]] = []
+        self._lines: List[str] = []
+        self._text: List[str] = []
+        self._skip_depth = 0
+        # (level, title) of the enclosing headings
+        self._headings: List[Tuple[int, str]] = []
+    
+    def _flush_line(self) -> str:
+        line = _HTML_WHITESPACE.sub(' ', ''.join(self._text)).strip(' |')
+        self._text = []
+        if line:
+            self._lines.append(line)
+        return line
+    
+    def _flush_section(self) -> None:
+        self._flush_line()
+        if self._lines:
+            heading_path = tuple(title for _, title in self._headings)
+            self.sections.append((heading_path, '\n'.join(self._lines)))
+        self._lines = []
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED:
+            self._skip_depth += 1
+        elif tag in self.HEADINGS:
+            self._flush_section()
+        elif tag in self.BLOCKS:
+            self._flush_line()
+        elif tag in self.CELLS and self._text:
+            self._text.append(' | ')
+    
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self.HEADINGS:
+            title = self._flush_line()
+            if title:
+                _push_heading(self._headings, int(tag[1]), title)
+        elif tag in self.BLOCKS:
+            self._flush_line()
+    
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._text.append(data)
+    
+    def close(self):
+        super().close()
+        self._flush_section()
+
+
+@contextmanager
+def _page_timeout(seconds: float):
+    """
+    Raise PageTimeout if the block runs longer than seconds.
+    
+    Uses SIGALRM, so the limit only applies on the main thread of a process;
+    iter_pdf_pages therefore runs page extraction in pool workers whenever a
+    timeout is set. Elsewhere the block runs unbounded.
+    """
+    if seconds <= 0 or not hasattr(signal, 'SIGALRM') or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    
+    def on_timeout(signum, frame):
+        raise PageTimeout(f"page extraction exceeded {seconds:g}s")
+    
+    previous = signal.signal(signal.SIGALRM, on_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _extract_pdf_pages(job: Tuple[str, int, int]) -> List[str]:
+    """
+    Extract the text of pages [start, end) of a PDF ('' for pages that fail
+    or exceed PDF_PAGE_TIMEOUT_SECONDS).
+    
+    Module-level so it can run in the document process pool; every call
+    opens its own reader.
+    """
+    import pypdf
+    
+    file_path, start, end = job
+    texts = []
+    with open(file_path, 'rb') as f:
+        reader = pypdf.PdfReader(f)
+        for page_num in range(start, end):
+            try:
+                with _page_timeout(PDF_PAGE_TIMEOUT_SECONDS):
+                    texts.append(reader.pages[page_num].extract_text() or '')
+            except Exception as e:
+                logger.warning(f"Failed to extract text from page {page_num + 1}: {e}")
+                texts.append('')
+    return texts
 
 
 class DocumentParser:
     """Service for parsing various document formats into plain text"""
     
-    SUPPORTED_EXTENSIONS = {'txt', 'pdf', 'docx'}
+    SUPPORTED_EXTENSIONS = {'txt', 'pdf', 'docx'} | HTML_EXTENSIONS | MARKDOWN_EXTENSIONS
     
     def __init__(self):
         self._check_dependencies()
@@ -92,32 +386,306 @@ class DocumentParser:
             if not self.has_docx:
                 raise ValueError("DOCX parsing requires python-docx. Install it with: pip install python-docx")
             return self._parse_docx(file_path)
+        elif ext in HTML_EXTENSIONS or ext in MARKDOWN_EXTENSIONS:
+            return self._parse_sections(file_path, ext)
         else:
             raise ValueError(f"Unsupported file format: {ext}")
     
-    def _parse_txt(self, file_path: str) -> ParsedDocument:
-        """Parse a plain text file"""
-        logger.info(f"Parsing TXT file: {file_path}")
+    def describe(self, file_path: str, stats: Optional[TextStats] = None) -> ParsedDocument:
+        """
+        Metadata of a document without extracting its text.
+        
+        Returns a ParsedDocument with empty content: format, file size and
+        format metadata (PDF info and page count, DOCX core properties). With
+        the stats of a streamed pass over iter_segments(), word and character
+        counts (and the section count of HTML / Markdown) are filled in too,
+        so ingestion can record the same metadata as parse() from the one
+        pass it makes anyway.
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+        
+        ext = self.get_file_extension(file_path)
+        page_count = None
+        metadata: Dict[str, Any] = {'file_size': os.path.getsize(file_path)}
+        if ext == 'txt':
+            metadata = {'format': 'txt', 'encoding': self._detect_txt_encoding(file_path), **metadata}
+        elif ext == 'pdf':
+            page_count, pdf_metadata = self._pdf_info(file_path)
+            metadata = {'format': 'pdf', **metadata, **pdf_metadata}
+        elif ext == 'docx':
+            metadata = {'format': 'docx', **metadata, **self._docx_metadata(self._open_docx(file_path))}
+        elif ext in HTML_EXTENSIONS or ext in MARKDOWN_EXTENSIONS:
+            metadata = {'format': 'html' if ext in HTML_EXTENSIONS else 'markdown', **metadata}
+            if stats is not None:
+                metadata['section_count'] = stats.segment_count
+        else:
+            raise ValueError(f"Unsupported file format: {ext}")
+        
+        return ParsedDocument(
+            content='',
+            metadata=metadata,
+            page_count=page_count,
+            word_count=stats.word_count if stats else 0,
+            char_count=stats.char_count if stats else 0
+        )
+    
+    def iter_elements(self, file_path: str) -> Iterator[DocumentElement]:
+        """
+        Yield the document as structural elements in reading order.
         
-        # Try different encodings
-        encodings = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']
-        content = None
-        used_encoding = None
+        PDFs are yielded as pages, DOCX as headings, paragraphs and tables in
+        body order, HTML and Markdown as heading sections (with the path of
+        enclosing headings) and TXT as undifferentiated text blocks.
         
-        for encoding in encodings:
+        Raises:
+            ValueError: If file format is not supported
+            FileNotFoundError: If file does not exist
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+        
+        ext = self.get_file_extension(file_path)
+        
+        if ext == 'txt':
+            return (DocumentElement(block, 'text') for block in self._iter_txt_blocks(file_path))
+        elif ext == 'pdf':
+            if not self.has_pypdf:
+                raise ValueError("PDF parsing requires pypdf. Install it with: pip install pypdf")
+            return (
+                DocumentElement(text, 'page', page_number=page_number)
+                for page_number, text in self.iter_pdf_pages(file_path)
+            )
+        elif ext == 'docx':
+            if not self.has_docx:
+                raise ValueError("DOCX parsing requires python-docx. Install it with: pip install python-docx")
+            return self._iter_docx_elements(self._open_docx(file_path))
+        elif ext in HTML_EXTENSIONS:
+            sections = self._iter_html_sections(file_path)
+        elif ext in MARKDOWN_EXTENSIONS:
+            sections = self._iter_markdown_sections(file_path)
+        else:
+            raise ValueError(f"Unsupported file format: {ext}")
+        return (DocumentElement(text, 'section', heading_path) for heading_path, text in sections)
+    
+    def iter_segments(self, file_path: str, element_map: Optional[ElementMap] = None) -> Iterator[str]:
+        """
+        Yield the document text in pieces instead of one string.
+        
+        Joining the segments gives exactly the content returned by parse(), so
+        chunk offsets computed from a stream match the parsed document. Each
+        segment is one element of iter_elements().
+        
+        Args:
+            file_path: Path to the document file
+            element_map: Filled with the offset of every structural element
+                (not TXT blocks) as it is yielded
+        
+        Raises:
+            ValueError: If file format is not supported
+            FileNotFoundError: If file does not exist
+        """
+        separator = '' if self.get_file_extension(file_path) == 'txt' else '\n\n'
+        yield from self._join_elements(self.iter_elements(file_path), separator, element_map)
+    
+    @staticmethod
+    def _join_elements(
+        elements: Iterable[DocumentElement],
+        separator: str,
+        element_map: Optional[ElementMap] = None
+    ) -> Iterator[str]:
+        offset = 0
+        for element in elements:
+            segment = element.text if offset == 0 else separator + element.text
+            if element_map is not None and element.element_type != 'text':
+                element_map.add(offset + len(segment) - len(element.text), element)
+            offset += len(segment)
+            yield segment
+    
+    def _detect_txt_encoding(self, file_path: str) -> str:
+        """Encoding of a text file, judged from its first ENCODING_SAMPLE_BYTES"""
+        with open(file_path, 'rb') as f:
+            sample = f.read(ENCODING_SAMPLE_BYTES)
+            complete = not f.read(1)
+        return detect_encoding(sample, complete=complete)
+    
+    def _iter_txt_blocks(self, file_path: str, encoding: Optional[str] = None) -> Iterator[str]:
+        """
+        Decode a text file in one pass over a memory map.
+        
+        Only one TXT_DECODE_WINDOW_BYTES window is decoded at a time; bytes
+        that do not decode in the detected encoding become U+FFFD. Line
+        endings are translated to '\n' like text-mode open() does.
+        """
+        encoding = encoding or self._detect_txt_encoding(file_path)
+        size = os.path.getsize(file_path)
+        if size == 0:
+            return
+        
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        pending_cr = False
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for start in range(0, size, TXT_DECODE_WINDOW_BYTES):
+                final = start + TXT_DECODE_WINDOW_BYTES >= size
+                block = decoder.decode(mapped[start:start + TXT_DECODE_WINDOW_BYTES], final=final)
+                if pending_cr:
+                    block = '\r' + block
+                # A '\r' at the end of a window may be the first half of '\r\n'
+                pending_cr = not final and block.endswith('\r')
+                if pending_cr:
+                    block = block[:-1]
+                block = block.replace('\r\n', '\n').replace('\r', '\n')
+                if block:
+                    yield block
+
+    def iter_pdf_pages(self, file_path: str) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (page_number, text) for every non-empty PDF page, in page order.
+        
+        Pages are extracted lazily in ranges, so only the ranges in flight are
+        held in memory. Large PDFs fan the ranges out across the document
+        process pool; results are still yielded in order as ranges complete.
+        With PDF_PAGE_TIMEOUT_SECONDS set, smaller PDFs are also extracted in
+        a pool worker (one range at a time), since the per-page timeout
+        cannot fire on the thread ingestion runs on.
+        Page numbers are 1-based; pages that fail or time out are skipped.
+        """
+        import pypdf
+        
+        try:
+            with open(file_path, 'rb') as f:
+                page_count = len(pypdf.PdfReader(f).pages)
+            
+            workers = PARALLEL_WORKERS if parallel_enabled() and page_count >= PARALLEL_PDF_MIN_PAGES else 1
+            pages_per_job = max(1, -(-page_count // (workers * 4)))
+            jobs = [
+                (file_path, start, min(start + pages_per_job, page_count))
+                for start in range(0, page_count, pages_per_job)
+            ]
+            if workers > 1:
+                results = map_ordered(_extract_pdf_pages, jobs)
+            elif PDF_PAGE_TIMEOUT_SECONDS > 0 and hasattr(signal, 'SIGALRM'):
+                results = map_ordered(_extract_pdf_pages, jobs, pool=get_timeout_pool(), window=1)
+            else:
+                results = (_extract_pdf_pages(job) for job in jobs)
+            for (_, start, _), texts in zip(jobs, results):
+                for page_number, text in enumerate(texts, start=start + 1):
+                    if text:
+                        yield page_number, text
+        except Exception as e:
+            logger.error(f"Error parsing PDF: {e}")
+            raise ValueError(f"Failed to parse PDF: {e}")
+    
+    def _iter_html_sections(self, file_path: str) -> Iterator[Tuple[Tuple[str, ...], str]]:
+        """Yield (heading_path, text) of each heading section, feeding the parser block by block"""
+        parser = _HTMLSectionParser()
+        for block in self._iter_txt_blocks(file_path):
+            parser.feed(block)
+            yield from parser.sections
+            parser.sections.clear()
+        parser.close()
+        yield from parser.sections
+    
+    def _iter_markdown_sections(self, file_path: str) -> Iterator[Tuple[Tuple[str, ...], str]]:
+        """Yield (heading_path, source) of each section, split before headings outside code fences"""
+        encoding = self._detect_txt_encoding(file_path)
+        lines: List[str] = []
+        headings: List[Tuple[int, str]] = []
+        heading_path: Tuple[str, ...] = ()
+        fence = None
+        with open(file_path, 'r', encoding=encoding, errors='replace') as f:
+            for line in f:
+                fence_match = _MARKDOWN_FENCE.match(line)
+                if fence_match:
+                    marker = fence_match.group(1)
+                    if fence is None:
+                        fence = marker
+                    elif marker[0] == fence[0] and len(marker) >= len(fence):
+                        fence = None
+                elif fence is None and _MARKDOWN_HEADING.match(line):
+                    section = ''.join(lines).strip()
+                    if section:
+                        yield heading_path, section
+                    lines = []
+                    marks = line.strip()
+                    level = len(marks) - len(marks.lstrip('#'))
+                    title = marks[level:].strip().rstrip('#').strip()
+                    if title:
+                        _push_heading(headings, level, title)
+                        heading_path = tuple(t for _, t in headings)
+                lines.append(line)
+        section = ''.join(lines).strip()
+        if section:
+            yield heading_path, section
+    
+    @staticmethod
+    def _open_docx(file_path: str):
+        import docx
+        
+        try:
+            return docx.Document(file_path)
+        except Exception as e:
+            logger.error(f"Error opening DOCX file: {e}")
+            raise ValueError(f"Failed to open DOCX file: {e}")
+    
+    @staticmethod
+    def _docx_heading_level(paragraph) -> Optional[int]:
+        """Outline level of a 'Title' / 'Heading N' paragraph, None for body text"""
+        name = paragraph.style.name if paragraph.style is not None else ''
+        if name == 'Title':
+            return 0
+        if name.startswith('Heading'):
             try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    content = f.read()
-                used_encoding = encoding
-                break
-            except UnicodeDecodeError:
+                return int(name.split()[-1])
+            except ValueError:
+                return 1
+        return None
+    
+    def _iter_docx_elements(self, doc) -> Iterator[DocumentElement]:
+        """
+        Yield headings, paragraphs and tables in body order.
+        
+        Tables are rendered as 'cell | cell' rows and numbered from 1 in the
+        order they appear, counting empty ones, so table_id matches doc.tables.
+        """
+        from docx.table import Table
+        
+        headings: List[Tuple[int, str]] = []
+        table_id = 0
+        for block in doc.iter_inner_content():
+            heading_path = tuple(title for _, title in headings)
+            if isinstance(block, Table):
+                table_id += 1
+                table_content = []
+                for row in block.rows:
+                    row_content = []
+                    for cell in row.cells:
+                        cell_text = cell.text.strip()
+                        if cell_text:
+                            row_content.append(cell_text)
+                    if row_content:
+                        table_content.append(' | '.join(row_content))
+                if table_content:
+                    yield DocumentElement('\n'.join(table_content), 'table', heading_path, table_id=table_id)
+                continue
+            
+            text = block.text.strip()
+            if not text:
                 continue
+            level = self._docx_heading_level(block)
+            if level is None:
+                yield DocumentElement(text, 'paragraph', heading_path)
+            else:
+                _push_heading(headings, level, text)
+                yield DocumentElement(text, 'heading', tuple(title for _, title in headings))
+    
+    def _parse_txt(self, file_path: str) -> ParsedDocument:
+        """Parse a plain text file"""
+        logger.info(f"Parsing TXT file: {file_path}")
         
-        if content is None:
-            # Fallback: read as bytes and decode with errors='ignore'
-            with open(file_path, 'rb') as f:
-                content = f.read().decode('utf-8', errors='ignore')
-            used_encoding = 'utf-8 (with errors ignored)'
+        # Detect the encoding on a sample, then decode the file once
+        used_encoding = self._detect_txt_encoding(file_path)
+        content = ''.join(self._iter_txt_blocks(file_path, encoding=used_encoding))
         
         word_count = len(content.split())
         char_count = len(content)
@@ -138,27 +706,38 @@ class DocumentParser:
         """Parse a PDF file"""
         logger.info(f"Parsing PDF file: {file_path}")
         
-        import pypdf
+        page_count, pdf_metadata = self._pdf_info(file_path)
         
-        content_parts = []
-        page_count = 0
+        element_map = ElementMap()
+        content = ''.join(self.iter_segments(file_path, element_map=element_map))
+        word_count = len(content.split())
+        char_count = len(content)
         
+        return ParsedDocument(
+            content=content,
+            metadata={
+                'format': 'pdf',
+                'file_size': os.path.getsize(file_path),
+                **pdf_metadata
+            },
+            page_count=page_count,
+            word_count=word_count,
+            char_count=char_count,
+            element_map=element_map
+        )
+    
+    @staticmethod
+    def _pdf_info(file_path: str) -> Tuple[int, Dict[str, Any]]:
+        """Page count and document info of a PDF"""
+        import pypdf
+        
+        pdf_metadata = {}
         try:
             with open(file_path, 'rb') as f:
                 reader = pypdf.PdfReader(f)
                 page_count = len(reader.pages)
                 
-                for page_num, page in enumerate(reader.pages):
-                    try:
-                        text = page.extract_text()
-                        if text:
-                            content_parts.append(text)
-                    except Exception as e:
-                        logger.warning(f"Failed to extract text from page {page_num + 1}: {e}")
-                        continue
-                
                 # Get metadata
-                pdf_metadata = {}
                 if reader.metadata:
                     for key in ['/Title', '/Author', '/Subject', '/Creator', '/Producer']:
                         if key in reader.metadata:
@@ -167,63 +746,38 @@ class DocumentParser:
         except Exception as e:
             logger.error(f"Error parsing PDF: {e}")
             raise ValueError(f"Failed to parse PDF: {e}")
+        return page_count, pdf_metadata
+    
+    def _parse_sections(self, file_path: str, ext: str) -> ParsedDocument:
+        """Parse an HTML or Markdown file from its section stream"""
+        logger.info(f"Parsing {ext.upper()} file: {file_path}")
         
-        content = '\n\n'.join(content_parts)
-        word_count = len(content.split())
-        char_count = len(content)
+        element_map = ElementMap()
+        segments = list(self.iter_segments(file_path, element_map=element_map))
+        content = ''.join(segments)
         
         return ParsedDocument(
             content=content,
             metadata={
-                'format': 'pdf',
+                'format': 'html' if ext in HTML_EXTENSIONS else 'markdown',
                 'file_size': os.path.getsize(file_path),
-                **pdf_metadata
+                'section_count': len(segments)
             },
-            page_count=page_count,
-            word_count=word_count,
-            char_count=char_count
+            page_count=None,
+            word_count=len(content.split()),
+            char_count=len(content),
+            element_map=element_map
         )
     
-    def _parse_docx(self, file_path: str) -> ParsedDocument:
-        """Parse a DOCX file"""
-        logger.info(f"Parsing DOCX file: {file_path}")
-        
-        import docx
-        
-        try:
-            doc = docx.Document(file_path)
-        except Exception as e:
-            logger.error(f"Error opening DOCX file: {e}")
-            raise ValueError(f"Failed to open DOCX file: {e}")
-        
-        content_parts = []
-        
-        # Extract paragraphs
-        for paragraph in doc.paragraphs:
-            text = paragraph.text.strip()
-            if text:
-                content_parts.append(text)
-        
-        # Extract tables
-        for table in doc.tables:
-            table_content = []
-            for row in table.rows:
-                row_content = []
-                for cell in row.cells:
-                    cell_text = cell.text.strip()
-                    if cell_text:
-                        row_content.append(cell_text)
-                if row_content:
-                    table_content.append(' | '.join(row_content))
-            if table_content:
-                content_parts.append('\n'.join(table_content))
-        
-        content = '\n\n'.join(content_parts)
-        word_count = len(content.split())
-        char_count = len(content)
+    @staticmethod
+    def _docx_metadata(doc) -> Dict[str, Any]:
+        """Paragraph / table counts and core properties of a DOCX document"""
+        doc_metadata = {
+            'paragraph_count': len(doc.paragraphs),
+            'table_count': len(doc.tables)
+        }
         
         # Get core properties
-        doc_metadata = {}
         try:
             core_props = doc.core_properties
             if core_props.title:
@@ -234,17 +788,27 @@ class DocumentParser:
                 doc_metadata['Subject'] = core_props.subject
         except Exception as e:
             logger.warning(f"Could not extract DOCX metadata: {e}")
+        return doc_metadata
+    
+    def _parse_docx(self, file_path: str) -> ParsedDocument:
+        """Parse a DOCX file"""
+        logger.info(f"Parsing DOCX file: {file_path}")
+        
+        doc = self._open_docx(file_path)
+        element_map = ElementMap()
+        content = ''.join(self._join_elements(self._iter_docx_elements(doc), '\n\n', element_map))
+        word_count = len(content.split())
+        char_count = len(content)
         
         return ParsedDocument(
             content=content,
             metadata={
                 'format': 'docx',
                 'file_size': os.path.getsize(file_path),
-                'paragraph_count': len(doc.paragraphs),
-                'table_count': len(doc.tables),
-                **doc_metadata
+                **self._docx_metadata(doc)
             },
             page_count=None,  # DOCX doesn't have a reliable page count
             word_count=word_count,
-            char_count=char_count
+            char_count=char_count,
+            element_map=element_map
         )
@@ -0,0 +1,253 @@
+"""
+Storage layouts for collection embeddings.
+
+Two layouts are supported:
+- per_collection: one ``embeddings_collection_{id}`` table per collection (legacy)
+- partitioned: a single ``collection_embeddings`` table, LIST-partitioned by
+  ``collection_id``, with tabular source columns stored in JSONB and one
+  vector index per partition
+"""
+
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+LAYOUT_PER_COLLECTION = "per_collection"
+LAYOUT_PARTITIONED = "partitioned"
+
+PARTITIONED_TABLE = "collection_embeddings"
+
+# Columns of the partitioned table returned by searches
+RESULT_COLUMNS = [
+    "collection_id", "chunk_index", "content", "start_char", "end_char",
+    "chunking_method", "filename", "file_type", "source", "metadata"
+]
+
+
+def legacy_table_name(collection_id: int) -> str:
+    """Name of the per-collection embeddings table"""
+    return f"embeddings_collection_{collection_id}"
+
+
+def partition_name(collection_id: int) -> str:
+    """Name of the partition holding a collection's embeddings"""
+    return f"{PARTITIONED_TABLE}_p{int(collection_id)}"
+
+
+@dataclass
+class EmbeddingsLocation:
+    """Where the embeddings of a collection are stored"""
+    table_name: str
+    storage_layout: str
+    collection_id: int
+
+    @property
+    def is_partitioned(self) -> bool:
+        return self.storage_layout == LAYOUT_PARTITIONED
+
+
+def resolve_embeddings_location(
+    collection_id: int,
+    embeddings_metadata: Optional[Dict[str, Any]] = None
+) -> EmbeddingsLocation:
+    """
+    Resolve the embeddings location of a collection from its embeddings_metadata.
+
+    Collections processed before the layout was recorded fall back to the
+    per-collection table. Collections created from a duplicate upload
+    (``source_collection_id``) read the embeddings of their source, so
+    collection_id of the result is the collection that owns the rows.
+    """
+    metadata = embeddings_metadata or {}
+    layout = metadata.get("storage_layout") or LAYOUT_PER_COLLECTION
+    owner_id = metadata.get("source_collection_id") or collection_id
+
+    if layout == LAYOUT_PARTITIONED:
+        return EmbeddingsLocation(
+            table_name=metadata.get("table_name") or PARTITIONED_TABLE,
+            storage_layout=LAYOUT_PARTITIONED,
+            collection_id=owner_id
+        )
+
+    return EmbeddingsLocation(
+        table_name=metadata.get("table_name") or legacy_table_name(owner_id),
+        storage_layout=LAYOUT_PER_COLLECTION,
+        collection_id=owner_id
+    )
+
+
+class PartitionedEmbeddingStore:
+    """SQL helpers for the LIST-partitioned embeddings table.
+
+    All methods take an open cursor; the caller owns the transaction.
+    """
+
+    PARENT_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {PARTITIONED_TABLE} (
+        id BIGSERIAL,
+        collection_id INTEGER NOT NULL,
+        chunk_index INTEGER,
+        content TEXT,
+        start_char INTEGER,
+        end_char INTEGER,
+        chunking_method TEXT,
+        filename TEXT,
+        file_type TEXT,
+        source JSONB,
+        metadata JSONB,
+        embedding VECTOR(768),
+        duplicate_of BIGINT,
+        created_at TIMESTAMPTZ DEFAULT NOW(),
+        PRIMARY KEY (collection_id, id)
+    ) PARTITION BY LIST (collection_id);
+
+    ALTER TABLE {PARTITIONED_TABLE} ADD COLUMN IF NOT EXISTS duplicate_of BIGINT;
+
+    CREATE INDEX IF NOT EXISTS idx_{PARTITIONED_TABLE}_chunk_index
+    ON {PARTITIONED_TABLE} (collection_id, chunk_index);
+
+    CREATE INDEX IF NOT EXISTS idx_{PARTITIONED_TABLE}_metadata
+    ON {PARTITIONED_TABLE} USING GIN (metadata jsonb_path_ops);
+    """
+
+    def __init__(self):
+        self._parent_ready = False
+
+    def ensure_parent_table(self, cur) -> None:
+        """Create the partitioned parent table if the init script has not run"""
+        if self._parent_ready:
+            return
+        cur.execute(self.PARENT_DDL)
+        self._parent_ready = True
+
+    def ensure_partition(self, cur, collection_id: int) -> str:
+        """Create the partition for a collection and return its name"""
+        self.ensure_parent_table(cur)
+        name = partition_name(collection_id)
+        cur.execute(
+            f"CREATE TABLE IF NOT EXISTS {name} "
+            f"PARTITION OF {PARTITIONED_TABLE} FOR VALUES IN ({int(collection_id)});"
+        )
+        logger.info(f"Ensured embeddings partition {name}")
+        return name
+
+    def create_vector_index(self, cur, collection_id: int) -> None:
+        """
+        Build the HNSW index of a single partition.
+
+        Called after the bulk load, which is much cheaper than maintaining the
+        index row by row.
+        """
+        name = partition_name(collection_id)
+        cur.execute(
+            f"CREATE INDEX IF NOT EXISTS {name}_embedding_idx "
+            f"ON {name} USING hnsw (embedding vector_cosine_ops);"
+        )
+        logger.info(f"Created vector index on {name}")
+
+    def drop_partition(self, cur, collection_id: int) -> None:
+        """Drop a collection's partition together with its indexes"""
+        cur.execute(f"DROP TABLE IF EXISTS {partition_name(collection_id)};")
+
+    def partition_exists(self, cur, collection_id: int) -> bool:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (partition_name(collection_id),))
+        return bool(cur.fetchone()[0])
+
+    def insert_tabular_row(
+        self,
+        cur,
+        collection_id: int,
+        row_dict: Dict[str, Any],
+        embedding_sql: str,
+        duplicate_of: Optional[int] = None,
+        extra_params: Optional[Dict[str, Any]] = None,
+        source: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """
+        Insert one tabular row and return its id.
+
+        ``embedding_sql`` must embed the ``%(content)s`` parameter, which holds
+        the same ``column: value`` text the per-collection layout embeds
+        (see ``tabular_content``), or copy the vector of the ``duplicate_of`` row.
+        ``source`` holds the typed column values stored in the JSONB column;
+        it defaults to the values of ``row_dict``.
+        """
+        if source is None:
+            source = {k: v for k, v in row_dict.items() if k != "collection_id"}
+        cur.execute(
+            f"""
+            INSERT INTO {partition_name(collection_id)} (
+                collection_id, content, source, duplicate_of, embedding
+            ) VALUES (
+                %(collection_id)s, %(content)s, %(source)s, %(duplicate_of)s, {embedding_sql}
+            )
+            RETURNING id
+            """,
+            {
+                **(extra_params or {}),
+                "collection_id": collection_id,
+                "content": self.tabular_content(row_dict),
+                "source": json.dumps(source, default=str),
+                "duplicate_of": duplicate_of
+            }
+        )
+        return cur.fetchone()[0]
+
+    @staticmethod
+    def tabular_content(row_dict: Dict[str, Any]) -> str:
+        """``column: value | ...`` text embedded for a tabular row"""
+        return " | ".join(
+            f"{k}: {'NULL' if v is None else v}" for k, v in row_dict.items() if k != "collection_id"
+        )
+
+    def insert_document_chunk(
+        self,
+        cur,
+        collection_id: int,
+        chunk_data: Dict[str, Any],
+        embedding_sql: str
+    ) -> int:
+        """
+        Insert one document chunk and return its id.
+
+        ``embedding_sql`` embeds ``%(content)s``; ``chunk_data`` may carry a
+        ``duplicate_of`` row id and any extra parameters ``embedding_sql`` uses.
+        """
+        params = dict(chunk_data)
+        params["collection_id"] = collection_id
+        params["metadata"] = json.dumps(params.get("metadata") or {}, default=str)
+        params.setdefault("duplicate_of", None)
+        cur.execute(
+            f"""
+            INSERT INTO {partition_name(collection_id)} (
+                collection_id, chunk_index, content, start_char, end_char,
+                chunking_method, filename, file_type, metadata, duplicate_of, embedding
+            ) VALUES (
+                %(collection_id)s, %(chunk_index)s, %(content)s, %(start_char)s, %(end_char)s,
+                %(chunking_method)s, %(filename)s, %(file_type)s, %(metadata)s, %(duplicate_of)s,
+                {embedding_sql}
+            )
+            RETURNING id
+            """,
+            params
+        )
+        return cur.fetchone()[0]
+
+    @staticmethod
+    def flatten_row(row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convert a partitioned row into the shape the per-collection layout returns.
+
+        Tabular rows expose their original columns; document rows keep their
+        chunk columns.
+        """
+        row = {k: v for k, v in row.items() if k in RESULT_COLUMNS}
+        source = row.pop("source", None)
+        if source:
+            if isinstance(source, str):
+                source = json.loads(source)
+            return {**source, "collection_id": row.get("collection_id")}
+        return {k: v for k, v in row.items() if v is not None}
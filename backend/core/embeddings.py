@@ -1,17 +1,101 @@
 import pandas as pd
 import psycopg2
 from sqlalchemy import create_engine, text
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Iterable
+import hashlib
+import json
 import logging
 from datetime import datetime
 
+from core.column_types import SQL_TEXT, ColumnTypes
+from core.dedup import DEDUP_EXACT, DEDUP_OFF, DedupConfig, DedupDecision, DedupSession
+from core.embedding_store import PartitionedEmbeddingStore, LAYOUT_PER_COLLECTION, LAYOUT_PARTITIONED, PARTITIONED_TABLE
+from core.timing import RequestTimer, ollama_ttft_ms
+
 logger = logging.getLogger(__name__)
 
 class EmbeddingService:
-    def __init__(self, db_url: str, ollama_host: str = "http://host.docker.internal:11434"):
+    def __init__(
+        self,
+        db_url: str,
+        ollama_host: str = "http://host.docker.internal:11434",
+        storage_layout: str = LAYOUT_PER_COLLECTION,
+        dedup_config: Optional[DedupConfig] = None
+    ):
         self.db_url = db_url
         self.ollama_host = ollama_host
         self.engine = create_engine(db_url)
+        self.storage_layout = storage_layout
+        self.partitioned_store = PartitionedEmbeddingStore()
+        self.dedup_config = dedup_config or DedupConfig(method=DEDUP_OFF)
+
+    @property
+    def is_partitioned(self) -> bool:
+        return self.storage_layout == LAYOUT_PARTITIONED
+
+    def _prepare_partition(self, collection_id: int) -> None:
+        """Create the collection's partition in the shared embeddings table"""
+        with self._get_connection() as conn:
+            with conn.cursor() as cur:
+                self.partitioned_store.ensure_partition(cur, collection_id)
+            conn.commit()
+
+    def _finalize_partition(self, collection_id: int) -> None:
+        """Build the partition's vector index once the bulk load is done"""
+        with self._get_connection() as conn:
+            with conn.cursor() as cur:
+                self.partitioned_store.create_vector_index(cur, collection_id)
+            conn.commit()
+
+    def _content_embedding_sql(self, embedding_model: str) -> str:
+        """Build SQL that embeds the %(content)s parameter"""
+        return f"""
+        ai.ollama_embed(
+            '{embedding_model}',
+            %(content)s,
+            host => '{self.ollama_host}'
+        )
+        """
+
+    def _start_dedup(
+        self,
+        cur,
+        config: DedupConfig,
+        collection_id: int,
+        table_name: str,
+        embedding_model: str
+    ) -> Optional[DedupSession]:
+        """Deduplication state for one ingestion, or None when disabled"""
+        if not config.enabled:
+            return None
+        session = DedupSession(
+            config=config,
+            collection_id=collection_id,
+            table_name=PARTITIONED_TABLE if self.is_partitioned else table_name,
+            embedding_model=embedding_model
+        )
+        session.prepare(cur)
+        return session
+
+    @staticmethod
+    def _dedup_embedding_sql(decision: Optional[DedupDecision], embedding_sql: str, table_name: str) -> str:
+        """
+        Embedding expression for a chunk: embedded, or copied from the
+        canonical row or another collection.
+
+        Duplicates get the canonical row's vector rather than NULL, so vector
+        search still finds them.
+        """
+        if decision is None:
+            return embedding_sql
+        if decision.is_duplicate:
+            return (
+                f"(SELECT embedding FROM {table_name} "
+                f"WHERE collection_id = %(collection_id)s AND id = %(duplicate_of)s)"
+            )
+        if decision.copied_embedding is not None:
+            return "%(copied_embedding)s::vector"
+        return embedding_sql
 
     def _get_connection(self):
         """Get a database connection with error handling"""
@@ -37,8 +121,14 @@ class EmbeddingService:
                     
         return ConnectionWrapper(self.engine)
 
-    def create_embeddings_table(self, table_name: str, columns: list) -> None:
-        """Create a table for storing document embeddings"""
+    def create_embeddings_table(self, table_name: str, columns: list, column_types: Optional[Dict[str, str]] = None) -> None:
+        """
+        Create a table for storing tabular row embeddings.
+        
+        column_types maps source columns to their SQL types (see
+        core.column_types); columns without a type are stored as TEXT.
+        """
+        column_types = column_types or {}
         try:
             logger.info(f"Creating/updating table {table_name} with columns: {columns}")
             
@@ -49,12 +139,13 @@ class EmbeddingService:
                     
                     # Add original data columns
                     for col in columns:
-                        if col not in ['id', 'content', 'embedding', 'created_at', 'collection_id']:
-                            sql_columns.append(f'"{col}" TEXT')
+                        if col not in ['id', 'content', 'embedding', 'duplicate_of', 'created_at', 'collection_id']:
+                            sql_columns.append(f'"{col}" {column_types.get(col, SQL_TEXT)}')
                     
                     # Add embedding and metadata columns
                     sql_columns.extend([
                         "embedding VECTOR(768)",
+                        "duplicate_of INTEGER",
                         "created_at TIMESTAMPTZ DEFAULT NOW()",
                         "collection_id INTEGER"
                     ])
@@ -85,10 +176,11 @@ class EmbeddingService:
                         
                         # Add any missing columns
                         for col in columns:
-                            if col not in existing_columns and col not in ['id', 'content', 'embedding', 'created_at', 'collection_id']:
-                                add_col_sql = f'ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS "{col}" TEXT;'
+                            if col not in existing_columns and col not in ['id', 'content', 'embedding', 'duplicate_of', 'created_at', 'collection_id']:
+                                add_col_sql = f'ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS "{col}" {column_types.get(col, SQL_TEXT)};'
                                 logger.info(f"Adding column {col} to table {table_name}")
                                 cur.execute(add_col_sql)
+                        cur.execute(f'ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS duplicate_of INTEGER;')
                     else:
                         # Create new table
                         create_sql = f"""
@@ -107,6 +199,21 @@ class EmbeddingService:
             logger.error(f"Error in create_embeddings_table for table {table_name}: {str(e)}", exc_info=True)
             raise
 
+    @staticmethod
+    def _widen_columns(cur, table_name: str, widened: Dict[str, str]) -> None:
+        """Change column types after a value did not fit its inferred type"""
+        for col, sql_type in widened.items():
+            logger.info(f"Widening column {col} of {table_name} to {sql_type}")
+            cur.execute(f'ALTER TABLE {table_name} ALTER COLUMN "{col}" TYPE {sql_type} USING "{col}"::{sql_type};')
+    
+    @staticmethod
+    def _index_typed_columns(cur, table_name: str, columns: Iterable[str]) -> None:
+        """btree indexes on numeric and timestamp columns, built after the bulk load"""
+        for col in columns:
+            # Column names can be long or contain any character; name indexes by hash
+            suffix = hashlib.sha1(col.encode()).hexdigest()[:8]
+            cur.execute(f'CREATE INDEX IF NOT EXISTS {table_name}_{suffix}_idx ON {table_name} ("{col}");')
+    
     def _build_embedding_sql(self, data: Dict[str, Any], embedding_model: str = "nomic-embed-text") -> str:
         """Build SQL for generating embeddings"""
         # Create a string representation of the data for embedding
@@ -121,18 +228,20 @@ class EmbeddingService:
         )
         """
 
-    async def generate_response(self, messages, model: str = "mistral:7b") -> str:
+    async def generate_response(self, messages, model: str = "mistral:7b", timer: Optional[RequestTimer] = None) -> str:
         """
         Generate a response using the specified model and messages
 
         Args:
             messages: List of messages in the format [{"role": "user", "content": "..."}, ...]
             model: The model to use for generation (default: "mistral:7b")
+            timer: Optional request timer receiving the llm_generation and llm_ttft spans
 
         Returns:
             The generated response as a string
         """
         import httpx
+        from services.ollama_service import get_ollama_client
         
         if not messages:
             raise ValueError("No messages provided for generation")
@@ -153,25 +262,20 @@ class EmbeddingService:
                 if hasattr(msg, 'role') or 'role' in msg
             ]
 
-            # Make the request to the LLM
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    url,
-                    json={
-                        "model": model,
-                        "messages": formatted_messages,
-                        "stream": False
-                    },
-                    timeout=60.0  # 60 second timeout
-                )
-
-                if response.status_code != 200:
-                    error_msg = f"LLM API error: {response.status_code} - {response.text}"
+            # Make the request to the LLM over the shared connection pool
+            timer = timer or RequestTimer()
+            with timer.span("llm_generation"):
+                try:
+                    result = await get_ollama_client().chat(model, formatted_messages, timeout=60.0, url=url)
+                except httpx.HTTPStatusError as e:
+                    error_msg = f"LLM API error: {e.response.status_code} - {e.response.text}"
                     logger.error(error_msg)
                     raise Exception(error_msg)
 
-                result = response.json()
-                return result.get("message", {}).get("content", "")
+            ttft_ms = ollama_ttft_ms(result)
+            if ttft_ms is not None:
+                timer.record("llm_ttft", ttft_ms)
+            return result.get("message", {}).get("content", "")
                 
         except Exception as e:
             logger.error(f"Error in generate_response: {str(e)}")
@@ -179,82 +283,170 @@ class EmbeddingService:
 
     def process_dataframe(self, df: pd.DataFrame, collection_id: int, table_name: str, embedding_model_name: str = "nomic-embed-text") -> Dict[str, Any]:
         """Process a DataFrame and store its embeddings"""
-        try:
-            logger.info(f"Starting to process DataFrame for collection {collection_id} using embedding model: {embedding_model_name}")
-            
-            if df.empty:
-                raise ValueError("DataFrame is empty")
+        if df.empty:
+            raise ValueError("DataFrame is empty")
+        
+        return self.process_dataframe_stream([df], collection_id, table_name, embedding_model_name=embedding_model_name)
 
-            # Ensure all columns are strings for embedding
-            df = df.astype(str)
-            logger.debug(f"DataFrame columns: {df.columns.tolist()}")
-            
-            # Add collection_id to each row
-            df['collection_id'] = collection_id
+    def process_dataframe_stream(
+        self,
+        frames: Iterable[pd.DataFrame],
+        collection_id: int,
+        table_name: str,
+        embedding_model_name: str = "nomic-embed-text"
+    ) -> Dict[str, Any]:
+        """
+        Store embeddings for tabular rows read in batches.
+        
+        Each DataFrame is embedded and committed before the next one is read,
+        so large files are never fully loaded. Columns first seen in a later
+        batch are added to the per-collection table as they appear.
+        
+        Source columns get SQL types inferred from the data (core.column_types)
+        instead of TEXT, and numeric / timestamp columns get btree indexes once
+        the load is done. The partitioned layout keeps rows in its source JSONB
+        column, now with typed JSON values. The embedded text is unchanged:
+        every value in its string form.
+        """
+        try:
+            logger.info(f"Starting to process DataFrame batches for collection {collection_id} using embedding model: {embedding_model_name}")
             
-            # Create or update the embeddings table
-            logger.info(f"Creating/updating embeddings table: {table_name}")
-            self.create_embeddings_table(table_name, [col for col in df.columns if col != 'collection_id'])
+            if self.is_partitioned:
+                logger.info(f"Using partitioned embeddings store for collection {collection_id}")
+                self._prepare_partition(collection_id)
             
             # Process in chunks to avoid memory issues
             chunk_size = 100
-            total_rows = len(df)
+            total_rows = 0
             processed_rows = 0
-            
-            logger.info(f"Starting to process {total_rows} rows in chunks of {chunk_size}")
+            column_types = ColumnTypes()
             
             with self._get_connection() as conn:
                 cursor = conn.cursor()
                 
-                for i in range(0, len(df), chunk_size):
-                    chunk = df.iloc[i:i + chunk_size]
-                    logger.debug(f"Processing chunk {i//chunk_size + 1}/{(len(df)-1)//chunk_size + 1}")
+                # Differing rows are different records, so only exact repeats are skipped
+                dedup = self._start_dedup(
+                    cursor,
+                    DedupConfig(method=DEDUP_EXACT, scope=self.dedup_config.scope) if self.dedup_config.enabled else self.dedup_config,
+                    collection_id,
+                    table_name,
+                    embedding_model_name
+                )
+                
+                for df in frames:
+                    if df.empty:
+                        continue
+                    
+                    total_rows += len(df)
+                    
+                    new_types = column_types.add(df)
+                    if new_types and not self.is_partitioned:
+                        # Commit first: altering the table waits for our own open transaction
+                        conn.commit()
+                        logger.info(f"Creating/updating embeddings table: {table_name}")
+                        self.create_embeddings_table(table_name, list(new_types), column_types=new_types)
                     
-                    for _, row in chunk.iterrows():
-                        row_dict = row.to_dict()
+                    # The embedded text uses the string form of every value
+                    text_df = df.astype(str)
+                    # Add collection_id to each row
+                    text_df['collection_id'] = collection_id
+                    
+                    for i in range(0, len(df), chunk_size):
+                        chunk = text_df.iloc[i:i + chunk_size]
+                        typed_rows = df.iloc[i:i + chunk_size].to_dict(orient='records')
+                        logger.debug(f"Processing chunk {i//chunk_size + 1}/{(len(df)-1)//chunk_size + 1}")
                         
-                        # Build the SQL for inserting with embeddings
-                        try:
-                            embedding_sql = self._build_embedding_sql(row_dict, embedding_model=embedding_model_name)
-                            
-                            # Prepare the insert SQL
-                            columns = [f'"{k}"' for k in row_dict.keys()]
-                            placeholders = [f'%({k})s' for k in row_dict.keys()]
-                            
-                            insert_sql = f"""
-                            INSERT INTO {table_name} (
-                                {', '.join(columns)}, embedding
-                            ) VALUES (
-                                {', '.join(placeholders)}, {embedding_sql}
-                            )
-                            """
-                            
-                            cursor.execute(insert_sql, row_dict)
-                            processed_rows += 1
+                        for (_, row), typed_row in zip(chunk.iterrows(), typed_rows):
+                            row_dict = row.to_dict()
+                            values, widened = column_types.coerce_row(typed_row)
+                            if widened and not self.is_partitioned:
+                                self._widen_columns(cursor, table_name, widened)
                             
+                            # Build the SQL for inserting with embeddings
+                            try:
+                                decision = None
+                                if dedup is not None:
+                                    decision = dedup.resolve(cursor, PartitionedEmbeddingStore.tabular_content(row_dict))
+                                duplicate_of = decision.duplicate_of if decision else None
+                                copied = {"copied_embedding": decision.copied_embedding} if decision else {}
+
+                                if self.is_partitioned:
+                                    row_id = self.partitioned_store.insert_tabular_row(
+                                        cursor,
+                                        collection_id,
+                                        row_dict,
+                                        self._dedup_embedding_sql(
+                                            decision, self._content_embedding_sql(embedding_model_name), PARTITIONED_TABLE
+                                        ),
+                                        duplicate_of=duplicate_of,
+                                        extra_params=copied,
+                                        source=values
+                                    )
+                                else:
+                                    embedding_sql = self._dedup_embedding_sql(
+                                        decision, self._build_embedding_sql(row_dict, embedding_model=embedding_model_name), table_name
+                                    )
+                                    
+                                    # Prepare the insert SQL; typed values get their own parameters
+                                    # so the embedding expression keeps the string ones
+                                    typed_params = {f"__typed_{n}": value for n, value in enumerate(values.values())}
+                                    columns = [f'"{k}"' for k in values] + ['collection_id']
+                                    placeholders = [f'%(__typed_{n})s' for n in range(len(values))] + ['%(collection_id)s']
+                                    
+                                    insert_sql = f"""
+                                    INSERT INTO {table_name} (
+                                        {', '.join(columns)}, duplicate_of, embedding
+                                    ) VALUES (
+                                        {', '.join(placeholders)}, %(duplicate_of)s, {embedding_sql}
+                                    )
+                                    RETURNING id
+                                    """
+                                    
+                                    cursor.execute(insert_sql, {**row_dict, **copied, **typed_params, "duplicate_of": duplicate_of})
+                                    row_id = cursor.fetchone()[0]
+                                
+                                if dedup is not None:
+                                    dedup.register(cursor, decision, row_id)
+                                processed_rows += 1
+
+                            except Exception as e:
+                                logger.error(f"Error processing row {processed_rows + 1} (chunk {i//chunk_size + 1}): {str(e)}")
+                                logger.error(f"Row data: {row_dict}")
+                                raise
+                        
+                        try:
+                            conn.commit()
+                            logger.info(f"Committed chunk {i//chunk_size + 1}: Processed {processed_rows}/{total_rows} rows so far")
                         except Exception as e:
-                            logger.error(f"Error processing row {processed_rows + 1} (chunk {i//chunk_size + 1}): {str(e)}")
-                            logger.error(f"Row data: {row_dict}")
+                            logger.error(f"Error committing chunk {i//chunk_size + 1}: {str(e)}")
+                            conn.rollback()
                             raise
-                    
-                    try:
-                        conn.commit()
-                        logger.info(f"Committed chunk {i//chunk_size + 1}: Processed {processed_rows}/{total_rows} rows")
-                    except Exception as e:
-                        logger.error(f"Error committing chunk {i//chunk_size + 1}: {str(e)}")
-                        conn.rollback()
-                        raise
+            
+                if not self.is_partitioned and column_types.indexed_columns():
+                    self._index_typed_columns(cursor, table_name, column_types.indexed_columns())
+                    conn.commit()
+            
+            if self.is_partitioned:
+                self._finalize_partition(collection_id)
+
+            if total_rows == 0:
+                raise ValueError("DataFrame is empty")
             
             logger.info(f"Successfully processed {processed_rows}/{total_rows} rows for collection {collection_id}")
-            return {
+            result = {
                 "status": "completed",
                 "processed_rows": processed_rows,
                 "total_rows": total_rows,
+                "column_types": column_types.types,
                 "timestamp": datetime.utcnow().isoformat()
             }
-            
+            if dedup is not None:
+                result["dedup"] = dedup.stats()
+                logger.info(f"Deduplication for collection {collection_id}: {result['dedup']}")
+            return result
+
         except Exception as e:
-            logger.error(f"Error in process_dataframe for collection {collection_id}: {str(e)}", exc_info=True)
+            logger.error(f"Error in process_dataframe_stream for collection {collection_id}: {str(e)}", exc_info=True)
             raise
 
     def create_document_embeddings_table(self, table_name: str) -> None:
@@ -288,6 +480,7 @@ class EmbeddingService:
                             filename TEXT,
                             file_type TEXT,
                             embedding VECTOR(768),
+                            duplicate_of INTEGER,
                             created_at TIMESTAMPTZ DEFAULT NOW(),
                             collection_id INTEGER,
                             metadata JSONB
@@ -297,6 +490,17 @@ class EmbeddingService:
                         logger.info(f"Created document embeddings table: {table_name}")
                     else:
                         logger.info(f"Table {table_name} already exists")
+                        cur.execute(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS duplicate_of INTEGER;")
+
+                    # Neighbor expansion looks chunks up by position
+                    cur.execute(
+                        f"CREATE INDEX IF NOT EXISTS {table_name}_chunk_index_idx ON {table_name} (chunk_index);"
+                    )
+                    # Section / page filters in retrieval use JSONB containment
+                    cur.execute(
+                        f"CREATE INDEX IF NOT EXISTS {table_name}_metadata_idx "
+                        f"ON {table_name} USING GIN (metadata jsonb_path_ops);"
+                    )
                 
                 conn.commit()
                 
@@ -313,84 +517,141 @@ class EmbeddingService:
         embedding_model_name: str = "nomic-embed-text"
     ) -> Dict[str, Any]:
         """Process document chunks and store their embeddings"""
+        if df.empty:
+            raise ValueError("No chunks to process")
+        
+        return self.process_document_chunk_stream(
+            df.to_dict('records'),
+            collection_id,
+            table_name,
+            document_metadata=document_metadata,
+            embedding_model_name=embedding_model_name
+        )
+    
+    def process_document_chunk_stream(
+        self,
+        chunks: Iterable[Dict[str, Any]],
+        collection_id: int,
+        table_name: str,
+        document_metadata: Dict[str, Any] = None,
+        embedding_model_name: str = "nomic-embed-text",
+        batch_size: int = 50
+    ) -> Dict[str, Any]:
+        """
+        Store embeddings for document chunks as they are produced.
+        
+        Chunks are consumed lazily and committed every batch_size rows, so
+        embedding starts while the document is still being parsed and chunked.
+        The total is only known once the iterable is exhausted.
+        
+        With deduplication enabled, a chunk repeating an earlier one is not
+        embedded: it copies the original's vector and points at it through
+        ``duplicate_of``.
+        """
         try:
             logger.info(f"Starting to process document chunks for collection {collection_id} using embedding model: {embedding_model_name}")
             
-            if df.empty:
-                raise ValueError("No chunks to process")
-            
             # Create the document embeddings table
-            self.create_document_embeddings_table(table_name)
+            if self.is_partitioned:
+                self._prepare_partition(collection_id)
+            else:
+                self.create_document_embeddings_table(table_name)
             
-            total_chunks = len(df)
-            processed_chunks = 0
-            batch_size = 50  # Smaller batches for document chunks
+            embedding_sql = self._content_embedding_sql(embedding_model_name)
+            insert_sql = """
+            INSERT INTO {table_name} (
+                chunk_index, content, start_char, end_char, 
+                chunking_method, filename, file_type, collection_id, metadata, duplicate_of, embedding
+            ) VALUES (
+                %(chunk_index)s, %(content)s, %(start_char)s, %(end_char)s,
+                %(chunking_method)s, %(filename)s, %(file_type)s, %(collection_id)s, %(metadata)s, %(duplicate_of)s,
+                {embedding_sql}
+            )
+            RETURNING id
+            """
             
-            logger.info(f"Processing {total_chunks} document chunks")
+            total_chunks = 0
+            processed_chunks = 0
+            pending = 0
             
             with self._get_connection() as conn:
                 cursor = conn.cursor()
+                dedup = self._start_dedup(cursor, self.dedup_config, collection_id, table_name, embedding_model_name)
                 
-                for i in range(0, len(df), batch_size):
-                    batch = df.iloc[i:i + batch_size]
-                    
-                    for _, row in batch.iterrows():
-                        try:
-                            content = str(row.get('content', ''))
-                            if not content.strip():
-                                logger.warning(f"Skipping empty chunk at index {row.get('chunk_index', 'unknown')}")
-                                continue
-                            
-                            # Build embedding SQL for content only
-                            embedding_sql = f"""
-                            ai.ollama_embed(
-                                '{embedding_model_name}',
-                                %(content)s,
-                                host => '{self.ollama_host}'
+                for row in chunks:
+                    total_chunks += 1
+                    try:
+                        content = str(row.get('content', ''))
+                        if not content.strip():
+                            logger.warning(f"Skipping empty chunk at index {row.get('chunk_index', 'unknown')}")
+                            continue
+                        
+                        # Prepare insert data
+                        insert_data = {
+                            'chunk_index': int(row.get('chunk_index', 0)),
+                            'content': content,
+                            'start_char': int(row.get('start_char', 0)),
+                            'end_char': int(row.get('end_char', 0)),
+                            'chunking_method': str(row.get('chunking_method', '')),
+                            'filename': document_metadata.get('filename', '') if document_metadata else '',
+                            'file_type': document_metadata.get('file_type', '') if document_metadata else '',
+                            'collection_id': collection_id,
+                            'metadata': row.get('metadata') or {},
+                            'duplicate_of': None
+                        }
+                        
+                        decision = dedup.resolve(cursor, content) if dedup is not None else None
+                        if decision is not None:
+                            insert_data['duplicate_of'] = decision.duplicate_of
+                            insert_data['copied_embedding'] = decision.copied_embedding
+                        chunk_embedding_sql = self._dedup_embedding_sql(
+                            decision, embedding_sql, PARTITIONED_TABLE if self.is_partitioned else table_name
+                        )
+                        
+                        if self.is_partitioned:
+                            row_id = self.partitioned_store.insert_document_chunk(
+                                cursor, collection_id, insert_data, chunk_embedding_sql
                             )
-                            """
-                            
-                            # Prepare insert data
-                            insert_data = {
-                                'chunk_index': int(row.get('chunk_index', 0)),
-                                'content': content,
-                                'start_char': int(row.get('start_char', 0)),
-                                'end_char': int(row.get('end_char', 0)),
-                                'chunking_method': str(row.get('chunking_method', '')),
-                                'filename': document_metadata.get('filename', '') if document_metadata else '',
-                                'file_type': document_metadata.get('file_type', '') if document_metadata else '',
-                                'collection_id': collection_id
-                            }
-                            
-                            insert_sql = f"""
-                            INSERT INTO {table_name} (
-                                chunk_index, content, start_char, end_char, 
-                                chunking_method, filename, file_type, collection_id, embedding
-                            ) VALUES (
-                                %(chunk_index)s, %(content)s, %(start_char)s, %(end_char)s,
-                                %(chunking_method)s, %(filename)s, %(file_type)s, %(collection_id)s,
-                                {embedding_sql}
+                        else:
+                            cursor.execute(
+                                insert_sql.format(table_name=table_name, embedding_sql=chunk_embedding_sql),
+                                {**insert_data, 'metadata': json.dumps(insert_data['metadata'], default=str)}
                             )
-                            """
-                            
-                            cursor.execute(insert_sql, insert_data)
-                            processed_chunks += 1
-                            
-                        except Exception as e:
-                            logger.error(f"Error processing chunk {row.get('chunk_index', 'unknown')}: {str(e)}")
-                            raise
+                            row_id = cursor.fetchone()[0]
+                        if dedup is not None:
+                            dedup.register(cursor, decision, row_id)
+                        processed_chunks += 1
+                        pending += 1
+                        
+                    except Exception as e:
+                        logger.error(f"Error processing chunk {row.get('chunk_index', 'unknown')}: {str(e)}")
+                        raise
                     
-                    conn.commit()
-                    logger.info(f"Processed {processed_chunks}/{total_chunks} chunks")
+                    if pending >= batch_size:
+                        conn.commit()
+                        pending = 0
+                        logger.info(f"Processed {processed_chunks} chunks")
+                
+                conn.commit()
+            
+            if total_chunks == 0:
+                raise ValueError("No chunks to process")
             
+            if self.is_partitioned:
+                self._finalize_partition(collection_id)
+
             logger.info(f"Successfully processed {processed_chunks}/{total_chunks} chunks for collection {collection_id}")
-            return {
+            result = {
                 "status": "completed",
                 "processed_rows": processed_chunks,
                 "total_rows": total_chunks,
                 "timestamp": datetime.utcnow().isoformat()
             }
-            
+            if dedup is not None:
+                result["dedup"] = dedup.stats()
+                logger.info(f"Deduplication for collection {collection_id}: {result['dedup']}")
+            return result
+
         except Exception as e:
-            logger.error(f"Error in process_document_chunks for collection {collection_id}: {str(e)}", exc_info=True)
+            logger.error(f"Error in process_document_chunk_stream for collection {collection_id}: {str(e)}", exc_info=True)
             raise
@@ -0,0 +1,465 @@
+"""
+Garbage collection of collection artifacts that nothing refers to.
+
+Deleting a collection removes its upload and its DataCollection row, but
+not its embeddings, and failed uploads and ingestions leave files and
+partial tables behind. GarbageCollector compares what exists with the
+collections that are left and removes:
+- embeddings: ``embeddings_collection_{id}`` tables and
+  ``collection_embeddings_p{id}`` partitions of deleted collections and of
+  collections whose ingestion failed (a retry builds them again)
+- fingerprints: ``chunk_fingerprints`` rows of those collections, so global
+  deduplication never copies a vector from a dropped table
+- upload_sessions: resumable uploads not written to for
+  UPLOAD_SESSION_TTL_HOURS, with their preallocated ``.part`` files, and
+  stray lock and temporary files of the session directory
+- uploads: files in the uploads directory that belong to no collection and
+  no upload session (uploads of deleted collections, Parquet copies,
+  ``.part`` files of interrupted uploads)
+
+Embeddings that a duplicate upload reuses (``source_collection_id``) are
+kept while the referencing collection exists. Nothing younger than
+GC_MIN_AGE_SECONDS is touched, so uploads and ingestions in flight are safe.
+
+Work is done in throttled batches: GC_BATCH_SIZE items, then a
+GC_BATCH_PAUSE_SECONDS pause, and the collection list is reloaded before
+every batch. Tables are dropped with a short lock_timeout; a table in use
+is left for the next sweep instead of blocking its readers. A PostgreSQL
+advisory lock keeps the sweeps of several API workers from overlapping.
+Every sweep reports how many items and bytes it reclaimed per kind.
+
+Environment overrides:
+- GC_INTERVAL_SECONDS: time between periodic sweeps (default 3600, 0 disables them)
+- GC_MIN_AGE_SECONDS: grace period for unreferenced files and failed
+  collections (default 86400)
+- GC_BATCH_SIZE: tables or files removed per batch (default 20)
+- GC_BATCH_PAUSE_SECONDS: pause between batches (default 1)
+- GC_FINGERPRINT_BATCH_ROWS: fingerprint rows deleted per batch (default 5000)
+- GC_ARCHIVE_DIR: move orphaned upload files here instead of deleting them
+- UPLOAD_SESSION_TTL_HOURS: age at which an idle upload session expires (default 72)
+"""
+
+import asyncio
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import psycopg2
+import psycopg2.errors
+from starlette.concurrency import run_in_threadpool
+
+from core.dedup import FINGERPRINTS_TABLE
+from core.tabular_reader import TabularReader
+from core.uploads import UploadSessionNotFound, UploadSessionStore
+
+logger = logging.getLogger(__name__)
+
+GC_INTERVAL_SECONDS = float(os.getenv("GC_INTERVAL_SECONDS", 3600))
+GC_MIN_AGE_SECONDS = float(os.getenv("GC_MIN_AGE_SECONDS", 24 * 3600))
+GC_BATCH_SIZE = int(os.getenv("GC_BATCH_SIZE", 20))
+GC_BATCH_PAUSE_SECONDS = float(os.getenv("GC_BATCH_PAUSE_SECONDS", 1))
+GC_FINGERPRINT_BATCH_ROWS = int(os.getenv("GC_FINGERPRINT_BATCH_ROWS", 5000))
+GC_ARCHIVE_DIR = os.getenv("GC_ARCHIVE_DIR") or None
+UPLOAD_SESSION_TTL_HOURS = float(os.getenv("UPLOAD_SESSION_TTL_HOURS", 72))
+
+GC_LOCK_TIMEOUT = "5s"
+# pg_try_advisory_lock key shared by every API worker
+GC_ADVISORY_LOCK_KEY = 0x46434D4C4743
+
+KIND_EMBEDDINGS = "embeddings"
+KIND_FINGERPRINTS = "fingerprints"
+KIND_UPLOAD_SESSIONS = "upload_sessions"
+KIND_UPLOADS = "uploads"
+
+_EMBEDDINGS_TABLE = re.compile(r"^(?:embeddings_collection_|collection_embeddings_p)(\d+)$")
+
+
+@dataclass
+class CollectionState:
+    """What the collector needs to know about a live collection"""
+    id: int
+    file_path: Optional[str] = None
+    embeddings_status: Optional[str] = None
+    embeddings_metadata: Optional[Dict[str, Any]] = None
+    # Epoch seconds of the last change
+    updated_at: Optional[float] = None
+
+
+@dataclass
+class SweepReport:
+    """Items and bytes reclaimed by one sweep, per kind"""
+    dry_run: bool
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    # Reason the sweep did not run
+    skipped: Optional[str] = None
+    reclaimed: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+
+    def record(self, kind: str, nbytes: int, count: int = 1) -> None:
+        totals = self.reclaimed.setdefault(kind, {"count": 0, "bytes": 0})
+        totals["count"] += count
+        totals["bytes"] += nbytes
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(totals["bytes"] for totals in self.reclaimed.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "dry_run": self.dry_run,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "skipped": self.skipped,
+            "reclaimed": self.reclaimed,
+            "total_bytes": self.total_bytes,
+            "errors": self.errors,
+        }
+
+
+def retained_collection_ids(collections: Iterable[CollectionState], now: float, min_age: float) -> Set[int]:
+    """
+    Ids of collections whose embeddings must be kept.
+
+    Failed collections are only kept during the grace period; collections
+    referenced by a duplicate upload are kept whatever their state.
+    """
+    retained = set()
+    for collection in collections:
+        failed = collection.embeddings_status == 'failed'
+        if not failed or collection.updated_at is None or now - collection.updated_at < min_age:
+            retained.add(collection.id)
+        source_id = (collection.embeddings_metadata or {}).get('source_collection_id')
+        if source_id:
+            retained.add(int(source_id))
+    return retained
+
+
+def referenced_paths(collections: Iterable[CollectionState], sessions: Iterable[Any]) -> Set[str]:
+    """Absolute paths of the uploads, Parquet copies and session files in use"""
+    reader = TabularReader()
+    paths = set()
+    for collection in collections:
+        if collection.file_path:
+            path = os.path.abspath(collection.file_path)
+            paths.update({path, reader.columnar_path(path)})
+    for session in sessions:
+        paths.update({os.path.abspath(session.file_path), os.path.abspath(session.part_path)})
+    return paths
+
+
+def find_orphan_files(upload_dir: str, referenced: Set[str], now: float, min_age: float) -> List[str]:
+    """Unreferenced files directly in upload_dir older than min_age; dot entries are skipped"""
+    orphans = []
+    try:
+        entries = list(os.scandir(upload_dir))
+    except FileNotFoundError:
+        return []
+    for entry in entries:
+        if entry.name.startswith('.') or not entry.is_file(follow_symlinks=False):
+            continue
+        path = os.path.abspath(entry.path)
+        if path in referenced:
+            continue
+        try:
+            if now - entry.stat(follow_symlinks=False).st_mtime < min_age:
+                continue
+        except FileNotFoundError:
+            continue
+        orphans.append(path)
+    return sorted(orphans)
+
+
+def disk_usage(path: str) -> int:
+    """Bytes a file occupies on disk (preallocated upload parts are sparse)"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return 0
+    blocks = getattr(stat, "st_blocks", None)
+    return blocks * 512 if blocks is not None else stat.st_size
+
+
+def _batches(items: List[Any], size: int) -> Iterable[List[Any]]:
+    size = max(size, 1)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class GarbageCollector:
+    """Finds and removes orphaned embeddings, fingerprints, sessions and uploads"""
+
+    def __init__(
+        self,
+        db_url: str,
+        upload_dir: str,
+        load_collections: Callable[[], List[CollectionState]],
+        session_store: Optional[UploadSessionStore] = None,
+        min_age: float = GC_MIN_AGE_SECONDS,
+        session_ttl: float = UPLOAD_SESSION_TTL_HOURS * 3600,
+        batch_size: int = GC_BATCH_SIZE,
+        batch_pause: float = GC_BATCH_PAUSE_SECONDS,
+        fingerprint_batch_rows: int = GC_FINGERPRINT_BATCH_ROWS,
+        archive_dir: Optional[str] = GC_ARCHIVE_DIR
+    ):
+        self.db_url = db_url
+        self.upload_dir = upload_dir
+        self.load_collections = load_collections
+        self.session_store = session_store or UploadSessionStore(upload_dir)
+        self.min_age = min_age
+        self.session_ttl = session_ttl
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.fingerprint_batch_rows = fingerprint_batch_rows
+        self.archive_dir = archive_dir
+        self.last_report: Optional[SweepReport] = None
+        self._running = threading.Lock()
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """Make a running sweep return after its current item"""
+        self._stop.set()
+
+    def _pause(self) -> bool:
+        """Throttle between batches; False once the collector is stopping"""
+        return not self._stop.wait(self.batch_pause)
+
+    def sweep(self, dry_run: bool = False) -> SweepReport:
+        """
+        Run one reconciliation pass and return its report.
+
+        Blocking (database and file I/O, throttling pauses); run it in the
+        thread pool. With dry_run nothing is removed and the report lists
+        what would be reclaimed.
+        """
+        report = SweepReport(dry_run=dry_run)
+        if not self._running.acquire(blocking=False):
+            report.skipped = "A sweep is already running"
+            return report
+        try:
+            self._sweep(report)
+        finally:
+            self._running.release()
+        report.finished_at = time.time()
+        if not report.skipped:
+            self.last_report = report
+            logger.info(
+                f"Garbage collection {'(dry run) ' if dry_run else ''}reclaimed {report.total_bytes} bytes: "
+                f"{report.reclaimed}"
+            )
+        return report
+
+    def _sweep(self, report: SweepReport) -> None:
+        try:
+            conn = psycopg2.connect(self.db_url)
+        except psycopg2.Error as e:
+            report.skipped = f"Embeddings database unavailable: {e}"
+            logger.warning(f"Skipping garbage collection: {report.skipped}")
+            return
+        try:
+            with conn.cursor() as cur:
+                # Session-level lock, released when the connection closes
+                cur.execute("SELECT pg_try_advisory_lock(%s);", (GC_ADVISORY_LOCK_KEY,))
+                if not cur.fetchone()[0]:
+                    report.skipped = "Another worker is sweeping"
+                    return
+                cur.execute("SET lock_timeout = %s;", (GC_LOCK_TIMEOUT,))
+            conn.commit()
+
+            self._sweep_embeddings(conn, report)
+            self._sweep_fingerprints(conn, report)
+            self._sweep_upload_sessions(report)
+            self._sweep_uploads(report)
+        finally:
+            conn.close()
+
+    def _retained_ids(self) -> Set[int]:
+        return retained_collection_ids(self.load_collections(), time.time(), self.min_age)
+
+    def _list_embeddings_tables(self, cur) -> List[Tuple[str, int, int]]:
+        """(table, collection id, bytes) of every per-collection table and partition"""
+        cur.execute("""
+            SELECT c.relname, pg_total_relation_size(c.oid)
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = 'public'
+            AND c.relkind = 'r'
+            AND (c.relname LIKE 'embeddings_collection_%' OR c.relname LIKE 'collection_embeddings_p%')
+        """)
+        tables = []
+        for name, size in cur.fetchall():
+            match = _EMBEDDINGS_TABLE.match(name)
+            if match:
+                tables.append((name, int(match.group(1)), size))
+        return tables
+
+    def _sweep_embeddings(self, conn, report: SweepReport) -> None:
+        with conn.cursor() as cur:
+            tables = self._list_embeddings_tables(cur)
+        conn.commit()
+        retained = self._retained_ids()
+        orphans = [table for table in tables if table[1] not in retained]
+
+        for n, batch in enumerate(_batches(orphans, self.batch_size)):
+            if n and not self._pause():
+                return
+            # Collections may have been re-processed since the listing
+            retained = self._retained_ids()
+            for name, collection_id, size in batch:
+                if collection_id in retained or self._stop.is_set():
+                    continue
+                if not report.dry_run:
+                    try:
+                        with conn.cursor() as cur:
+                            cur.execute(f"DROP TABLE IF EXISTS {name};")
+                        conn.commit()
+                    except psycopg2.errors.LockNotAvailable:
+                        conn.rollback()
+                        logger.info(f"Table {name} is in use, leaving it for the next sweep")
+                        continue
+                    except psycopg2.Error as e:
+                        conn.rollback()
+                        report.errors.append(f"Could not drop {name}: {e}")
+                        continue
+                    logger.info(f"Dropped orphaned embeddings table {name} ({size} bytes)")
+                report.record(KIND_EMBEDDINGS, size)
+
+    def _sweep_fingerprints(self, conn, report: SweepReport) -> None:
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (FINGERPRINTS_TABLE,))
+            exists = cur.fetchone()[0]
+        conn.commit()
+        if not exists:
+            return
+
+        orphaned = "NOT (collection_id = ANY(%s))"
+        while not self._stop.is_set():
+            retained = sorted(self._retained_ids())
+            try:
+                with conn.cursor() as cur:
+                    if report.dry_run:
+                        cur.execute(
+                            f"SELECT COUNT(*), COALESCE(SUM(pg_column_size(f.*)), 0) FROM {FINGERPRINTS_TABLE} f WHERE {orphaned};",
+                            (retained,)
+                        )
+                        count, size = cur.fetchone()
+                        if count:
+                            report.record(KIND_FINGERPRINTS, int(size), count=count)
+                        conn.commit()
+                        return
+                    cur.execute(
+                        f"""
+                        DELETE FROM {FINGERPRINTS_TABLE} f
+                        USING (
+                            SELECT collection_id, row_id FROM {FINGERPRINTS_TABLE}
+                            WHERE {orphaned} LIMIT %s
+                        ) batch
+                        WHERE f.collection_id = batch.collection_id AND f.row_id = batch.row_id
+                        RETURNING pg_column_size(f.*);
+                        """,
+                        (retained, self.fingerprint_batch_rows)
+                    )
+                    sizes = [size for (size,) in cur.fetchall()]
+                conn.commit()
+            except psycopg2.Error as e:
+                conn.rollback()
+                report.errors.append(f"Could not delete orphaned fingerprints: {e}")
+                return
+            if sizes:
+                report.record(KIND_FINGERPRINTS, sum(sizes), count=len(sizes))
+            if len(sizes) < self.fingerprint_batch_rows or not self._pause():
+                return
+
+    def _sweep_upload_sessions(self, report: SweepReport) -> None:
+        now = time.time()
+        expired = [
+            session for session in self.session_store.list_sessions()
+            if now - session.updated_at >= self.session_ttl
+        ]
+        for n, batch in enumerate(_batches(expired, self.batch_size)):
+            if n and not self._pause():
+                return
+            for session in batch:
+                size = disk_usage(session.part_path)
+                if not report.dry_run:
+                    try:
+                        self.session_store.abort(session.upload_id)
+                    except UploadSessionNotFound:
+                        # Finalized or aborted meanwhile
+                        continue
+                    logger.info(f"Expired upload session {session.upload_id} ({size} bytes)")
+                report.record(KIND_UPLOAD_SESSIONS, size)
+
+        # Lock and temporary files left by sessions that are gone or by crashed writes
+        session_dir = self.session_store.session_dir
+        try:
+            names = os.listdir(session_dir)
+        except FileNotFoundError:
+            return
+        live = {name[:-len(".json")] for name in names if name.endswith(".json")}
+        for name in names:
+            stem, ext = os.path.splitext(name)
+            if ext not in (".lock", ".tmp") or (ext == ".lock" and stem in live):
+                continue
+            path = os.path.join(session_dir, name)
+            try:
+                if now - os.path.getmtime(path) < self.min_age:
+                    continue
+            except FileNotFoundError:
+                continue
+            size = disk_usage(path)
+            if not report.dry_run:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+            report.record(KIND_UPLOAD_SESSIONS, size)
+
+    def _sweep_uploads(self, report: SweepReport) -> None:
+        orphans = find_orphan_files(
+            self.upload_dir,
+            referenced_paths(self.load_collections(), self.session_store.list_sessions()),
+            time.time(),
+            self.min_age
+        )
+        for n, batch in enumerate(_batches(orphans, self.batch_size)):
+            if n and not self._pause():
+                return
+            # Uploads finalized since the listing now belong to a collection
+            referenced = referenced_paths(self.load_collections(), self.session_store.list_sessions())
+            for path in batch:
+                if path in referenced or self._stop.is_set():
+                    continue
+                size = disk_usage(path)
+                if not report.dry_run:
+                    try:
+                        self._discard_file(path)
+                    except FileNotFoundError:
+                        continue
+                    except OSError as e:
+                        report.errors.append(f"Could not remove {path}: {e}")
+                        continue
+                    logger.info(f"Removed orphaned upload {path} ({size} bytes)")
+                report.record(KIND_UPLOADS, size)
+
+    def _discard_file(self, path: str) -> None:
+        if not self.archive_dir:
+            os.remove(path)
+            return
+        os.makedirs(self.archive_dir, exist_ok=True)
+        shutil.move(path, os.path.join(self.archive_dir, os.path.basename(path)))
+
+
+async def run_periodically(collector: GarbageCollector, interval: float = GC_INTERVAL_SECONDS) -> None:
+    """Sweep every interval seconds until cancelled; the first sweep waits one interval"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(collector.sweep)
+        except Exception as e:
+            logger.error(f"Garbage collection sweep failed: {e}", exc_info=True)
@@ -0,0 +1,165 @@
+"""
+Process pool for CPU-bound document work (PDF text extraction, chunking).
+
+Parsing and chunking are pure Python and hold the GIL, so running them on the
+API process starves request handling. Large documents are split into
+independent pieces (page ranges, sections) that run in a shared
+ProcessPoolExecutor sized to the cores available to this process.
+
+Work that needs a hard time limit (SIGALRM only fires on the main thread of
+a process, not on the request or background-task threads) runs in a pool
+worker even when parallelism is disabled: in the shared pool, or else in a
+single-worker pool kept for that purpose.
+
+Environment overrides:
+- PARALLEL_WORKERS: pool size (default: available cores, 0 or 1 disables the pool)
+- PARALLEL_CHUNKING_MIN_CHARS: text length from which chunking is split into sections
+- PARALLEL_PDF_MIN_PAGES: page count from which PDF pages are extracted in parallel
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Deque, Iterable, Iterator, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def available_cpus() -> int:
+    """Cores this process may run on (respects CPU affinity / container cpusets)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+PARALLEL_WORKERS = int(os.getenv("PARALLEL_WORKERS", available_cpus()))
+PARALLEL_CHUNKING_MIN_CHARS = int(os.getenv("PARALLEL_CHUNKING_MIN_CHARS", 1_000_000))
+PARALLEL_PDF_MIN_PAGES = int(os.getenv("PARALLEL_PDF_MIN_PAGES", 32))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_timeout_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _spawn_pool(workers: int) -> ProcessPoolExecutor:
+    # spawn: forking a multi-threaded server process is not safe
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def parallel_enabled() -> bool:
+    return PARALLEL_WORKERS > 1
+
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """Shared pool, created on first use; None when parallelism is disabled"""
+    global _pool
+    if not parallel_enabled():
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = _spawn_pool(PARALLEL_WORKERS)
+            logger.info(f"Started document process pool with {PARALLEL_WORKERS} workers")
+        return _pool
+
+
+def get_timeout_pool() -> ProcessPoolExecutor:
+    """
+    Pool for work that needs a time limit: the shared pool, or a
+    single-worker pool when parallelism is disabled.
+    """
+    global _timeout_pool
+    pool = get_process_pool()
+    if pool is not None:
+        return pool
+    with _pool_lock:
+        if _timeout_pool is None:
+            _timeout_pool = _spawn_pool(1)
+            logger.info("Started single-worker process pool for time-limited document work")
+        return _timeout_pool
+
+
+def _discard_pool(pool: Executor) -> None:
+    """Forget a broken pool so the next call starts a fresh one"""
+    global _pool, _timeout_pool
+    with _pool_lock:
+        if pool is _pool:
+            _pool = None
+        elif pool is _timeout_pool:
+            _timeout_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_process_pool() -> None:
+    global _pool, _timeout_pool
+    with _pool_lock:
+        pools = [p for p in (_pool, _timeout_pool) if p is not None]
+        _pool = _timeout_pool = None
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def map_ordered(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    pool: Optional[Executor] = None,
+    window: Optional[int] = None
+) -> Iterator[R]:
+    """
+    Run func over items in a process pool and yield results in input order.
+
+    Items are drawn from the iterable lazily and at most window of them
+    (default: twice the pool size) are submitted ahead of the result being
+    yielded, so memory is bounded by the items in flight rather than the
+    whole input.
+
+    Uses the shared pool unless pool is given. Falls back to running in this
+    process when no pool is available or the pool breaks, so callers always
+    get a complete, ordered result.
+    """
+    items = iter(items)
+    if pool is None:
+        pool = get_process_pool()
+    if pool is None:
+        for item in items:
+            yield func(item)
+        return
+    if window is None:
+        window = 2 * max(1, PARALLEL_WORKERS)
+    window = max(1, window)
+
+    # [item, future]; the item is kept to re-run it if the pool breaks
+    pending: Deque[List] = deque()
+    try:
+        for item in items:
+            entry = [item, None]
+            pending.append(entry)
+            entry[1] = pool.submit(func, item)
+            while len(pending) >= window:
+                yield pending[0][1].result()
+                pending.popleft()
+        while pending:
+            yield pending[0][1].result()
+            pending.popleft()
+    except BrokenProcessPool as e:
+        logger.warning(f"Document process pool failed, running in-process: {e}")
+        _discard_pool(pool)
+        for item, future in pending:
+            if future is not None and future.done() and not future.cancelled() and future.exception() is None:
+                yield future.result()
+            else:
+                yield func(item)
+        for item in items:
+            yield func(item)
+    finally:
+        # The consumer stopped early: drop work that has not started
+        for _, future in pending:
+            if future is not None:
+                future.cancel()
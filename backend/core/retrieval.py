@@ -0,0 +1,82 @@
+"""
+Post-processing of vector search results for RAG.
+
+Neighbor expansion: after the top-k search on a document collection, the
+±N chunks around every hit are fetched and contiguous chunks are merged into
+one span, so small chunks can be used for precise search while the LLM
+still receives enough surrounding context.
+"""
+
+from typing import Any, Dict, Iterable, List
+
+
+def neighbor_chunk_indexes(hit_indexes: Iterable[int], window: int) -> List[int]:
+    """Sorted chunk indexes covering every hit and its ±window neighbors"""
+    indexes = set()
+    for hit in hit_indexes:
+        if hit is None:
+            continue
+        indexes.update(range(max(0, hit - window), hit + window + 1))
+    return sorted(indexes)
+
+
+def _join_contents(previous: Dict[str, Any], current: Dict[str, Any], merged_content: str) -> str:
+    """Append a chunk to merged content, dropping the text it shares with the previous chunk"""
+    content = current.get("content") or ""
+    prev_end = previous.get("end_char")
+    start = current.get("start_char")
+    if prev_end is not None and start is not None and start < prev_end:
+        overlap = prev_end - start
+        if 0 < overlap <= len(content) and merged_content.endswith(content[:overlap]):
+            return merged_content + content[overlap:]
+    separator = "" if prev_end is not None and start is not None and start == prev_end else "\n"
+    return merged_content + separator + content
+
+
+def merge_contiguous_chunks(rows: List[Dict[str, Any]], hit_indexes: List[int]) -> List[Dict[str, Any]]:
+    """
+    Merge runs of consecutive chunks into single context spans.
+
+    Args:
+        rows: Chunk rows (with chunk_index, content and character offsets)
+        hit_indexes: chunk_index of the search hits, best match first
+
+    Returns:
+        One row per contiguous span, ordered by the rank of the best hit it
+        contains. Merged rows carry chunk_index_start / chunk_index_end.
+    """
+    by_index = {}
+    for row in rows:
+        if row.get("chunk_index") is not None:
+            by_index.setdefault(row["chunk_index"], row)
+
+    spans = []
+    current = []
+    for index in sorted(by_index):
+        if current and index != current[-1]["chunk_index"] + 1:
+            spans.append(current)
+            current = []
+        current.append(by_index[index])
+    if current:
+        spans.append(current)
+
+    rank = {hit: position for position, hit in reversed(list(enumerate(hit_indexes)))}
+    merged = []
+    for span in spans:
+        content = span[0].get("content") or ""
+        for previous, chunk in zip(span, span[1:]):
+            content = _join_contents(previous, chunk, content)
+
+        best_rank = min((rank[c["chunk_index"]] for c in span if c["chunk_index"] in rank), default=len(rank))
+        row = {k: v for k, v in span[0].items() if k not in ("chunk_index", "start_char", "end_char", "content")}
+        row.update({
+            "content": content,
+            "chunk_index_start": span[0]["chunk_index"],
+            "chunk_index_end": span[-1]["chunk_index"],
+            "start_char": span[0].get("start_char"),
+            "end_char": span[-1].get("end_char"),
+        })
+        merged.append((best_rank, row))
+
+    merged.sort(key=lambda item: (item[0], item[1]["chunk_index_start"]))
+    return [row for _, row in merged]
@@ -0,0 +1,143 @@
+"""
+Sentence embeddings for the embedding-driven semantic chunker.
+
+Sentences are embedded through Ollama's batch endpoint (/api/embed accepts a
+list of inputs), a few hundred per request. Topic boundaries are placed where
+the cosine similarity between the windows before and after a sentence gap
+drops, computed for all gaps at once in NumPy.
+
+Embeddings are cached per document, because upload validation, preview and
+ingestion chunk the same document.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBED_BATCH_SIZE = 256
+EMBED_TIMEOUT_SECONDS = 120.0
+
+# Number of documents whose sentence embeddings are kept in memory
+EMBEDDING_CACHE_SIZE = 8
+
+
+class OllamaSentenceEmbedder:
+    """Embeds lists of sentences with one Ollama /api/embed request per batch"""
+
+    def __init__(self, ollama_host: str, model: str, batch_size: int = EMBED_BATCH_SIZE):
+        self.ollama_host = ollama_host.rstrip("/")
+        self.model = model
+        self.batch_size = batch_size
+
+    def embed(self, sentences: List[str]) -> np.ndarray:
+        """Unit-normalized float32 matrix with one row per sentence"""
+        vectors = []
+        with httpx.Client(timeout=EMBED_TIMEOUT_SECONDS) as client:
+            for i in range(0, len(sentences), self.batch_size):
+                batch = sentences[i:i + self.batch_size]
+                response = client.post(
+                    f"{self.ollama_host}/api/embed",
+                    json={"model": self.model, "input": batch}
+                )
+                response.raise_for_status()
+                embeddings = response.json().get("embeddings") or []
+                if len(embeddings) != len(batch):
+                    raise ValueError(f"Ollama returned {len(embeddings)} embeddings for {len(batch)} sentences")
+                vectors.append(np.asarray(embeddings, dtype=np.float32))
+        return normalize_rows(np.vstack(vectors))
+
+
+@lru_cache(maxsize=None)
+def get_sentence_embedder(model: str) -> OllamaSentenceEmbedder:
+    # Imported lazily: the chunker itself does not need application settings
+    from core.config import settings
+    return OllamaSentenceEmbedder(settings.OLLAMA_HOST, model)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def adjacent_window_similarity(embeddings: np.ndarray, window: int) -> np.ndarray:
+    """
+    Cosine similarity across every sentence gap.
+
+    Element i compares the mean of the `window` sentences before gap i
+    (between sentence i and i + 1) with the mean of the `window` sentences
+    after it. Window sums come from one cumulative sum, so the whole pass is
+    O(n * dim).
+    """
+    count = len(embeddings)
+    if count < 2:
+        return np.empty(0, dtype=np.float32)
+
+    window = max(1, window)
+    cumulative = np.vstack([np.zeros((1, embeddings.shape[1]), dtype=embeddings.dtype), np.cumsum(embeddings, axis=0)])
+    gaps = np.arange(1, count)
+    before = cumulative[gaps] - cumulative[np.maximum(gaps - window, 0)]
+    after = cumulative[np.minimum(gaps + window, count)] - cumulative[gaps]
+
+    before = normalize_rows(before)
+    after = normalize_rows(after)
+    return np.einsum("ij,ij->i", before, after)
+
+
+def semantic_breakpoints(embeddings: np.ndarray, window: int, percentile: float) -> List[int]:
+    """
+    Indexes of the sentences that start a new topic.
+
+    A gap is a breakpoint when its cosine distance is above the given
+    percentile of all gap distances in the document.
+    """
+    similarity = adjacent_window_similarity(embeddings, window)
+    if similarity.size == 0:
+        return []
+    distance = 1.0 - similarity
+    threshold = np.percentile(distance, percentile)
+    return (np.flatnonzero(distance > threshold) + 1).tolist()
+
+
+class _EmbeddingCache:
+    """LRU of sentence embeddings keyed by model and sentence digest"""
+
+    def __init__(self, maxsize: int = EMBEDDING_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(model: str, sentences: List[str]) -> Tuple[str, str]:
+        digest = hashlib.blake2b(digest_size=16)
+        for sentence in sentences:
+            digest.update(sentence.encode("utf-8", "surrogatepass"))
+            digest.update(b"\0")
+        return model, digest.hexdigest()
+
+    def get(self, model: str, sentences: List[str]) -> Optional[np.ndarray]:
+        key = self._key(model, sentences)
+        with self._lock:
+            embeddings = self._entries.get(key)
+            if embeddings is not None:
+                self._entries.move_to_end(key)
+            return embeddings
+
+    def put(self, model: str, sentences: List[str], embeddings: np.ndarray) -> None:
+        key = self._key(model, sentences)
+        with self._lock:
+            self._entries[key] = embeddings
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+sentence_embedding_cache = _EmbeddingCache()
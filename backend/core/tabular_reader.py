@@ -0,0 +1,315 @@
+"""
+Batched readers for tabular data collections.
+
+Supported formats:
+- CSV (pandas, read in row chunks)
+- XLSX / XLS (pandas; the workbook is loaded once, then sliced into batches)
+- JSONL (JSON Lines, one object per line, parsed line by line)
+- Parquet (pyarrow, iterated by row group with column projection)
+
+Every reader yields pandas DataFrames of at most batch_size rows, so ingestion
+never materializes a whole large export.
+
+CSV, XLSX and JSONL uploads are converted once into a Parquet copy next to
+the original (``<file>.parquet``, typed columns, row groups with
+statistics). Every read goes through that copy when it is present and up to
+date, so preview, ingestion and analysis get column projection, and
+filtered reads skip row groups by their statistics. Files whose batches do
+not share a schema are left unconverted and read in their original format.
+"""
+
+import json
+import logging
+import os
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TABULAR_BATCH_ROWS = 10_000
+
+# JSONL lines sampled to discover column names
+JSONL_SCHEMA_SAMPLE_LINES = 1000
+
+# Rows per row group of converted Parquet copies
+PARQUET_ROW_GROUP_ROWS = 100_000
+
+# (column, op, value) conditions that must all hold, as in pyarrow.parquet.read_table
+Filters = List[Tuple[str, str, Any]]
+
+_FILTER_OPS = {
+    '==': lambda column, value: column == value,
+    '=': lambda column, value: column == value,
+    '!=': lambda column, value: column != value,
+    '<': lambda column, value: column < value,
+    '<=': lambda column, value: column <= value,
+    '>': lambda column, value: column > value,
+    '>=': lambda column, value: column >= value,
+    'in': lambda column, value: column.isin(value),
+    'not in': lambda column, value: ~column.isin(value),
+}
+
+
+class TabularReader:
+    """Reads tabular files as a stream of DataFrame batches"""
+
+    SUPPORTED_EXTENSIONS = {'csv', 'xlsx', 'xls', 'jsonl', 'parquet'}
+
+    def get_file_extension(self, file_path: str) -> str:
+        if not file_path or '.' not in file_path:
+            return ''
+        return file_path.rsplit('.', 1)[1].lower()
+
+    def is_supported(self, filename: str) -> bool:
+        return self.get_file_extension(filename) in self.SUPPORTED_EXTENSIONS
+
+    def _check_file(self, file_path: str) -> str:
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+        ext = self.get_file_extension(file_path)
+        if ext not in self.SUPPORTED_EXTENSIONS:
+            raise ValueError(f"Unsupported tabular file type: {ext}")
+        return ext
+
+    @staticmethod
+    def _parquet_module():
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet files require pyarrow. Install it with: pip install pyarrow")
+        return pq
+
+    def _parquet_file(self, file_path: str):
+        return self._parquet_module().ParquetFile(file_path)
+
+    def columnar_path(self, file_path: str) -> str:
+        """Location of the Parquet copy of a tabular file"""
+        if self.get_file_extension(file_path) == 'parquet':
+            return file_path
+        return f"{file_path}.parquet"
+
+    def _resolve(self, file_path: str) -> Tuple[str, str]:
+        """(path, extension) to read: the Parquet copy when it is up to date, else the file itself"""
+        ext = self._check_file(file_path)
+        if ext == 'parquet':
+            return file_path, ext
+        columnar = self.columnar_path(file_path)
+        try:
+            if os.path.getmtime(columnar) >= os.path.getmtime(file_path):
+                return columnar, 'parquet'
+        except OSError:
+            pass
+        return file_path, ext
+
+    def convert_to_parquet(self, file_path: str, row_group_rows: int = PARQUET_ROW_GROUP_ROWS) -> Optional[str]:
+        """
+        Write the Parquet copy of a CSV, XLSX or JSONL file and return its path.
+
+        Column types come from the first batch. Columns missing from a later
+        batch are written as nulls. Returns None, leaving readers on the
+        original file, when the file is already Parquet, is empty or has
+        batches that cannot be cast to the first batch's schema (new
+        columns, ints turning into text).
+        """
+        ext = self._check_file(file_path)
+        if ext == 'parquet':
+            return None
+        pq = self._parquet_module()
+        import pyarrow as pa
+
+        dest_path = self.columnar_path(file_path)
+        tmp_path = f"{dest_path}.tmp"
+        writer = None
+        try:
+            for batch in self._iter_source(file_path, ext, None, row_group_rows):
+                table = pa.Table.from_pandas(batch, preserve_index=False)
+                if writer is None:
+                    # An all-empty first batch says nothing about the type; keep such columns as text
+                    schema = pa.schema([
+                        field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                        for field in table.schema
+                    ], metadata=table.schema.metadata)
+                    writer = pq.ParquetWriter(tmp_path, schema, compression='zstd', write_statistics=True)
+                writer.write_table(_conform(table, writer.schema), row_group_size=row_group_rows)
+        except (pa.ArrowException, ValueError) as e:
+            logger.warning(f"Keeping {file_path} in its original format, Parquet conversion failed: {e}")
+            if writer is not None:
+                writer.close()
+                writer = None
+            _remove(tmp_path)
+            return None
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if not os.path.exists(tmp_path):
+            return None
+        os.replace(tmp_path, dest_path)
+        logger.info(f"Converted {file_path} to {dest_path}")
+        return dest_path
+
+    def read_columns(self, file_path: str) -> List[str]:
+        """Column names without reading the data (JSONL: keys of the first lines)"""
+        file_path, ext = self._resolve(file_path)
+        if ext == 'parquet':
+            return list(self._parquet_file(file_path).schema_arrow.names)
+        if ext == 'jsonl':
+            columns: Dict[str, None] = {}
+            for record in islice(self._iter_jsonl_records(file_path), JSONL_SCHEMA_SAMPLE_LINES):
+                columns.update(dict.fromkeys(record))
+            return list(columns)
+        if ext == 'csv':
+            return pd.read_csv(file_path, nrows=0).columns.tolist()
+        return pd.read_excel(file_path, nrows=0).columns.tolist()
+
+    def count_rows(self, file_path: str) -> int:
+        file_path, ext = self._resolve(file_path)
+        if ext == 'parquet':
+            return self._parquet_file(file_path).metadata.num_rows
+        if ext == 'jsonl':
+            return sum(1 for _ in self._iter_jsonl_records(file_path))
+        return sum(len(batch) for batch in self.iter_batches(file_path))
+
+    def iter_batches(
+        self,
+        file_path: str,
+        columns: Optional[List[str]] = None,
+        batch_size: int = TABULAR_BATCH_ROWS,
+        filters: Optional[Filters] = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Yield the file as DataFrames of at most batch_size rows.
+
+        Args:
+            file_path: Path to the tabular file
+            columns: Only read these columns (Parquet only reads their column chunks)
+            batch_size: Maximum rows per DataFrame
+            filters: Only yield rows matching all (column, op, value)
+                conditions; ops are ==, !=, <, <=, >, >=, in, not in.
+                Parquet skips row groups whose statistics rule them out.
+        """
+        file_path, ext = self._resolve(file_path)
+        if ext == 'parquet':
+            yield from self._iter_parquet(file_path, columns, batch_size, filters)
+            return
+
+        # Filter columns have to be read even when they are not returned
+        read_columns = columns
+        if filters and columns is not None:
+            read_columns = columns + [name for name, _, _ in filters if name not in columns]
+        for batch in self._iter_source(file_path, ext, read_columns, batch_size):
+            if filters:
+                batch = _filter_frame(batch, filters)
+                if columns is not None:
+                    batch = batch[columns]
+                if batch.empty:
+                    continue
+            yield batch
+
+    def _iter_source(
+        self,
+        file_path: str,
+        ext: str,
+        columns: Optional[List[str]],
+        batch_size: int
+    ) -> Iterator[pd.DataFrame]:
+        """Batches of a CSV, XLSX or JSONL file itself"""
+        if ext == 'jsonl':
+            yield from self._iter_jsonl(file_path, columns, batch_size)
+        elif ext == 'csv':
+            for batch in pd.read_csv(file_path, usecols=columns, chunksize=batch_size):
+                yield batch
+        else:
+            df = pd.read_excel(file_path, usecols=columns)
+            for start in range(0, len(df), batch_size):
+                yield df.iloc[start:start + batch_size]
+
+    def preview(self, file_path: str, nrows: int = 50) -> pd.DataFrame:
+        """First nrows rows, reading only as much of the file as needed"""
+        for batch in self.iter_batches(file_path, batch_size=nrows):
+            return batch
+        return pd.DataFrame(columns=self.read_columns(file_path))
+
+    def _iter_parquet(
+        self,
+        file_path: str,
+        columns: Optional[List[str]],
+        batch_size: int,
+        filters: Optional[Filters] = None
+    ) -> Iterator[pd.DataFrame]:
+        if filters:
+            import pyarrow.dataset as ds
+            dataset = ds.dataset(file_path, format='parquet')
+            expression = self._parquet_module().filters_to_expression(filters)
+            for record_batch in dataset.to_batches(columns=columns, filter=expression, batch_size=batch_size):
+                if record_batch.num_rows:
+                    yield record_batch.to_pandas()
+            return
+        parquet_file = self._parquet_file(file_path)
+        for record_batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+            yield record_batch.to_pandas()
+
+    @staticmethod
+    def _iter_jsonl_records(file_path: str) -> Iterator[Dict[str, Any]]:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Invalid JSON on line {line_number}: {e}")
+                if not isinstance(record, dict):
+                    record = {'value': record}
+                yield record
+
+    def _iter_jsonl(self, file_path: str, columns: Optional[List[str]], batch_size: int) -> Iterator[pd.DataFrame]:
+        records = self._iter_jsonl_records(file_path)
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            rows = [
+                {
+                    # Nested values stay JSON so they round-trip as text
+                    key: json.dumps(value) if isinstance(value, (dict, list)) else value
+                    for key, value in record.items()
+                    if columns is None or key in columns
+                }
+                for record in batch
+            ]
+            yield pd.DataFrame(rows, columns=columns)
+
+
+def _conform(table, schema):
+    """Cast a batch to the writer schema, adding columns it lacks as nulls"""
+    import pyarrow as pa
+
+    extra = set(table.column_names) - set(schema.names)
+    if extra:
+        raise ValueError(f"Columns {sorted(extra)} are not in the first batch")
+    arrays = [
+        table.column(field.name).cast(field.type) if field.name in table.column_names
+        else pa.nulls(table.num_rows, field.type)
+        for field in schema
+    ]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _filter_frame(df: pd.DataFrame, filters: Filters) -> pd.DataFrame:
+    mask = pd.Series(True, index=df.index)
+    for name, op, value in filters:
+        if op not in _FILTER_OPS:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        mask &= _FILTER_OPS[op](df[name], value)
+    return df[mask]
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -7,16 +7,132 @@ Supported chunking methods:
 - paragraph: Split text by paragraphs
 - semantic: Split text at semantic boundaries (sentences that end topics)
 - recursive: Recursively split using multiple separators (LangChain-style)
+- token: Split into chunks measured in embedding-model tokens
+- embedding_semantic: Split where sentence embeddings show a topic change
 """
 
+import os
 import re
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator, Callable
 from dataclasses import dataclass
+from functools import lru_cache
 from enum import Enum
 
+import numpy as np
+
+from core.parallel import PARALLEL_CHUNKING_MIN_CHARS, PARALLEL_WORKERS, map_ordered, parallel_enabled
+from core.sentence_embeddings import get_sentence_embedder, semantic_breakpoints, sentence_embedding_cache
+from core.tokenization import get_tokenizer, tokenization_cache
+
 logger = logging.getLogger(__name__)
 
+# First non-whitespace character after whitespace
+_WORD_START = re.compile(r"(?<=\s)\S")
+
+
+# chunk_stream: characters buffered before emitting chunks, and chunks held
+# back from each window so the next window can rebuild them with overlap
+STREAM_WINDOW_CHARS = 64 * 1024
+STREAM_TAIL_CHUNKS = 2
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_LINE_BREAK = re.compile(r"\n")
+_WHITESPACE = re.compile(r"\s+")
+
+
+# Sentences opening with a transition phrase, a numbered item or a bullet
+# start a new topic for the semantic chunker
+_SEMANTIC_BOUNDARY = re.compile(
+    r"(?:However|Nevertheless|Furthermore|Moreover|In conclusion|Therefore|Thus|Finally"
+    r"|Consequently|As a result"
+    r"|First|Second|Third|Next|Then|Lastly|Additionally"
+    r"|On the other hand|In contrast|Alternatively|Meanwhile"
+    r"|In summary|To summarize|Overall|In short)"
+    r"|\d+\."
+    r"|[-•*]",
+    re.IGNORECASE
+)
+
+# NLTK's pretrained English punkt parameters (punkt_tab, see punkt_tab/README),
+# shipped with the backend so sentence splitting never depends on NLTK data
+# being installed or downloadable
+PUNKT_DIR = os.path.join(os.path.dirname(__file__), "punkt_tab", "english")
+
+
+def _read_punkt_lines(filename: str) -> List[str]:
+    with open(os.path.join(PUNKT_DIR, filename), encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def load_punkt_params():
+    """PunktParameters from the vendored punkt_tab files (same format as nltk's load_punkt_params)"""
+    from nltk.tokenize.punkt import PunktParameters
+    
+    params = PunktParameters()
+    params.abbrev_types = set(_read_punkt_lines("abbrev_types.txt"))
+    params.sent_starters = set(_read_punkt_lines("sent_starters.txt"))
+    params.collocations = {tuple(line.split("\t")) for line in _read_punkt_lines("collocations.tab")}
+    for line in _read_punkt_lines("ortho_context.tab"):
+        word, flags = line.split("\t")
+        params.ortho_context[word] = int(flags)
+    return params
+
+
+@lru_cache(maxsize=1)
+def _load_punkt_tokenizer():
+    """Build the punkt sentence tokenizer from the vendored parameters once; None if unavailable"""
+    try:
+        from nltk.tokenize.punkt import PunktSentenceTokenizer
+        
+        return PunktSentenceTokenizer(load_punkt_params())
+    except Exception as e:
+        logger.warning(f"Punkt sentence tokenizer unavailable, using regex sentence splitting: {e}")
+        return None
+
+
+def _section_spans(text: str, target: int) -> List[Tuple[int, int]]:
+    """Cut text into spans of roughly target characters at paragraph, line or word breaks"""
+    spans = []
+    start = 0
+    while len(text) - start > target:
+        cut = None
+        for pattern in (_PARAGRAPH_BREAK, _LINE_BREAK, _WHITESPACE):
+            match = pattern.search(text, start + target, start + 2 * target)
+            if match:
+                cut = match.end()
+                break
+        if cut is None:
+            cut = start + target
+        spans.append((start, cut))
+        start = cut
+    spans.append((start, len(text)))
+    return spans
+
+
+def _chunk_section(job: Tuple[str, int, str, Dict[str, Any]]) -> List[Tuple[str, int, int, Dict[str, Any]]]:
+    """Process pool worker: chunk one section and move its chunks to document offsets"""
+    section, offset, method, method_config = job
+    chunks = get_text_chunker()._chunk_with_method(section, ChunkingMethod(method), method_config)
+    # Plain tuples pickle several times faster than Chunk instances
+    return [(c.content, c.start_char + offset, c.end_char + offset, c.metadata) for c in chunks]
+
+
+@lru_cache(maxsize=1)
+def get_text_chunker() -> "TextChunker":
+    """Process-wide TextChunker; it holds no per-call state and is safe to share"""
+    return TextChunker()
+
+
+def _trim_span(text: str, start: int, end: int) -> Optional[Tuple[int, int]]:
+    """Shrink text[start:end] to exclude surrounding whitespace; None if nothing is left"""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return (start, end) if start < end else None
+
 
 class ChunkingMethod(str, Enum):
     """Available chunking methodologies"""
@@ -25,6 +141,8 @@ class ChunkingMethod(str, Enum):
     PARAGRAPH = "paragraph"
     SEMANTIC = "semantic"
     RECURSIVE = "recursive"
+    TOKEN = "token"
+    EMBEDDING_SEMANTIC = "embedding_semantic"
 
 
 @dataclass
@@ -62,28 +180,28 @@ class TextChunker:
             "chunk_size": 512,
             "chunk_overlap": 50,
             "separators": ["\n\n", "\n", ". ", " ", ""]
+        },
+        ChunkingMethod.TOKEN: {
+            "max_tokens": 512,
+            "overlap_tokens": 50,
+            "embedding_model": "nomic-embed-text"
+        },
+        ChunkingMethod.EMBEDDING_SEMANTIC: {
+            "embedding_model": "nomic-embed-text",
+            "window_sentences": 3,
+            "breakpoint_percentile": 90,
+            "min_chunk_size": 200,
+            "max_chunk_size": 2000
         }
     }
     
-    def __init__(self):
-        self._init_nltk()
-    
-    def _init_nltk(self):
-        """Initialize NLTK resources for sentence tokenization"""
-        try:
-            import nltk
-            try:
-                nltk.data.find('tokenizers/punkt')
-            except LookupError:
-                logger.info("Downloading NLTK punkt tokenizer...")
-                nltk.download('punkt', quiet=True)
-            try:
-                nltk.data.find('tokenizers/punkt_tab')
-            except LookupError:
-                logger.info("Downloading NLTK punkt_tab tokenizer...")
-                nltk.download('punkt_tab', quiet=True)
-        except Exception as e:
-            logger.warning(f"Failed to initialize NLTK: {e}")
+    def __init__(self, sentence_embedder: Optional[Callable[[List[str], str], np.ndarray]] = None):
+        """
+        Args:
+            sentence_embedder: Function (sentences, embedding_model) -> unit-normalized
+                matrix, used by the embedding_semantic method. Defaults to Ollama.
+        """
+        self.sentence_embedder = sentence_embedder
     
     def chunk(
         self, 
@@ -110,7 +228,12 @@ class TextChunker:
         if config:
             method_config.update(config)
         
-        # Call appropriate chunking method
+        if parallel_enabled() and len(text) >= PARALLEL_CHUNKING_MIN_CHARS:
+            return self._chunk_parallel(text, method, method_config)
+        return self._chunk_with_method(text, method, method_config)
+    
+    def _chunk_with_method(self, text: str, method: ChunkingMethod, method_config: Dict[str, Any]) -> List[Chunk]:
+        """Call the appropriate chunking method with a fully merged config"""
         if method == ChunkingMethod.FIXED_SIZE:
             return self._chunk_fixed_size(text, method_config)
         elif method == ChunkingMethod.SENTENCE:
@@ -121,10 +244,111 @@ class TextChunker:
             return self._chunk_semantic(text, method_config)
         elif method == ChunkingMethod.RECURSIVE:
             return self._chunk_recursive(text, method_config)
+        elif method == ChunkingMethod.TOKEN:
+            return self._chunk_by_tokens(text, method_config)
+        elif method == ChunkingMethod.EMBEDDING_SEMANTIC:
+            return self._chunk_embedding_semantic(text, method_config)
         else:
             logger.warning(f"Unknown chunking method: {method}, falling back to recursive")
             return self._chunk_recursive(text, self.DEFAULT_CONFIGS[ChunkingMethod.RECURSIVE])
     
+    def _chunk_parallel(self, text: str, method: ChunkingMethod, method_config: Dict[str, Any]) -> List[Chunk]:
+        """
+        Chunk a large text as independent sections in the process pool.
+        
+        Sections end at paragraph breaks where possible, so chunks never span
+        two sections and there is no overlap across a section boundary.
+        Results are reassembled in order with document-global offsets and
+        sequential indexes.
+        """
+        target = max(len(text) // (PARALLEL_WORKERS * 2), PARALLEL_CHUNKING_MIN_CHARS // 4)
+        sections = _section_spans(text, target)
+        jobs = [(text[start:end], start, method.value, method_config) for start, end in sections]
+        
+        chunks = []
+        for section_chunks in map_ordered(_chunk_section, jobs):
+            for content, start_char, end_char, metadata in section_chunks:
+                chunks.append(Chunk(
+                    content=content,
+                    index=len(chunks),
+                    start_char=start_char,
+                    end_char=end_char,
+                    metadata=metadata
+                ))
+        return chunks
+    
+    def chunk_stream(
+        self,
+        segments: Iterable[str],
+        method: ChunkingMethod = ChunkingMethod.RECURSIVE,
+        config: Optional[Dict[str, Any]] = None,
+        window_chars: int = STREAM_WINDOW_CHARS
+    ) -> Iterator[Chunk]:
+        """
+        Chunk a document delivered as an iterable of text segments (pages, paragraphs, blocks).
+        
+        Segments are concatenated as-is, so offsets match the joined document.
+        Text is buffered until window_chars is reached, then every chunk except
+        the last STREAM_TAIL_CHUNKS is yielded. The buffer restarts at the first
+        retained chunk, which carries the overlap state into the next window.
+        Memory therefore stays proportional to the window, not the document.
+        With the process pool enabled the window is raised to
+        PARALLEL_CHUNKING_MIN_CHARS, so each window is chunked in parallel.
+        
+        Args:
+            segments: Iterable of text pieces, in document order
+            method: The chunking method to use
+            config: Optional configuration overrides for the method
+            window_chars: Characters buffered before chunks are emitted
+            
+        Yields:
+            Chunk objects with document-global offsets and sequential indexes
+        """
+        if parallel_enabled():
+            # Smaller windows would never reach the process pool
+            window_chars = max(window_chars, PARALLEL_CHUNKING_MIN_CHARS)
+        
+        parts: List[str] = []
+        buffered = 0
+        offset = 0  # Document offset of the buffer start
+        index = 0
+        
+        for segment in segments:
+            if not segment:
+                continue
+            parts.append(segment)
+            buffered += len(segment)
+            if buffered < window_chars:
+                continue
+            
+            buffer = "".join(parts)
+            chunks = self.chunk(buffer, method=method, config=config)
+            if len(chunks) <= STREAM_TAIL_CHUNKS:
+                parts = [buffer]
+                continue
+            
+            for chunk in chunks[:-STREAM_TAIL_CHUNKS]:
+                yield self._rebase_chunk(chunk, offset, index)
+                index += 1
+            
+            keep_from = chunks[-STREAM_TAIL_CHUNKS].start_char
+            parts = [buffer[keep_from:]]
+            buffered = len(parts[0])
+            offset += keep_from
+        
+        buffer = "".join(parts)
+        for chunk in self.chunk(buffer, method=method, config=config):
+            yield self._rebase_chunk(chunk, offset, index)
+            index += 1
+    
+    @staticmethod
+    def _rebase_chunk(chunk: Chunk, offset: int, index: int) -> Chunk:
+        """Move a chunk from buffer-relative to document-global position"""
+        chunk.index = index
+        chunk.start_char += offset
+        chunk.end_char += offset
+        return chunk
+    
     def _chunk_fixed_size(self, text: str, config: Dict[str, Any]) -> List[Chunk]:
         """Split text into fixed-size chunks with overlap"""
         chunk_size = config.get("chunk_size", 512)
@@ -162,45 +386,62 @@ class TextChunker:
         
         return chunks
     
+    def _sentence_spans(self, text: str) -> List[Tuple[int, int]]:
+        """(start, end) offsets of the non-empty sentences of text"""
+        tokenizer = _load_punkt_tokenizer()
+        if tokenizer is not None:
+            try:
+                raw_spans = tokenizer.span_tokenize(text)
+            except Exception:
+                raw_spans = None
+        else:
+            raw_spans = None
+        
+        if raw_spans is None:
+            # Fallback to simple regex-based sentence splitting
+            raw_spans = []
+            start = 0
+            for match in _SENTENCE_BREAK.finditer(text):
+                raw_spans.append((start, match.start()))
+                start = match.end()
+            raw_spans.append((start, len(text)))
+        
+        spans = []
+        for start, end in raw_spans:
+            span = _trim_span(text, start, end)
+            if span:
+                spans.append(span)
+        return spans
+    
     def _chunk_by_sentence(self, text: str, config: Dict[str, Any]) -> List[Chunk]:
         """Split text by sentences with configurable grouping"""
         sentences_per_chunk = config.get("sentences_per_chunk", 5)
         overlap_sentences = config.get("overlap_sentences", 1)
         
-        # Try to use NLTK for sentence tokenization
-        try:
-            import nltk
-            sentences = nltk.sent_tokenize(text)
-        except Exception:
-            # Fallback to simple regex-based sentence splitting
-            sentences = re.split(r'(?<=[.!?])\s+', text)
+        spans = self._sentence_spans(text)
         
         chunks = []
         index = 0
         i = 0
         
-        while i < len(sentences):
-            chunk_sentences = sentences[i:i + sentences_per_chunk]
-            chunk_text = ' '.join(chunk_sentences).strip()
+        while i < len(spans):
+            chunk_spans = spans[i:i + sentences_per_chunk]
+            chunk_text = ' '.join(text[start:end] for start, end in chunk_spans).strip()
             
             if chunk_text:
-                # Calculate character positions
-                start_char = text.find(chunk_sentences[0]) if chunk_sentences else 0
-                end_char = start_char + len(chunk_text)
-                
                 chunks.append(Chunk(
                     content=chunk_text,
                     index=index,
-                    start_char=start_char,
-                    end_char=end_char,
+                    start_char=chunk_spans[0][0],
+                    end_char=chunk_spans[-1][1],
                     metadata={
                         "method": "sentence",
-                        "sentences_count": len(chunk_sentences)
+                        "sentences_count": len(chunk_spans)
                     }
                 ))
                 index += 1
             
-            i += sentences_per_chunk - overlap_sentences
+            i += max(1, sentences_per_chunk - overlap_sentences)
         
         return chunks
     
@@ -209,27 +450,33 @@ class TextChunker:
         min_length = config.get("min_paragraph_length", 100)
         combine_short = config.get("combine_short_paragraphs", True)
         
-        # Split by double newlines (paragraphs)
-        raw_paragraphs = re.split(r'\n\s*\n', text)
+        # Split by double newlines (paragraphs), keeping each paragraph's position
+        paragraph_spans = []
+        para_start = 0
+        for match in _PARAGRAPH_BREAK.finditer(text):
+            paragraph_spans.append((para_start, match.start()))
+            para_start = match.end()
+        paragraph_spans.append((para_start, len(text)))
         
         chunks = []
         current_chunk = ""
         current_start = 0
+        current_end = 0
         index = 0
-        char_pos = 0
         
-        for para in raw_paragraphs:
-            para = para.strip()
-            if not para:
-                char_pos += 2  # Account for the split characters
+        for span_start, span_end in paragraph_spans:
+            span = _trim_span(text, span_start, span_end)
+            if not span:
                 continue
+            para = text[span[0]:span[1]]
             
             if combine_short and len(current_chunk) + len(para) < min_length:
                 if current_chunk:
                     current_chunk += "\n\n" + para
                 else:
                     current_chunk = para
-                    current_start = char_pos
+                    current_start = span[0]
+                current_end = span[1]
             else:
                 # Save current chunk if exists
                 if current_chunk:
@@ -237,15 +484,13 @@ class TextChunker:
                         content=current_chunk,
                         index=index,
                         start_char=current_start,
-                        end_char=current_start + len(current_chunk),
+                        end_char=current_end,
                         metadata={"method": "paragraph"}
                     ))
                     index += 1
                 
                 current_chunk = para
-                current_start = char_pos
-            
-            char_pos += len(para) + 2  # +2 for paragraph separator
+                current_start, current_end = span
         
         # Don't forget the last chunk
         if current_chunk:
@@ -253,7 +498,7 @@ class TextChunker:
                 content=current_chunk,
                 index=index,
                 start_char=current_start,
-                end_char=current_start + len(current_chunk),
+                end_char=current_end,
                 metadata={"method": "paragraph"}
             ))
         
@@ -268,35 +513,19 @@ class TextChunker:
         min_chunk_size = config.get("min_chunk_size", 100)
         
         # Get sentences
-        try:
-            import nltk
-            sentences = nltk.sent_tokenize(text)
-        except Exception:
-            sentences = re.split(r'(?<=[.!?])\s+', text)
-        
-        # Semantic boundary indicators
-        boundary_patterns = [
-            r'^(However|Nevertheless|Furthermore|Moreover|In conclusion|Therefore|Thus|Finally|Consequently|As a result)',
-            r'^(First|Second|Third|Next|Then|Lastly|Additionally)',
-            r'^(On the other hand|In contrast|Alternatively|Meanwhile)',
-            r'^(In summary|To summarize|Overall|In short)',
-            r'^\d+\.',  # Numbered lists
-            r'^[-•*]',  # Bullet points
-        ]
+        sentence_spans = self._sentence_spans(text)
         
         chunks = []
         current_chunk = ""
         current_start = 0
+        current_end = 0
         index = 0
-        char_pos = 0
         
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
-                continue
+        for sentence_start, sentence_end in sentence_spans:
+            sentence = text[sentence_start:sentence_end]
             
             # Check if this sentence is a semantic boundary
-            is_boundary = any(re.match(pattern, sentence, re.IGNORECASE) for pattern in boundary_patterns)
+            is_boundary = _SEMANTIC_BOUNDARY.match(text, sentence_start) is not None
             
             # Check if we should start a new chunk
             should_split = (
@@ -308,20 +537,19 @@ class TextChunker:
                     content=current_chunk.strip(),
                     index=index,
                     start_char=current_start,
-                    end_char=current_start + len(current_chunk),
+                    end_char=current_end,
                     metadata={"method": "semantic"}
                 ))
                 index += 1
                 current_chunk = sentence
-                current_start = char_pos
+                current_start = sentence_start
             else:
                 if current_chunk:
                     current_chunk += " " + sentence
                 else:
                     current_chunk = sentence
-                    current_start = char_pos
-            
-            char_pos += len(sentence) + 1
+                    current_start = sentence_start
+            current_end = sentence_end
         
         # Add the last chunk
         if current_chunk:
@@ -329,112 +557,245 @@ class TextChunker:
                 content=current_chunk.strip(),
                 index=index,
                 start_char=current_start,
-                end_char=current_start + len(current_chunk),
+                end_char=current_end,
                 metadata={"method": "semantic"}
             ))
         
         return chunks
     
+    def _embed_sentences(self, sentences: List[str], model: str) -> np.ndarray:
+        embeddings = sentence_embedding_cache.get(model, sentences)
+        if embeddings is None:
+            if self.sentence_embedder is not None:
+                embeddings = self.sentence_embedder(sentences, model)
+            else:
+                embeddings = get_sentence_embedder(model).embed(sentences)
+            sentence_embedding_cache.put(model, sentences, embeddings)
+        return embeddings
+    
+    def _chunk_embedding_semantic(self, text: str, config: Dict[str, Any]) -> List[Chunk]:
+        """
+        Split text where the meaning of consecutive sentences shifts.
+        
+        All sentences are embedded in batches, and a boundary is placed before
+        a sentence when the similarity between the windows around it falls
+        into the lowest (100 - breakpoint_percentile) percent of the document.
+        Chunks are grown to at least min_chunk_size characters before a
+        boundary is honoured and never exceed max_chunk_size; a single longer
+        sentence is split recursively. Falls back to the heuristic semantic
+        method when embeddings are unavailable.
+        """
+        max_chunk_size = config.get("max_chunk_size", 2000)
+        min_chunk_size = config.get("min_chunk_size", 200)
+        
+        sentence_spans = self._sentence_spans(text)
+        if len(sentence_spans) < 2:
+            return self._chunk_semantic(text, {"max_chunk_size": max_chunk_size, "min_chunk_size": min_chunk_size})
+        
+        try:
+            embeddings = self._embed_sentences(
+                [text[start:end] for start, end in sentence_spans],
+                config.get("embedding_model", "nomic-embed-text")
+            )
+        except Exception as e:
+            logger.warning(f"Sentence embeddings unavailable, using heuristic semantic chunking: {e}")
+            return self._chunk_semantic(text, {"max_chunk_size": max_chunk_size, "min_chunk_size": min_chunk_size})
+        
+        breakpoints = set(semantic_breakpoints(
+            embeddings,
+            window=int(config.get("window_sentences", 3)),
+            percentile=float(config.get("breakpoint_percentile", 90))
+        ))
+        
+        chunks = []
+        
+        def add_chunk(start: int, end: int):
+            if end - start <= max_chunk_size:
+                chunks.append(self._span_chunk(text, len(chunks), start, end, "embedding_semantic"))
+                return
+            for piece in self._chunk_recursive(text[start:end], {"chunk_size": max_chunk_size, "chunk_overlap": 0}):
+                chunks.append(self._span_chunk(
+                    text, len(chunks), start + piece.start_char, start + piece.end_char, "embedding_semantic"
+                ))
+        
+        chunk_start, chunk_end = sentence_spans[0]
+        for i, (sentence_start, sentence_end) in enumerate(sentence_spans[1:], start=1):
+            at_boundary = i in breakpoints and chunk_end - chunk_start >= min_chunk_size
+            if at_boundary or sentence_end - chunk_start > max_chunk_size:
+                add_chunk(chunk_start, chunk_end)
+                chunk_start = sentence_start
+            chunk_end = sentence_end
+        add_chunk(chunk_start, chunk_end)
+        
+        return chunks
+    
     def _chunk_recursive(self, text: str, config: Dict[str, Any]) -> List[Chunk]:
         """
         Recursively split text using multiple separators.
         This is similar to LangChain's RecursiveCharacterTextSplitter.
+        
+        Works on (start, end) spans into the original text, so chunk content is
+        always text[start_char:end_char] and the whole pass is linear in the
+        text length.
         """
         chunk_size = config.get("chunk_size", 512)
         chunk_overlap = config.get("chunk_overlap", 50)
         separators = config.get("separators", ["\n\n", "\n", ". ", " ", ""])
         
-        def split_text(text: str, separators: List[str]) -> List[str]:
-            """Recursively split text using the list of separators"""
-            if not separators:
-                return [text]
+        pieces = self._split_spans(text, 0, len(text), separators, chunk_size)
+        
+        # Merge pieces into chunks of at most chunk_size characters
+        chunks = []
+        chunk_start = None
+        chunk_end = None
+        
+        for piece_start, piece_end in pieces:
+            if chunk_start is None:
+                chunk_start, chunk_end = piece_start, piece_end
+                continue
             
-            separator = separators[0]
-            remaining_separators = separators[1:]
+            if piece_end - chunk_start <= chunk_size:
+                chunk_end = piece_end
+                continue
             
-            if separator == "":
-                # Base case: split by character
-                return list(text)
+            chunks.append(self._span_chunk(text, len(chunks), chunk_start, chunk_end, "recursive"))
             
-            splits = text.split(separator)
+            # Start the next chunk with up to chunk_overlap characters of the
+            # previous one, beginning at a word boundary
+            next_start = piece_start
+            if chunk_overlap > 0:
+                overlap_start = max(chunk_end - chunk_overlap, piece_end - chunk_size, chunk_start + 1)
+                match = _WORD_START.search(text, overlap_start, chunk_end)
+                if match:
+                    next_start = match.start()
+            chunk_start, chunk_end = next_start, piece_end
+        
+        # Add the last chunk
+        if chunk_start is not None:
+            chunks.append(self._span_chunk(text, len(chunks), chunk_start, chunk_end, "recursive"))
+        
+        return chunks
+    
+    def _chunk_by_tokens(self, text: str, config: Dict[str, Any]) -> List[Chunk]:
+        """
+        Split text into chunks of at most max_tokens tokens of the embedding model.
+        
+        max_tokens is capped at the model context. Within the last quarter of
+        each window the cut moves back to the best boundary: line break, then
+        sentence end, then whitespace. The next chunk repeats up to
+        overlap_tokens tokens, starting at a word.
+        """
+        tokenizer = get_tokenizer(config.get("embedding_model"))
+        max_tokens = min(max(1, int(config.get("max_tokens", 512))), tokenizer.max_chunk_tokens)
+        overlap = min(max(0, int(config.get("overlap_tokens", 50))), max_tokens - 1)
+        
+        spans = tokenization_cache.token_spans(tokenizer, text)
+        total = len(spans)
+        
+        def boundary_score(i: int) -> int:
+            """How good a cut before token i is (0 = inside a word)"""
+            gap_start = spans[i - 1][1]
+            gap_end = spans[i][0]
+            # BPE tokens carry their leading whitespace
+            while gap_end < spans[i][1] and text[gap_end].isspace():
+                gap_end += 1
+            if gap_end == gap_start:
+                return 0
+            if "\n" in text[gap_start:gap_end]:
+                return 3
+            return 2 if text[gap_start - 1] in ".!?" else 1
+        
+        chunks = []
+        start = 0
+        while start < total:
+            end = min(start + max_tokens, total)
+            if end < total:
+                best_score = 0
+                for i in range(end, max(start + 1, end - max_tokens // 4) - 1, -1):
+                    score = boundary_score(i)
+                    if score > best_score:
+                        best_score, best = score, i
+                        if score == 3:
+                            break
+                if best_score:
+                    end = best
             
-            result = []
-            for split in splits:
-                if len(split) <= chunk_size:
-                    if split.strip():
-                        result.append(split)
-                else:
-                    # Recursively split with next separator
-                    result.extend(split_text(split, remaining_separators))
+            span = _trim_span(text, spans[start][0], spans[end - 1][1])
+            if span:
+                chunks.append(Chunk(
+                    content=text[span[0]:span[1]],
+                    index=len(chunks),
+                    start_char=span[0],
+                    end_char=span[1],
+                    metadata={
+                        "method": "token",
+                        "token_count": end - start,
+                        "tokenizer": tokenizer.name
+                    }
+                ))
             
-            return result
+            if end >= total:
+                break
+            next_start = max(end - overlap, start + 1)
+            while next_start < end and boundary_score(next_start) == 0:
+                next_start += 1
+            start = next_start
         
-        # Get initial splits
-        splits = split_text(text, separators)
+        return chunks
+    
+    def _split_spans(
+        self,
+        text: str,
+        start: int,
+        end: int,
+        separators: List[str],
+        chunk_size: int
+    ) -> List[Tuple[int, int]]:
+        """
+        Split text[start:end] into whitespace-trimmed spans of at most chunk_size
+        characters, trying each separator in turn.
+        """
+        spans = []
+        if not separators or separators[0] == "":
+            # Base case: hard cut into chunk_size windows
+            for window_start in range(start, end, chunk_size):
+                span = _trim_span(text, window_start, min(window_start + chunk_size, end))
+                if span:
+                    spans.append(span)
+            return spans
         
-        # Merge splits into chunks respecting size limits
-        chunks = []
-        current_chunk = ""
-        current_start = 0
-        index = 0
-        char_pos = 0
+        separator = separators[0]
+        remaining_separators = separators[1:]
         
-        for split in splits:
-            split = split.strip()
-            if not split:
-                continue
+        piece_start = start
+        while piece_start <= end:
+            piece_end = text.find(separator, piece_start, end)
+            if piece_end == -1:
+                piece_end = end
             
-            test_chunk = current_chunk + (" " if current_chunk else "") + split
-            
-            if len(test_chunk) <= chunk_size:
-                if not current_chunk:
-                    current_start = char_pos
-                current_chunk = test_chunk
-            else:
-                # Save current chunk
-                if current_chunk:
-                    chunks.append(Chunk(
-                        content=current_chunk,
-                        index=index,
-                        start_char=current_start,
-                        end_char=current_start + len(current_chunk),
-                        metadata={"method": "recursive"}
-                    ))
-                    index += 1
-                    
-                    # Handle overlap
-                    if chunk_overlap > 0:
-                        # Find overlap text from the end of current chunk
-                        words = current_chunk.split()
-                        overlap_words = []
-                        overlap_len = 0
-                        for word in reversed(words):
-                            if overlap_len + len(word) + 1 <= chunk_overlap:
-                                overlap_words.insert(0, word)
-                                overlap_len += len(word) + 1
-                            else:
-                                break
-                        current_chunk = " ".join(overlap_words) + " " + split if overlap_words else split
-                    else:
-                        current_chunk = split
-                    current_start = char_pos
+            # Keep the separator with the preceding piece (e.g. the period of ". ")
+            span = _trim_span(text, piece_start, min(piece_end + len(separator), end))
+            if span:
+                if span[1] - span[0] <= chunk_size:
+                    spans.append(span)
                 else:
-                    current_chunk = split
-                    current_start = char_pos
+                    # Recursively split with next separator
+                    spans.extend(self._split_spans(text, span[0], span[1], remaining_separators, chunk_size))
             
-            char_pos += len(split) + 1
-        
-        # Add the last chunk
-        if current_chunk:
-            chunks.append(Chunk(
-                content=current_chunk,
-                index=index,
-                start_char=current_start,
-                end_char=current_start + len(current_chunk),
-                metadata={"method": "recursive"}
-            ))
+            piece_start = piece_end + len(separator)
         
-        return chunks
+        return spans
+    
+    @staticmethod
+    def _span_chunk(text: str, index: int, start: int, end: int, method: str) -> Chunk:
+        """Build a chunk whose content is exactly text[start:end]"""
+        return Chunk(
+            content=text[start:end],
+            index=index,
+            start_char=start,
+            end_char=end,
+            metadata={"method": method}
+        )
     
     @staticmethod
     def get_available_methods() -> List[Dict[str, Any]]:
@@ -446,6 +807,18 @@ class TextChunker:
                 "description": "Splits text hierarchically using multiple separators (paragraphs → sentences → words). Best for general use.",
                 "default_config": TextChunker.DEFAULT_CONFIGS[ChunkingMethod.RECURSIVE]
             },
+            {
+                "id": ChunkingMethod.TOKEN.value,
+                "name": "Token-based",
+                "description": "Sizes chunks in tokens of the collection's embedding model, so they fill its context without being truncated.",
+                "default_config": TextChunker.DEFAULT_CONFIGS[ChunkingMethod.TOKEN]
+            },
+            {
+                "id": ChunkingMethod.EMBEDDING_SEMANTIC.value,
+                "name": "Semantic (Embeddings)",
+                "description": "Embeds every sentence and splits where the topic shifts. Produces fewer, more coherent chunks; needs the embedding model during chunking.",
+                "default_config": TextChunker.DEFAULT_CONFIGS[ChunkingMethod.EMBEDDING_SEMANTIC]
+            },
             {
                 "id": ChunkingMethod.SEMANTIC.value,
                 "name": "Semantic",
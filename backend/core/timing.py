@@ -0,0 +1,182 @@
+"""
+Per-stage latency instrumentation for RAG and chat requests.
+
+A RequestTimer collects named spans for a single request and renders them as a
+Server-Timing header. Finished timers are folded into the process-wide
+LatencyRegistry, which keeps per-collection and per-model histograms.
+
+Stages used by the chat endpoints:
+- metadata_lookup: collection / assistant lookups in the metadata database
+- db_connect: opening connections to the embeddings database
+- query_embedding: embedding the user query
+- vector_search: nearest-neighbour scan over the collection
+- neighbor_expansion: fetching and merging chunks around the hits
+- context_assembly: building the prompt from retrieved rows
+- llm_ttft: model time to first token
+- llm_generation: full model call
+- total: whole request
+
+Calls made through services.ollama_service are also recorded per Ollama
+endpoint (ollama_request, ollama_error).
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any
+
+# Upper bounds of the histogram buckets in milliseconds (last bucket is open-ended)
+DEFAULT_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+
+class RequestTimer:
+    """Collects named timing spans for one request"""
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self.spans: Dict[str, float] = {}
+
+    @property
+    def start_time(self) -> float:
+        """time.perf_counter() when the request started"""
+        return self._start
+
+    @contextmanager
+    def span(self, name: str):
+        """Time a block; repeated spans with the same name accumulate"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def record(self, name: str, duration_ms: float) -> None:
+        """Record a duration measured elsewhere, e.g. reported by Ollama"""
+        self.spans[name] = self.spans.get(name, 0.0) + duration_ms
+
+    def finish(self) -> float:
+        """Record the total span and return it"""
+        total = (time.perf_counter() - self._start) * 1000
+        self.spans["total"] = total
+        return total
+
+    def server_timing_header(self) -> str:
+        """Render the spans in Server-Timing header syntax"""
+        return ", ".join(f"{name};dur={duration:.1f}" for name, duration in self.spans.items())
+
+
+def ollama_ttft_ms(result: Dict[str, Any]) -> Optional[float]:
+    """
+    Time to first token of a non-streaming Ollama response.
+
+    Ollama reports model load and prompt evaluation in nanoseconds; the first
+    token is produced once both are done.
+    """
+    load_ns = result.get("load_duration")
+    prompt_eval_ns = result.get("prompt_eval_duration")
+    if load_ns is None and prompt_eval_ns is None:
+        return None
+    return ((load_ns or 0) + (prompt_eval_ns or 0)) / 1_000_000
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram"""
+
+    def __init__(self, buckets: Optional[List[float]] = None):
+        self.buckets = list(buckets or DEFAULT_BUCKETS_MS)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value_ms: float) -> None:
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value_ms <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value_ms
+        self.min = value_ms if self.min is None else min(self.min, value_ms)
+        self.max = value_ms if self.max is None else max(self.max, value_ms)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Estimate a percentile (0-100) as the upper bound of its bucket"""
+        if not self.count:
+            return None
+        target = self.count * q / 100
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return float(self.buckets[i]) if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.sum / self.count, 2) if self.count else None,
+            "min_ms": round(self.min, 2) if self.min is not None else None,
+            "max_ms": round(self.max, 2) if self.max is not None else None,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "buckets": {
+                **{f"le_{bound}": count for bound, count in zip(self.buckets, self.counts)},
+                "inf": self.counts[-1],
+            },
+        }
+
+
+class LatencyRegistry:
+    """In-process histograms keyed by dimension ('collection', 'model' or 'endpoint'), key and stage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[str, Dict[str, LatencyHistogram]]] = {
+            "collection": {},
+            "model": {},
+            "endpoint": {},
+        }
+
+    def observe(
+        self,
+        timer: RequestTimer,
+        collection_id: Optional[int] = None,
+        model: Optional[str] = None,
+        endpoint: Optional[str] = None
+    ) -> None:
+        """Fold all spans of a finished request into the matching histograms"""
+        keys = []
+        if collection_id is not None:
+            keys.append(("collection", str(collection_id)))
+        if model:
+            keys.append(("model", model))
+        if endpoint:
+            keys.append(("endpoint", endpoint))
+
+        with self._lock:
+            for dimension, key in keys:
+                stages = self._histograms[dimension].setdefault(key, {})
+                for stage, duration in timer.spans.items():
+                    stages.setdefault(stage, LatencyHistogram()).observe(duration)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                dimension + "s": {
+                    key: {stage: hist.to_dict() for stage, hist in stages.items()}
+                    for key, stages in entries.items()
+                }
+                for dimension, entries in self._histograms.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            for entries in self._histograms.values():
+                entries.clear()
+
+
+latency_registry = LatencyRegistry()
@@ -0,0 +1,204 @@
+"""
+Offline tokenizers matched to embedding models, for token-budgeted chunking.
+
+Chunks sized in characters either overflow the embedding model's context
+(Ollama truncates them silently) or underfill it. The TOKEN chunking method
+measures chunks with a tokenizer close to the one the embedding model uses.
+
+Tokenizer backends, tried in order for each model:
+- HuggingFace `tokenizers`: the model's `core/tokenizers/<name>.json` file,
+  fetched at image build by `fetch_tokenizers.py`
+- tiktoken: only for models whose tokenizer is a tiktoken encoding, when the
+  encoding is available in the local cache
+- regex: a conservative word-piece approximation that never needs a download
+
+A model's tokenizer is never replaced by a different vocabulary: cl100k_base
+counts fewer tokens than WordPiece, so chunks sized with it would overflow
+512-token models.
+
+Every backend returns the character span of each token, so chunk offsets
+stay exact. Tokenizations are kept in a small per-document LRU cache because
+the same document is tokenized by upload validation, preview and ingestion.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TOKENIZERS_DIR = os.path.join(os.path.dirname(__file__), "tokenizers")
+
+# Tokens reserved for special tokens ([CLS]/[SEP], BOS/EOS) added by the model
+RESERVED_TOKENS = 2
+
+# Number of document tokenizations kept in memory
+TOKENIZATION_CACHE_SIZE = 16
+
+# Word pieces of at most 4 letters, numbers of at most 2 digits, single CJK
+# characters and symbols. Over-counts compared to WordPiece/BPE on ordinary
+# text, so chunks err on the small side.
+_FALLBACK_TOKEN = re.compile(
+    r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]"
+    r"|[^\W\d_]{1,4}|\d{1,2}|\S"
+)
+
+# Tokenizers that are tiktoken encodings rather than HuggingFace files
+TIKTOKEN_ENCODINGS = {"cl100k_base", "o200k_base"}
+
+
+@dataclass(frozen=True)
+class EmbeddingModelSpec:
+    """Tokenizer and context window of an embedding model"""
+    tokenizer: str
+    context_tokens: int
+
+
+# Keyed by Ollama model name without tag
+EMBEDDING_MODELS = {
+    "nomic-embed-text": EmbeddingModelSpec("bert-base-uncased", 2048),
+    "mxbai-embed-large": EmbeddingModelSpec("bert-base-uncased", 512),
+    "all-minilm": EmbeddingModelSpec("bert-base-uncased", 512),
+    "snowflake-arctic-embed": EmbeddingModelSpec("bert-base-uncased", 512),
+    "bge-large": EmbeddingModelSpec("bert-base-uncased", 512),
+    "bge-m3": EmbeddingModelSpec("xlm-roberta-base", 8192),
+}
+DEFAULT_MODEL_SPEC = EmbeddingModelSpec("bert-base-uncased", 512)
+
+# HuggingFace repositories the tokenizer files are fetched from
+TOKENIZER_REPOS = {
+    "bert-base-uncased": "google-bert/bert-base-uncased",
+    "xlm-roberta-base": "FacebookAI/xlm-roberta-base",
+}
+
+
+def model_spec(embedding_model: Optional[str]) -> EmbeddingModelSpec:
+    """Look up an embedding model, ignoring its tag ('bge-m3:567m' -> 'bge-m3')"""
+    name = (embedding_model or "").split(":", 1)[0].strip().lower()
+    return EMBEDDING_MODELS.get(name, DEFAULT_MODEL_SPEC)
+
+
+class ModelTokenizer:
+    """Tokenizer returning the character span of every token"""
+
+    def __init__(self, name: str, backend: str, context_tokens: int, encoder=None):
+        self.name = name
+        self.backend = backend
+        self.context_tokens = context_tokens
+        self._encoder = encoder
+
+    @property
+    def max_chunk_tokens(self) -> int:
+        """Largest chunk that fits the model context next to the special tokens"""
+        return max(1, self.context_tokens - RESERVED_TOKENS)
+
+    @property
+    def cache_key(self) -> str:
+        return f"{self.backend}:{self.name}"
+
+    def token_spans(self, text: str) -> List[Tuple[int, int]]:
+        if self.backend == "tokenizers":
+            encoding = self._encoder.encode(text, add_special_tokens=False)
+            return [(start, end) for start, end in encoding.offsets if end > start]
+
+        if self.backend == "tiktoken":
+            tokens = self._encoder.encode(text, disallowed_special=())
+            _, starts = self._encoder.decode_with_offsets(tokens)
+            spans = []
+            for i, start in enumerate(starts):
+                end = starts[i + 1] if i + 1 < len(starts) else len(text)
+                # Multi-byte characters split over several tokens share a start
+                if end > start:
+                    spans.append((start, end))
+            return spans
+
+        return [match.span() for match in _FALLBACK_TOKEN.finditer(text)]
+
+    def count(self, text: str) -> int:
+        return len(self.token_spans(text))
+
+
+def _load_hf_tokenizer(name: str):
+    path = tokenizer_path(name)
+    if not os.path.exists(path):
+        return None
+    try:
+        from tokenizers import Tokenizer
+        return Tokenizer.from_file(path)
+    except Exception as e:
+        logger.warning(f"Could not load tokenizer file {path}: {e}")
+        return None
+
+
+def tokenizer_path(name: str) -> str:
+    return os.path.join(TOKENIZERS_DIR, f"{name}.json")
+
+
+@lru_cache(maxsize=None)
+def _load_tiktoken(name: str):
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        logger.warning(f"tiktoken {name} unavailable, using regex token estimation: {e}")
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(embedding_model: Optional[str] = None) -> ModelTokenizer:
+    """Tokenizer for an embedding model, loaded once per process"""
+    spec = model_spec(embedding_model)
+
+    if spec.tokenizer in TIKTOKEN_ENCODINGS:
+        encoder = _load_tiktoken(spec.tokenizer)
+        if encoder is not None:
+            return ModelTokenizer(spec.tokenizer, "tiktoken", spec.context_tokens, encoder)
+    else:
+        encoder = _load_hf_tokenizer(spec.tokenizer)
+        if encoder is not None:
+            return ModelTokenizer(spec.tokenizer, "tokenizers", spec.context_tokens, encoder)
+        logger.warning(
+            f"Tokenizer file {tokenizer_path(spec.tokenizer)} not found, "
+            f"using regex token estimation for {embedding_model}"
+        )
+
+    return ModelTokenizer("regex", "regex", spec.context_tokens)
+
+
+class _TokenizationCache:
+    """LRU of token spans keyed by tokenizer and document digest"""
+
+    def __init__(self, maxsize: int = TOKENIZATION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[str, int, str], List[Tuple[int, int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def token_spans(self, tokenizer: ModelTokenizer, text: str) -> List[Tuple[int, int]]:
+        digest = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+        key = (tokenizer.cache_key, len(text), digest)
+        with self._lock:
+            spans = self._entries.get(key)
+            if spans is not None:
+                self._entries.move_to_end(key)
+                return spans
+
+        spans = tokenizer.token_spans(text)
+        with self._lock:
+            self._entries[key] = spans
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return spans
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+tokenization_cache = _TokenizationCache()
@@ -0,0 +1,415 @@
+"""
+Streaming storage of uploaded files.
+
+Uploads are copied to disk in fixed-size blocks instead of being read into
+memory whole, so concurrent large uploads cannot exhaust the API container.
+The SHA-256 and size are computed as the blocks pass through, and the size
+limit is enforced mid-stream: an oversized upload is rejected as soon as it
+crosses the limit, without writing the rest. Disk writes and hashing run in
+the thread pool so the event loop never blocks on a slow disk.
+
+The file is written to a ".part" sibling and renamed into place once
+complete, so a failed or rejected upload never leaves a truncated file at
+the destination path.
+
+Resumable uploads (UploadSessionStore) follow the same layout: the ".part"
+file is preallocated in the uploads directory, byte ranges are written into
+it at their offset as they arrive (each verified against its SHA-256), and
+finalizing renames it into place. A JSON sidecar per session under
+UPLOAD_SESSION_DIR records the options and the ranges received so far, so
+any API worker can continue a session after a dropped connection.
+
+Environment overrides:
+- MAX_UPLOAD_SIZE_MB: largest accepted upload (default 1024, 0 for no limit)
+- UPLOAD_CHUNK_BYTES: block size of the copy (default 1 MiB)
+- UPLOAD_SESSION_DIR: resumable upload sidecars (default: uploads/.sessions)
+"""
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterable, BinaryIO, Dict, List, Optional, Tuple
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", 1024))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", 1024 * 1024))
+UPLOAD_SESSION_DIR = os.getenv("UPLOAD_SESSION_DIR", os.path.join("uploads", ".sessions"))
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+_UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+_CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+
+
+class UploadTooLarge(Exception):
+    """The upload exceeded the configured size limit"""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"File exceeds the maximum upload size of {max_bytes // (1024 * 1024)} MB")
+        self.max_bytes = max_bytes
+
+
+@dataclass
+class StoredUpload:
+    """An upload written to disk"""
+    path: str
+    size: int
+    sha256: str
+
+
+def max_upload_bytes() -> Optional[int]:
+    """Configured size limit in bytes, None when unlimited"""
+    return MAX_UPLOAD_SIZE_MB * 1024 * 1024 if MAX_UPLOAD_SIZE_MB > 0 else None
+
+
+def _write_block(buffer: BinaryIO, sha, block: bytes) -> None:
+    sha.update(block)
+    buffer.write(block)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def save_upload(
+    upload: UploadFile,
+    dest_path: str,
+    max_bytes: Optional[int] = None,
+    chunk_size: Optional[int] = None
+) -> StoredUpload:
+    """
+    Stream an upload to dest_path, hashing and measuring it on the way.
+
+    Args:
+        upload: The uploaded file
+        dest_path: Final location of the file
+        max_bytes: Size limit (default: MAX_UPLOAD_SIZE_MB; None from the
+            environment means unlimited)
+        chunk_size: Bytes read and written per step
+
+    Raises:
+        UploadTooLarge: If the upload is larger than max_bytes; nothing is
+            left on disk
+    """
+    if max_bytes is None:
+        max_bytes = max_upload_bytes()
+    chunk_size = chunk_size or UPLOAD_CHUNK_BYTES
+
+    os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+    part_path = f"{dest_path}.part"
+    sha = hashlib.sha256()
+    size = 0
+
+    buffer = await run_in_threadpool(open, part_path, "wb")
+    try:
+        try:
+            while True:
+                block = await upload.read(chunk_size)
+                if not block:
+                    break
+                size += len(block)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                await run_in_threadpool(_write_block, buffer, sha, block)
+        finally:
+            await run_in_threadpool(buffer.close)
+        await run_in_threadpool(os.replace, part_path, dest_path)
+    except BaseException:
+        _remove(part_path)
+        raise
+
+    logger.info(f"Stored upload {dest_path} ({size} bytes, sha256 {sha.hexdigest()[:12]})")
+    return StoredUpload(path=dest_path, size=size, sha256=sha.hexdigest())
+
+
+class UploadSessionError(Exception):
+    """A resumable upload request that cannot be applied"""
+
+
+class UploadSessionNotFound(UploadSessionError):
+    pass
+
+
+class ChecksumMismatch(UploadSessionError):
+    pass
+
+
+def parse_content_range(header: Optional[str]) -> Tuple[int, int, Optional[int]]:
+    """
+    Parse a 'bytes first-last/total' Content-Range header.
+
+    Returns (start, end, total) with end exclusive; total is None for '*'.
+    """
+    match = _CONTENT_RANGE.match((header or "").strip())
+    if not match:
+        raise UploadSessionError("Content-Range must look like 'bytes first-last/total'")
+    start, last = int(match.group(1)), int(match.group(2))
+    if last < start:
+        raise UploadSessionError("Content-Range ends before it starts")
+    total = None if match.group(3) == "*" else int(match.group(3))
+    return start, last + 1, total
+
+
+def merge_ranges(ranges: List[List[int]]) -> List[List[int]]:
+    """Sort [start, end) ranges and merge overlapping or adjacent ones"""
+    merged: List[List[int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+@dataclass
+class UploadSession:
+    """State of a resumable upload, persisted as a JSON sidecar"""
+    upload_id: str
+    filename: str
+    total_size: int
+    file_path: str
+    owner_id: Optional[str] = None
+    # Collection options given when the session was created
+    options: Dict[str, Any] = field(default_factory=dict)
+    # Expected SHA-256 of the whole file, checked on finalize
+    sha256: Optional[str] = None
+    # Merged [start, end) byte ranges written so far
+    received: List[List[int]] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    @property
+    def part_path(self) -> str:
+        return f"{self.file_path}.part"
+
+    @property
+    def received_bytes(self) -> int:
+        return sum(end - start for start, end in self.received)
+
+    @property
+    def complete(self) -> bool:
+        return self.received == [[0, self.total_size]]
+
+    def missing_ranges(self) -> List[List[int]]:
+        missing = []
+        position = 0
+        for start, end in self.received:
+            if start > position:
+                missing.append([position, start])
+            position = end
+        if position < self.total_size:
+            missing.append([position, self.total_size])
+        return missing
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "upload_id": self.upload_id,
+            "filename": self.filename,
+            "total_size": self.total_size,
+            "received_bytes": self.received_bytes,
+            "received": self.received,
+            "missing": self.missing_ranges(),
+            "complete": self.complete,
+        }
+
+
+class UploadSessionStore:
+    """
+    Resumable uploads: create a session, write byte ranges, finalize.
+
+    Sidecar updates are serialized with an flock on a per-session lock file,
+    so parts may be sent in parallel and to different worker processes.
+    """
+
+    def __init__(self, upload_dir: str, session_dir: str = UPLOAD_SESSION_DIR):
+        self.upload_dir = upload_dir
+        self.session_dir = session_dir
+
+    def _sidecar_path(self, upload_id: str) -> str:
+        if not _UPLOAD_ID.match(upload_id or ""):
+            raise UploadSessionNotFound(f"Upload {upload_id} not found")
+        return os.path.join(self.session_dir, f"{upload_id}.json")
+
+    @contextmanager
+    def _locked(self, upload_id: str):
+        sidecar_path = self._sidecar_path(upload_id)
+        if not os.path.exists(sidecar_path):
+            raise UploadSessionNotFound(f"Upload {upload_id} not found")
+        with open(sidecar_path[:-len(".json")] + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save(self, session: UploadSession) -> None:
+        session.updated_at = time.time()
+        fd, tmp_path = tempfile.mkstemp(dir=self.session_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(asdict(session), f)
+            os.replace(tmp_path, self._sidecar_path(session.upload_id))
+        except BaseException:
+            _remove(tmp_path)
+            raise
+
+    def create(
+        self,
+        filename: str,
+        total_size: int,
+        owner_id: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+        sha256: Optional[str] = None,
+        max_bytes: Optional[int] = None
+    ) -> UploadSession:
+        """
+        Start a session and preallocate its file.
+
+        Raises:
+            UploadTooLarge: If total_size is over the size limit
+        """
+        if max_bytes is None:
+            max_bytes = max_upload_bytes()
+        if max_bytes is not None and total_size > max_bytes:
+            raise UploadTooLarge(max_bytes)
+        if total_size <= 0:
+            raise UploadSessionError("Upload size must be positive")
+
+        upload_id = uuid.uuid4().hex
+        file_ext = filename.rsplit(".", 1)[1].lower() if "." in filename else ""
+        session = UploadSession(
+            upload_id=upload_id,
+            filename=filename,
+            total_size=total_size,
+            file_path=os.path.join(self.upload_dir, f"{upload_id}.{file_ext}"),
+            owner_id=owner_id,
+            options=options or {},
+            sha256=sha256.lower() if sha256 else None
+        )
+        os.makedirs(self.session_dir, exist_ok=True)
+        os.makedirs(self.upload_dir, exist_ok=True)
+        with open(session.part_path, "wb") as f:
+            f.truncate(total_size)
+        self._save(session)
+        logger.info(f"Started resumable upload {upload_id} for {filename} ({total_size} bytes)")
+        return session
+
+    def get(self, upload_id: str) -> UploadSession:
+        try:
+            with open(self._sidecar_path(upload_id)) as f:
+                return UploadSession(**json.load(f))
+        except FileNotFoundError:
+            raise UploadSessionNotFound(f"Upload {upload_id} not found")
+
+    def list_sessions(self) -> List[UploadSession]:
+        if not os.path.isdir(self.session_dir):
+            return []
+        sessions = []
+        for name in os.listdir(self.session_dir):
+            if name.endswith(".json"):
+                try:
+                    sessions.append(self.get(name[:-len(".json")]))
+                except (UploadSessionNotFound, ValueError, TypeError):
+                    continue
+        return sessions
+
+    async def write_part(
+        self,
+        upload_id: str,
+        start: int,
+        end: int,
+        blocks: AsyncIterable[bytes],
+        sha256: Optional[str] = None
+    ) -> UploadSession:
+        """
+        Write the bytes [start, end) of an upload from a stream of blocks.
+
+        The range is only recorded as received if the body has exactly the
+        declared length and, when given, the declared SHA-256; otherwise the
+        bytes are left to be overwritten by a retry.
+
+        Raises:
+            UploadSessionError: If the range is outside the file or the body
+                length does not match it
+            ChecksumMismatch: If the body does not match sha256
+        """
+        session = self.get(upload_id)
+        if start < 0 or end <= start or end > session.total_size:
+            raise UploadSessionError(f"Range {start}-{end - 1} is outside the {session.total_size} byte upload")
+
+        digest = hashlib.sha256()
+        written = 0
+        buffer = await run_in_threadpool(open, session.part_path, "r+b")
+        try:
+            await run_in_threadpool(buffer.seek, start)
+            async for block in blocks:
+                if written + len(block) > end - start:
+                    raise UploadSessionError("Part is longer than its Content-Range")
+                await run_in_threadpool(_write_block, buffer, digest, block)
+                written += len(block)
+        finally:
+            await run_in_threadpool(buffer.close)
+
+        if written != end - start:
+            raise UploadSessionError(f"Part has {written} bytes, Content-Range declares {end - start}")
+        if sha256 and digest.hexdigest() != sha256.lower():
+            raise ChecksumMismatch(f"SHA-256 of bytes {start}-{end - 1} does not match")
+        return await run_in_threadpool(self._record_range, upload_id, start, end)
+
+    def _record_range(self, upload_id: str, start: int, end: int) -> UploadSession:
+        with self._locked(upload_id):
+            session = self.get(upload_id)
+            session.received = merge_ranges(session.received + [[start, end]])
+            self._save(session)
+            return session
+
+    def finalize(self, upload_id: str) -> Tuple[UploadSession, StoredUpload]:
+        """
+        Verify a complete upload and move it into place without copying.
+
+        Blocking (hashes the whole file); run it in the thread pool.
+
+        Raises:
+            UploadSessionError: If byte ranges are still missing
+            ChecksumMismatch: If the file does not match the session's sha256
+        """
+        with self._locked(upload_id):
+            session = self.get(upload_id)
+            if not session.complete:
+                raise UploadSessionError(f"Upload is missing byte ranges {session.missing_ranges()}")
+
+            sha = hashlib.sha256()
+            with open(session.part_path, "rb") as f:
+                for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                    sha.update(block)
+            if session.sha256 and sha.hexdigest() != session.sha256:
+                raise ChecksumMismatch("SHA-256 of the assembled file does not match")
+
+            os.replace(session.part_path, session.file_path)
+            _remove(self._sidecar_path(upload_id))
+        _remove(self._sidecar_path(upload_id)[:-len(".json")] + ".lock")
+        logger.info(f"Finalized resumable upload {upload_id} as {session.file_path}")
+        return session, StoredUpload(path=session.file_path, size=session.total_size, sha256=sha.hexdigest())
+
+    def abort(self, upload_id: str) -> None:
+        """Delete a session and its partial file"""
+        with self._locked(upload_id):
+            session = self.get(upload_id)
+            _remove(session.part_path)
+            _remove(self._sidecar_path(upload_id))
+        _remove(self._sidecar_path(upload_id)[:-len(".json")] + ".lock")
@@ -16,9 +16,10 @@ class DataCollection(Base):
     chunking_method = Column(String, default=None)  # 'fixed_size', 'sentence', 'paragraph', 'semantic', 'recursive'
     chunking_config = Column(JSONB, default=None)  # Chunking configuration (chunk_size, overlap, etc.)
     document_metadata = Column(JSONB, default=None)  # Document metadata (word count, page count, etc.)
-    embeddings_status = Column(String, default='pending')  # pending, processing, completed, failed
+    embeddings_status = Column(String, default='pending')  # pending_analysis, pending, processing, completed, failed
     embeddings_metadata = Column(JSONB, default=dict)  # Store any metadata about embeddings
     embedding_model_id = Column(Integer, ForeignKey('models.id'), nullable=True)  # Reference to the embedding model used
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the uploaded file
     owner_id = Column(String(255), nullable=True)  # Keycloak user ID
     group_id = Column(Integer, ForeignKey('groups.id', ondelete='SET NULL'), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -37,6 +38,7 @@ class DataCollection(Base):
             "chunking_method": self.chunking_method,
             "chunking_config": self.chunking_config,
             "document_metadata": self.document_metadata,
+            "content_hash": self.content_hash,
             "owner_id": self.owner_id,
             "group_id": self.group_id,
             "created_at": self.created_at.isoformat() if self.created_at else None,
@@ -0,0 +1,80 @@
+"""
+Download the tokenizer files used for token-budgeted chunking.
+
+Writes ``core/tokenizers/<name>.json`` (HuggingFace ``tokenizers`` format)
+for every tokenizer referenced by ``EMBEDDING_MODELS``, so the backend can
+count tokens exactly as the embedding models do without network access at
+runtime. Run once when building the image; existing files are kept unless
+--force is given.
+
+Usage:
+    python fetch_tokenizers.py
+    python fetch_tokenizers.py --force
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+import requests
+
+from core.tokenization import (
+    DEFAULT_MODEL_SPEC,
+    EMBEDDING_MODELS,
+    TIKTOKEN_ENCODINGS,
+    TOKENIZER_REPOS,
+    TOKENIZERS_DIR,
+    tokenizer_path,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+HF_FILE_URL = "https://huggingface.co/{repo}/resolve/main/tokenizer.json"
+
+
+def required_tokenizers():
+    names = {spec.tokenizer for spec in EMBEDDING_MODELS.values()} | {DEFAULT_MODEL_SPEC.tokenizer}
+    return sorted(names - TIKTOKEN_ENCODINGS)
+
+
+def fetch_tokenizer(name: str, force: bool = False, timeout: float = 60) -> bool:
+    """Download one tokenizer file; returns False when it has no known source"""
+    path = tokenizer_path(name)
+    if os.path.exists(path) and not force:
+        logger.info(f"{path} already present")
+        return True
+    repo = TOKENIZER_REPOS.get(name)
+    if repo is None:
+        logger.error(f"No HuggingFace repository known for tokenizer {name}")
+        return False
+
+    response = requests.get(HF_FILE_URL.format(repo=repo), timeout=timeout)
+    response.raise_for_status()
+
+    # Refuse files the tokenizers library cannot load
+    from tokenizers import Tokenizer
+    Tokenizer.from_str(response.text)
+
+    os.makedirs(TOKENIZERS_DIR, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(response.text)
+    os.replace(tmp_path, path)
+    logger.info(f"Saved {repo} tokenizer to {path}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download the tokenizer files of the embedding models")
+    parser.add_argument("--force", action="store_true", help="Download files that are already present")
+    args = parser.parse_args()
+
+    failed = [name for name in required_tokenizers() if not fetch_tokenizer(name, force=args.force)]
+    if failed:
+        sys.exit(f"Missing tokenizers: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
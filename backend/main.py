@@ -1,5 +1,7 @@
+import asyncio
 import os
 import pathlib
+from contextlib import asynccontextmanager, suppress
 
 import mlflow
 import uvicorn
@@ -9,12 +11,15 @@ from fastapi.middleware.cors import CORSMiddleware
 from api.middleware_api_key import APIKeyMiddleware
 
 from api import routes_users, routes_assistants, routes_models, routes_benchmarks, routes_statistics
-from api.routes_data_collections import router as data_collections_router
+from api.routes_data_collections import router as data_collections_router, garbage_collector
 from api.routes_chat import router as chat_router
 from api.routes_integrations import router as integrations_router
 from api.routes_widgets import router as widgets_router
 from api.routes_groups import router as groups_router
 from core.config import settings
+from core.garbage_collector import GC_INTERVAL_SECONDS, run_periodically
+from core.parallel import shutdown_process_pool
+from services.ollama_service import get_ollama_client
 
 
 load_dotenv()
@@ -29,11 +34,33 @@ os.environ["MLFLOW_TMP_DIR"] = TMP_DIR
 mlflow.set_tracking_uri(settings.MLFLOW_TRACKING_URI)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pooled keep-alive connections to Ollama, shared by all chat endpoints
+    ollama_client = get_ollama_client()
+    await ollama_client.start()
+    # Periodic cleanup of orphaned embeddings tables and upload files
+    gc_task = None
+    if GC_INTERVAL_SECONDS > 0:
+        gc_task = asyncio.create_task(run_periodically(garbage_collector, GC_INTERVAL_SECONDS))
+    yield
+    if gc_task is not None:
+        garbage_collector.stop()
+        gc_task.cancel()
+        # Let a running pass unwind before the pools it may use go away
+        with suppress(asyncio.CancelledError):
+            await gc_task
+    await ollama_client.aclose()
+    # Stop document parsing / chunking workers
+    shutdown_process_pool()
+
+
 app = FastAPI(
     title="FocusML Platform Backend",
     description="API for managing users and other platform resources.",
     version="1.0.0",
     root_path="/api",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -0,0 +1,259 @@
+"""
+Move per-collection embeddings tables into the partitioned embeddings store.
+
+Rows are copied in id-ordered batches, each in its own transaction, so the
+legacy table stays readable by RAG queries while the copy runs. Rows keep
+their ids, so ``duplicate_of`` references and ``chunk_fingerprints`` row ids
+stay valid. Once a collection is fully copied its embeddings_metadata is
+switched to the partitioned layout, its fingerprints are pointed at the
+partitioned table and the legacy table is dropped.
+
+Usage:
+    python migrate_embeddings.py                    # migrate every legacy table
+    python migrate_embeddings.py --collection-id 12 --collection-id 15
+    python migrate_embeddings.py --dry-run
+"""
+
+import argparse
+import logging
+import re
+from typing import List, Optional
+
+from sqlalchemy import create_engine, or_
+
+from core.config import settings
+from core.dedup import FINGERPRINTS_TABLE
+from core.embedding_store import (
+    PartitionedEmbeddingStore,
+    LAYOUT_PARTITIONED,
+    PARTITIONED_TABLE,
+    legacy_table_name,
+    partition_name,
+)
+from db.models.data_collection import DataCollection
+from db.session import SessionLocal
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LEGACY_TABLE_PATTERN = re.compile(r"^embeddings_collection_(\d+)$")
+
+# Columns dropped from tabular rows when they are folded into the JSONB source column
+TABULAR_RESERVED_COLUMNS = ['id', 'content', 'embedding', 'duplicate_of', 'created_at', 'collection_id']
+
+
+def list_legacy_collection_ids(cur) -> List[int]:
+    """Find collection ids that still have a per-collection embeddings table"""
+    cur.execute("""
+        SELECT table_name
+        FROM information_schema.tables
+        WHERE table_schema = 'public'
+        AND table_name LIKE 'embeddings_collection_%'
+    """)
+    ids = []
+    for (table_name,) in cur.fetchall():
+        match = LEGACY_TABLE_PATTERN.match(table_name)
+        if match:
+            ids.append(int(match.group(1)))
+    return sorted(ids)
+
+
+def _is_document_table(cur, table_name: str) -> bool:
+    cur.execute("""
+        SELECT EXISTS (
+            SELECT FROM information_schema.columns
+            WHERE table_name = %s AND column_name = 'chunk_index'
+        );
+    """, (table_name,))
+    return bool(cur.fetchone()[0])
+
+
+def _copy_batch_sql(source_table: str, target_table: str, is_document: bool) -> str:
+    """SQL copying the legacy rows with last_id < id <= upper_id, keeping their ids"""
+    if is_document:
+        return f"""
+            INSERT INTO {target_table} (
+                id, collection_id, chunk_index, content, start_char, end_char,
+                chunking_method, filename, file_type, metadata, duplicate_of, embedding, created_at
+            )
+            SELECT id, %(collection_id)s, chunk_index, content, start_char, end_char,
+                   chunking_method, filename, file_type, metadata, duplicate_of, embedding, created_at
+            FROM {source_table}
+            WHERE id > %(last_id)s AND id <= %(upper_id)s
+        """
+
+    reserved = " - ".join(f"'{col}'" for col in TABULAR_RESERVED_COLUMNS)
+    return f"""
+        INSERT INTO {target_table} (id, collection_id, content, source, duplicate_of, embedding, created_at)
+        SELECT t.id, %(collection_id)s, t.content, to_jsonb(t) - {reserved}, t.duplicate_of, t.embedding, t.created_at
+        FROM {source_table} t
+        WHERE t.id > %(last_id)s AND t.id <= %(upper_id)s
+    """
+
+
+def _ensure_duplicate_of_column(cur, table_name: str) -> None:
+    """Tables ingested before deduplication existed have no duplicate_of column"""
+    cur.execute(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS duplicate_of INTEGER;")
+
+
+def _advance_id_sequence(cur, target_table: str) -> None:
+    """Move the id sequence past the copied ids so later inserts cannot collide with them"""
+    cur.execute("SELECT pg_get_serial_sequence(%s, 'id');", (PARTITIONED_TABLE,))
+    sequence = cur.fetchone()[0]
+    cur.execute(f"SELECT MAX(id) FROM {target_table};")
+    max_id = cur.fetchone()[0]
+    if sequence is None or max_id is None:
+        return
+    cur.execute(f"SELECT last_value FROM {sequence};")
+    if cur.fetchone()[0] < max_id:
+        cur.execute("SELECT setval(%s, %s);", (sequence, max_id))
+
+
+def _repoint_fingerprints(cur, collection_id: int, source_table: str) -> None:
+    """Point the collection's chunk fingerprints at the partitioned table (row ids are kept)"""
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (FINGERPRINTS_TABLE,))
+    if not cur.fetchone()[0]:
+        return
+    cur.execute(
+        f"UPDATE {FINGERPRINTS_TABLE} SET table_name = %s WHERE collection_id = %s AND table_name = %s;",
+        (PARTITIONED_TABLE, collection_id, source_table)
+    )
+
+
+def migrate_collection(
+    engine,
+    store: PartitionedEmbeddingStore,
+    collection_id: int,
+    batch_size: int = 1000,
+    keep_legacy: bool = False,
+    dry_run: bool = False
+) -> Optional[int]:
+    """
+    Migrate one collection and return the number of copied rows.
+
+    Returns None when the collection is skipped.
+    """
+    source_table = legacy_table_name(collection_id)
+    target_table = partition_name(collection_id)
+
+    with SessionLocal() as db:
+        collection = db.query(DataCollection).filter(DataCollection.id == collection_id).first()
+        if collection and collection.embeddings_status in ('pending_analysis', 'pending', 'processing'):
+            logger.info(f"Skipping collection {collection_id}: embeddings are still {collection.embeddings_status}")
+            return None
+
+    conn = engine.raw_connection()
+    try:
+        with conn.cursor() as cur:
+            is_document = _is_document_table(cur, source_table)
+            cur.execute(f"SELECT COUNT(*) FROM {source_table};")
+            total_rows = cur.fetchone()[0]
+
+            if dry_run:
+                kind = 'document' if is_document else 'tabular'
+                print(f"[dry-run] {source_table} ({kind}, {total_rows} rows) -> {target_table}")
+                return total_rows
+
+            # Start from an empty partition so an interrupted run can simply be repeated
+            _ensure_duplicate_of_column(cur, source_table)
+            store.ensure_partition(cur, collection_id)
+            cur.execute(f"TRUNCATE {target_table};")
+            conn.commit()
+
+            copy_sql = _copy_batch_sql(source_table, target_table, is_document)
+            last_id = 0
+            copied = 0
+            while True:
+                cur.execute(f"""
+                    SELECT MAX(id) FROM (
+                        SELECT id FROM {source_table} WHERE id > %s ORDER BY id LIMIT %s
+                    ) batch;
+                """, (last_id, batch_size))
+                upper_id = cur.fetchone()[0]
+                if upper_id is None:
+                    break
+                cur.execute(copy_sql, {
+                    'collection_id': collection_id,
+                    'last_id': last_id,
+                    'upper_id': upper_id
+                })
+                copied += cur.rowcount
+                conn.commit()
+                last_id = upper_id
+                logger.info(f"{source_table}: copied {copied}/{total_rows} rows")
+
+            _advance_id_sequence(cur, target_table)
+            store.create_vector_index(cur, collection_id)
+            _repoint_fingerprints(cur, collection_id, source_table)
+            conn.commit()
+    finally:
+        conn.close()
+
+    # Switch readers over before the legacy table disappears, including
+    # collections that reuse these embeddings (duplicate uploads)
+    with SessionLocal() as db:
+        readers = db.query(DataCollection).filter(or_(
+            DataCollection.id == collection_id,
+            DataCollection.embeddings_metadata['source_collection_id'].astext == str(collection_id)
+        )).all()
+        for collection in readers:
+            collection.embeddings_metadata = {
+                **(collection.embeddings_metadata or {}),
+                'table_name': PARTITIONED_TABLE,
+                'storage_layout': LAYOUT_PARTITIONED,
+                'migrated_from': source_table
+            }
+        db.commit()
+
+    if not keep_legacy:
+        conn = engine.raw_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"DROP TABLE IF EXISTS {source_table};")
+            conn.commit()
+        finally:
+            conn.close()
+
+    logger.info(f"Migrated collection {collection_id}: {copied} rows into {target_table}")
+    return copied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate per-collection embeddings tables to the partitioned store")
+    parser.add_argument("--collection-id", type=int, action="append", dest="collection_ids",
+                        help="Collection to migrate (repeatable). Defaults to every legacy table.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows copied per transaction")
+    parser.add_argument("--keep-legacy", action="store_true", help="Keep the legacy tables after copying")
+    parser.add_argument("--dry-run", action="store_true", help="Only list what would be migrated")
+    args = parser.parse_args()
+
+    engine = create_engine(settings.TIMESCALE_DATABASE_URL)
+    store = PartitionedEmbeddingStore()
+
+    collection_ids = args.collection_ids
+    if not collection_ids:
+        conn = engine.raw_connection()
+        try:
+            with conn.cursor() as cur:
+                collection_ids = list_legacy_collection_ids(cur)
+        finally:
+            conn.close()
+
+    print(f"Migrating {len(collection_ids)} collection(s) to {PARTITIONED_TABLE}...")
+    for collection_id in collection_ids:
+        try:
+            migrate_collection(
+                engine,
+                store,
+                collection_id,
+                batch_size=args.batch_size,
+                keep_legacy=args.keep_legacy,
+                dry_run=args.dry_run
+            )
+        except Exception as e:
+            logger.error(f"Failed to migrate collection {collection_id}: {e}", exc_info=True)
+    print("Migration finished.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""
+Shared HTTP client for the Ollama API.
+
+The pooled httpx.AsyncClient is opened in the app lifespan and reused by
+every chat call, so requests ride on keep-alive connections instead of
+paying TCP setup each time. Blocking callers (the benchmark runner thread)
+share one pooled httpx.Client.
+
+Transient failures are retried with exponential backoff and full jitter:
+connection errors, dropped keep-alive connections and 429 / 502 / 503 / 504
+responses (honouring Retry-After). Read timeouts are not retried, since the
+model may still be generating and a retry would double the wait.
+
+Every call is timed per Ollama endpoint (/api/chat, ...) and folded into
+latency_registry under "endpoints": stage ollama_request for successful
+calls, ollama_error for failed ones, retries included. Streamed calls also
+record ollama_ttft, the wait for the first chunk.
+
+Environment overrides:
+- OLLAMA_MAX_CONNECTIONS: connections per pool (default 100)
+- OLLAMA_MAX_KEEPALIVE_CONNECTIONS: idle connections kept open (default 20)
+- OLLAMA_KEEPALIVE_EXPIRY_SECONDS: idle time before a connection is closed (default 30)
+- OLLAMA_CONNECT_TIMEOUT_SECONDS: connect and pool wait timeout (default 5)
+- OLLAMA_TIMEOUT_SECONDS: read / write timeout of a call (default 120)
+- OLLAMA_MAX_RETRIES: retries after the first attempt (default 2)
+- OLLAMA_RETRY_BACKOFF_SECONDS: base of the exponential backoff (default 0.5)
+- OLLAMA_RETRY_MAX_BACKOFF_SECONDS: longest wait between attempts (default 8)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from core.timing import RequestTimer, latency_registry
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", 100))
+OLLAMA_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OLLAMA_MAX_KEEPALIVE_CONNECTIONS", 20))
+OLLAMA_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY_SECONDS", 30))
+OLLAMA_CONNECT_TIMEOUT_SECONDS = float(os.getenv("OLLAMA_CONNECT_TIMEOUT_SECONDS", 5))
+OLLAMA_TIMEOUT_SECONDS = float(os.getenv("OLLAMA_TIMEOUT_SECONDS", 120))
+OLLAMA_MAX_RETRIES = int(os.getenv("OLLAMA_MAX_RETRIES", 2))
+OLLAMA_RETRY_BACKOFF_SECONDS = float(os.getenv("OLLAMA_RETRY_BACKOFF_SECONDS", 0.5))
+OLLAMA_RETRY_MAX_BACKOFF_SECONDS = float(os.getenv("OLLAMA_RETRY_MAX_BACKOFF_SECONDS", 8))
+
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+RETRY_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+
+
+class OllamaStreamError(Exception):
+    """Ollama reported an error in the middle of a streamed response"""
+
+
+class OllamaClient:
+    """Pooled async and blocking clients for one Ollama host"""
+
+    def __init__(
+        self,
+        base_url: str,
+        max_connections: int = OLLAMA_MAX_CONNECTIONS,
+        max_keepalive_connections: int = OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = OLLAMA_KEEPALIVE_EXPIRY_SECONDS,
+        connect_timeout: float = OLLAMA_CONNECT_TIMEOUT_SECONDS,
+        timeout: float = OLLAMA_TIMEOUT_SECONDS,
+        max_retries: int = OLLAMA_MAX_RETRIES,
+        retry_backoff: float = OLLAMA_RETRY_BACKOFF_SECONDS,
+        retry_max_backoff: float = OLLAMA_RETRY_MAX_BACKOFF_SECONDS,
+        transport: Optional[Any] = None
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.retry_max_backoff = retry_max_backoff
+        # Test hook: an httpx.MockTransport serves both clients
+        self._transport = transport
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._sync_client: Optional[httpx.Client] = None
+        self._sync_lock = threading.Lock()
+
+    def _timeout(self, timeout: Optional[float] = None) -> httpx.Timeout:
+        return httpx.Timeout(
+            timeout if timeout is not None else self.timeout,
+            connect=self.connect_timeout,
+            pool=self.connect_timeout
+        )
+
+    def _client_options(self) -> Dict[str, Any]:
+        options = {"base_url": self.base_url, "limits": self.limits, "timeout": self._timeout()}
+        if self._transport is not None:
+            options["transport"] = self._transport
+        return options
+
+    async def start(self) -> None:
+        """Open the async pool (called from the app lifespan)"""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(**self._client_options())
+            logger.info(f"Opened Ollama connection pool for {self.base_url} ({self.limits})")
+
+    async def aclose(self) -> None:
+        """Close both pools"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        with self._sync_lock:
+            if self._sync_client is not None:
+                self._sync_client.close()
+                self._sync_client = None
+
+    @property
+    def sync_client(self) -> httpx.Client:
+        with self._sync_lock:
+            if self._sync_client is None:
+                self._sync_client = httpx.Client(**self._client_options())
+            return self._sync_client
+
+    def _retry_delay(
+        self,
+        attempt: int,
+        response: Optional[httpx.Response] = None,
+        error: Optional[Exception] = None
+    ) -> Optional[float]:
+        """Seconds to wait before retrying, or None when the outcome is final"""
+        if attempt >= self.max_retries:
+            return None
+        if error is not None and not isinstance(error, RETRY_EXCEPTIONS):
+            return None
+        if response is not None and response.status_code not in RETRY_STATUS_CODES:
+            return None
+
+        delay = random.uniform(0, min(self.retry_max_backoff, self.retry_backoff * 2 ** attempt))
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), self.retry_max_backoff))
+        return delay
+
+    @staticmethod
+    def _log_retry(endpoint: str, attempt: int, delay: float, outcome: str) -> None:
+        logger.warning(f"Ollama {endpoint} attempt {attempt + 1} failed ({outcome}), retrying in {delay:.2f}s")
+
+    @staticmethod
+    def _observe(endpoint: str, stage: str, started: float) -> None:
+        timer = RequestTimer()
+        timer.record(stage, (time.perf_counter() - started) * 1000)
+        latency_registry.observe(timer, endpoint=endpoint)
+
+    async def post(self, path: str, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        POST JSON to an Ollama endpoint and return the decoded response.
+
+        path is relative to the base URL, or an absolute URL for callers
+        configured with another host.
+
+        Raises:
+            httpx.HTTPError: If the request fails after its retries
+        """
+        if self._async_client is None:
+            # Scripts and tests run without the app lifespan
+            await self.start()
+        endpoint = httpx.URL(path).path
+        started = time.perf_counter()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    response = await self._async_client.post(path, json=payload, timeout=self._timeout(timeout))
+                except httpx.HTTPError as e:
+                    delay = self._retry_delay(attempt, error=e)
+                    if delay is None:
+                        raise
+                    self._log_retry(endpoint, attempt, delay, repr(e))
+                else:
+                    delay = self._retry_delay(attempt, response=response)
+                    if delay is None:
+                        response.raise_for_status()
+                        result = response.json()
+                        break
+                    self._log_retry(endpoint, attempt, delay, f"HTTP {response.status_code}")
+                attempt += 1
+                await asyncio.sleep(delay)
+        except Exception:
+            self._observe(endpoint, "ollama_error", started)
+            raise
+        self._observe(endpoint, "ollama_request", started)
+        return result
+
+    def post_sync(self, path: str, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Blocking variant of post for worker threads"""
+        client = self.sync_client
+        endpoint = httpx.URL(path).path
+        started = time.perf_counter()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    response = client.post(path, json=payload, timeout=self._timeout(timeout))
+                except httpx.HTTPError as e:
+                    delay = self._retry_delay(attempt, error=e)
+                    if delay is None:
+                        raise
+                    self._log_retry(endpoint, attempt, delay, repr(e))
+                else:
+                    delay = self._retry_delay(attempt, response=response)
+                    if delay is None:
+                        response.raise_for_status()
+                        result = response.json()
+                        break
+                    self._log_retry(endpoint, attempt, delay, f"HTTP {response.status_code}")
+                attempt += 1
+                time.sleep(delay)
+        except Exception:
+            self._observe(endpoint, "ollama_error", started)
+            raise
+        self._observe(endpoint, "ollama_request", started)
+        return result
+
+    @staticmethod
+    def chat_payload(
+        model: str,
+        messages: List[Dict[str, Any]],
+        options: Optional[Dict[str, Any]] = None,
+        stream: bool = False
+    ) -> Dict[str, Any]:
+        payload = {"model": model, "messages": messages, "stream": stream}
+        if options:
+            payload["options"] = options
+        return payload
+
+    async def chat(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        url: str = "/api/chat"
+    ) -> Dict[str, Any]:
+        """Non-streaming /api/chat call; returns Ollama's response (message, durations)"""
+        return await self.post(url, self.chat_payload(model, messages, options), timeout=timeout)
+
+    async def stream_chat(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        url: str = "/api/chat"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming /api/chat call yielding Ollama's chunks as they arrive.
+
+        Opening the stream is retried like post(); once chunks have started
+        nothing is retried. The last chunk has done=True and Ollama's
+        durations.
+
+        Raises:
+            httpx.HTTPError: If the stream cannot be opened
+            OllamaStreamError: If Ollama reports an error mid-stream
+        """
+        if self._async_client is None:
+            await self.start()
+        endpoint = httpx.URL(url).path
+        payload = self.chat_payload(model, messages, options, stream=True)
+        started = time.perf_counter()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    request = self._async_client.build_request("POST", url, json=payload, timeout=self._timeout(timeout))
+                    response = await self._async_client.send(request, stream=True)
+                except httpx.HTTPError as e:
+                    delay = self._retry_delay(attempt, error=e)
+                    if delay is None:
+                        raise
+                    self._log_retry(endpoint, attempt, delay, repr(e))
+                else:
+                    delay = self._retry_delay(attempt, response=response)
+                    if delay is None:
+                        break
+                    await response.aclose()
+                    self._log_retry(endpoint, attempt, delay, f"HTTP {response.status_code}")
+                attempt += 1
+                await asyncio.sleep(delay)
+
+            try:
+                if response.is_error:
+                    await response.aread()
+                    response.raise_for_status()
+                first = True
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise OllamaStreamError(chunk["error"])
+                    if first:
+                        self._observe(endpoint, "ollama_ttft", started)
+                        first = False
+                    yield chunk
+            finally:
+                await response.aclose()
+        except Exception:
+            self._observe(endpoint, "ollama_error", started)
+            raise
+        self._observe(endpoint, "ollama_request", started)
+
+    def chat_sync(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        url: str = "/api/chat"
+    ) -> Dict[str, Any]:
+        return self.post_sync(url, self.chat_payload(model, messages, options), timeout=timeout)
+
+
+_client: Optional[OllamaClient] = None
+_client_lock = threading.Lock()
+
+
+def get_ollama_client() -> OllamaClient:
+    """Process-wide client for settings.OLLAMA_HOST"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            # Imported lazily: the client itself does not need application settings
+            from core.config import settings
+            _client = OllamaClient(settings.OLLAMA_HOST)
+        return _client
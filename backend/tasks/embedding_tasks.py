@@ -1,4 +1,4 @@
-import pandas as pd
+import json
 import logging
 from typing import Dict, Any, List
 from sqlalchemy.orm import Session
@@ -6,8 +6,12 @@ from core.embeddings import EmbeddingService
 from db.models.data_collection import DataCollection
 from core.config import settings
 from db.session import SessionLocal
-from core.text_chunking import TextChunker, ChunkingMethod, Chunk
-from core.document_parser import DocumentParser
+from core.text_chunking import ChunkingMethod, get_text_chunker
+from core.document_parser import DocumentParser, ElementMap, ParsedDocument, TextStats
+from core.document_cache import peek_document_chunks
+from core.tabular_reader import TabularReader
+from core.embedding_store import PARTITIONED_TABLE, legacy_table_name
+from core.dedup import DedupConfig
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +39,12 @@ def process_embeddings_task(collection_id: int):
                 else:
                     logger.warning(f"Embedding model {collection.embedding_model_id} not found, using default: nomic-embed-text")
         
+        # Uploads return before the file is read; fill in what the upload used to compute.
+        # Documents get theirs from the ingestion pass below instead of a parse of their own
+        analyze = collection.embeddings_status == 'pending_analysis'
+        if analyze and collection.content_type != 'document':
+            _analyze_tabular_collection(collection)
+        
         # Update status to processing
         collection.embeddings_status = 'processing'
         db.commit()
@@ -42,10 +52,20 @@ def process_embeddings_task(collection_id: int):
         # Initialize embedding service
         embedding_service = EmbeddingService(
             db_url=settings.TIMESCALE_DATABASE_URL,
-            ollama_host=settings.OLLAMA_HOST
+            ollama_host=settings.OLLAMA_HOST,
+            storage_layout=settings.EMBEDDINGS_STORAGE_LAYOUT,
+            dedup_config=DedupConfig(
+                method=settings.DEDUP_METHOD,
+                scope=settings.DEDUP_SCOPE,
+                simhash_max_distance=settings.DEDUP_SIMHASH_MAX_DISTANCE,
+                minhash_threshold=settings.DEDUP_MINHASH_THRESHOLD
+            )
         )
         
-        table_name = f"embeddings_collection_{collection_id}"
+        if embedding_service.is_partitioned:
+            table_name = PARTITIONED_TABLE
+        else:
+            table_name = legacy_table_name(collection_id)
         
         # Check if this is a document or tabular collection
         if collection.content_type == 'document':
@@ -63,16 +83,27 @@ def process_embeddings_task(collection_id: int):
                 embedding_model_name=embedding_model_name
             )
         
+        if analyze and 'document' in result:
+            parsed = result.pop('document')
+            collection.row_count = result['total_rows']  # Use chunk count as row count
+            collection.document_metadata = _document_metadata(parsed, result['total_rows'])
+        
         # Update collection status
         collection.embeddings_status = 'completed'
         collection.embeddings_metadata = {
             'table_name': table_name,
+            'storage_layout': embedding_service.storage_layout,
             'processed_at': result['timestamp'],
             'processed_rows': result['processed_rows'],
             'total_rows': result['total_rows'],
             'content_type': collection.content_type,
             'embedding_model': embedding_model_name
         }
+        if 'dedup' in result:
+            collection.embeddings_metadata['dedup'] = result['dedup']
+            collection.embeddings_metadata['embed_calls_saved'] = result['dedup']['embed_calls_saved']
+        if 'column_types' in result:
+            collection.embeddings_metadata['column_types'] = result['column_types']
         db.commit()
         
         logger.info(f"Successfully processed embeddings for collection {collection_id} using model {embedding_model_name}")
@@ -94,25 +125,62 @@ def process_embeddings_task(collection_id: int):
         db.close()
 
 
+def _document_chunking(collection: DataCollection, embedding_model_name: str):
+    """Chunking method and config of a document collection"""
+    chunking_method = collection.chunking_method or ChunkingMethod.RECURSIVE.value
+    chunking_config = collection.chunking_config or {}
+    if chunking_method in (ChunkingMethod.TOKEN.value, ChunkingMethod.EMBEDDING_SEMANTIC.value):
+        # Token budgets and sentence similarity use the model that embeds the chunks
+        chunking_config = {**chunking_config, 'embedding_model': embedding_model_name}
+    return ChunkingMethod(chunking_method), chunking_config
+
+
+def _document_metadata(parsed: ParsedDocument, chunk_count: int) -> Dict[str, Any]:
+    return {
+        'word_count': parsed.word_count,
+        'char_count': parsed.char_count,
+        'page_count': parsed.page_count,
+        'chunk_count': chunk_count,
+        **parsed.metadata
+    }
+
+
+def _analyze_tabular_collection(collection: DataCollection) -> None:
+    """
+    Fill in the columns and row count of a freshly uploaded tabular collection.
+    
+    The file is converted to Parquet once, then columns and row count come
+    from its metadata.
+    """
+    logger.info(f"Analyzing tabular collection {collection.id}")
+    
+    reader = TabularReader()
+    # Later reads (counting, preview, ingestion) use the typed Parquet copy
+    reader.convert_to_parquet(collection.file_path)
+    collection.columns = json.dumps(reader.read_columns(collection.file_path))
+    collection.row_count = reader.count_rows(collection.file_path)
+
+
 def _process_tabular_embeddings(
     collection: DataCollection,
     embedding_service: EmbeddingService,
     table_name: str,
     embedding_model_name: str = "nomic-embed-text"
 ) -> Dict[str, Any]:
-    """Process embeddings for tabular data (CSV, XLSX)"""
+    """Process embeddings for tabular data (CSV, XLSX, JSONL, Parquet)"""
     logger.info(f"Processing tabular embeddings for collection {collection.id} using model {embedding_model_name}")
     
-    # Read the file
-    if collection.file_type == 'csv':
-        df = pd.read_csv(collection.file_path)
-    elif collection.file_type in ['xlsx', 'xls']:
-        df = pd.read_excel(collection.file_path)
-    else:
+    # Read the file in batches and embed each batch before reading the next
+    reader = TabularReader()
+    if not reader.is_supported(collection.file_path):
         raise ValueError(f"Unsupported tabular file type: {collection.file_type}")
     
-    # Process the DataFrame with the selected embedding model
-    return embedding_service.process_dataframe(df, collection.id, table_name, embedding_model_name=embedding_model_name)
+    return embedding_service.process_dataframe_stream(
+        reader.iter_batches(collection.file_path),
+        collection.id,
+        table_name,
+        embedding_model_name=embedding_model_name
+    )
 
 
 def _process_document_embeddings(
@@ -121,51 +189,64 @@ def _process_document_embeddings(
     table_name: str,
     embedding_model_name: str = "nomic-embed-text"
 ) -> Dict[str, Any]:
-    """Process embeddings for document data (TXT, PDF, DOCX)"""
-    logger.info(f"Processing document embeddings for collection {collection.id} using model {embedding_model_name}")
+    """
+    Process embeddings for document data (TXT, PDF, DOCX, HTML, Markdown).
     
-    # Parse the document
-    parser = DocumentParser()
-    parsed_doc = parser.parse(collection.file_path)
+    The result carries the document's metadata under 'document' (a
+    ParsedDocument without content), counted during the same pass.
+    """
+    logger.info(f"Processing document embeddings for collection {collection.id} using model {embedding_model_name}")
     
     # Get chunking configuration
-    chunking_method = collection.chunking_method or ChunkingMethod.RECURSIVE.value
-    chunking_config = collection.chunking_config or {}
-    
-    # Chunk the document
-    chunker = TextChunker()
-    chunks = chunker.chunk(
-        parsed_doc.content,
-        method=ChunkingMethod(chunking_method),
-        config=chunking_config
-    )
-    
-    logger.info(f"Document chunked into {len(chunks)} chunks using {chunking_method} method")
+    method, chunking_config = _document_chunking(collection, embedding_model_name)
+    chunking_method = method.value
     
-    # Convert chunks to DataFrame format for processing
-    chunk_data = []
-    for chunk in chunks:
-        chunk_data.append({
-            'chunk_index': chunk.index,
-            'content': chunk.content,
-            'start_char': chunk.start_char,
-            'end_char': chunk.end_char,
-            'chunking_method': chunk.metadata.get('method', chunking_method)
-        })
+    # Reuse the chunks of the upload analysis / preview when they are cached;
+    # otherwise parse and chunk the document as a stream so embedding starts
+    # before parsing finishes and the full text is never held in memory
+    cached = peek_document_chunks(collection.file_path, method, chunking_config)
+    stats = None
+    if cached is not None:
+        parsed, chunks = cached
+        element_map = parsed.element_map or ElementMap()
+        logger.info(f"Using {len(chunks)} cached chunks for collection {collection.id}")
+    else:
+        parser = DocumentParser()
+        # Filled while elements stream in; maps chunk offsets to pages, sections and tables
+        element_map = ElementMap()
+        # Word and character counts for document_metadata, taken as the text streams by
+        stats = TextStats()
+        chunks = get_text_chunker().chunk_stream(
+            stats.track(parser.iter_segments(collection.file_path, element_map=element_map)),
+            method=method,
+            config=chunking_config
+        )
     
-    df = pd.DataFrame(chunk_data)
+    def chunk_rows():
+        for chunk in chunks:
+            yield {
+                'chunk_index': chunk.index,
+                'content': chunk.content,
+                'start_char': chunk.start_char,
+                'end_char': chunk.end_char,
+                'chunking_method': chunk.metadata.get('method', chunking_method),
+                'metadata': element_map.chunk_metadata(chunk.start_char, chunk.end_char)
+            }
     
-    # Process the chunks DataFrame with the selected embedding model
-    return embedding_service.process_document_chunks(
-        df=df,
+    result = embedding_service.process_document_chunk_stream(
+        chunk_rows(),
         collection_id=collection.id,
         table_name=table_name,
         document_metadata={
             'filename': collection.name,
-            'file_type': collection.file_type,
-            'word_count': parsed_doc.word_count,
-            'char_count': parsed_doc.char_count,
-            'page_count': parsed_doc.page_count
+            'file_type': collection.file_type
         },
         embedding_model_name=embedding_model_name
     )
+    
+    if stats is not None:
+        parsed = parser.describe(collection.file_path, stats=stats)
+    result['document'] = parsed
+    
+    logger.info(f"Document streamed into {result['total_rows']} chunks using {chunking_method} method")
+    return result
@@ -0,0 +1,76 @@
+import asyncio
+import json
+import unittest
+
+from core.chat_streaming import STREAM_NDJSON, STREAM_SSE, TokenStream, encode_event, stream_format
+
+
+async def _chunks(*chunks, fail=None):
+    for chunk in chunks:
+        yield chunk
+    if fail:
+        raise RuntimeError(fail)
+
+
+def _token(content, done=False):
+    return {"message": {"role": "assistant", "content": content}, "done": done}
+
+
+def _collect(token_stream):
+    async def run():
+        await token_stream.start()
+        return [event async for event in token_stream]
+    return asyncio.run(run())
+
+
+class TestStreamFormat(unittest.TestCase):
+    def test_format_selection(self):
+        self.assertEqual(stream_format(), STREAM_SSE)
+        self.assertEqual(stream_format(accept="application/x-ndjson"), STREAM_NDJSON)
+        self.assertEqual(stream_format("sse", accept="application/x-ndjson"), STREAM_SSE)
+        with self.assertRaises(ValueError):
+            stream_format("xml")
+
+    def test_framing(self):
+        self.assertEqual(encode_event(STREAM_SSE, "token", {"content": "a"}), b'event: token\ndata: {"content": "a"}\n\n')
+        self.assertEqual(json.loads(encode_event(STREAM_NDJSON, "token", {"content": "a"})), {"event": "token", "content": "a"})
+
+
+class TestTokenStream(unittest.TestCase):
+    def test_tokens_then_done(self):
+        first_tokens = []
+        token_stream = TokenStream(
+            _chunks(_token(""), _token("Hel"), _token("lo"), _token("", done=True)),
+            STREAM_NDJSON,
+            on_first_token=first_tokens.append
+        )
+        token_stream.meta["session_id"] = "s1"
+        events = [json.loads(line) for line in _collect(token_stream)]
+
+        self.assertEqual([e["event"] for e in events], ["token", "token", "done"])
+        self.assertEqual(token_stream.content, "Hello")
+        self.assertTrue(token_stream.completed)
+        self.assertIsNone(token_stream.error)
+        self.assertEqual(first_tokens, [token_stream.ttft_ms])
+        self.assertLessEqual(token_stream.ttft_ms, token_stream.response_time_ms)
+        self.assertEqual(events[-1]["session_id"], "s1")
+        self.assertEqual(events[-1]["ttft_ms"], round(token_stream.ttft_ms))
+
+    def test_failure_mid_stream_ends_with_error_event(self):
+        token_stream = TokenStream(_chunks(_token("a"), fail="connection lost"))
+        events = _collect(token_stream)
+
+        self.assertTrue(events[-1].startswith(b"event: error\n"))
+        self.assertEqual(token_stream.error, "connection lost")
+        self.assertFalse(token_stream.completed)
+        self.assertEqual(token_stream.content, "a")
+        self.assertIsNotNone(token_stream.response_time_ms)
+
+    def test_start_surfaces_upstream_errors(self):
+        token_stream = TokenStream(_chunks(fail="model not found"))
+        with self.assertRaises(RuntimeError):
+            asyncio.run(token_stream.start())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from core.column_types import (
+    SQL_BIGINT,
+    SQL_BOOLEAN,
+    SQL_DOUBLE,
+    SQL_TEXT,
+    SQL_TIMESTAMP,
+    SQL_TIMESTAMPTZ,
+    ColumnTypes,
+    coerce_value,
+    infer_sql_type,
+)
+
+
+class TestInference(unittest.TestCase):
+    def test_types_follow_the_data(self):
+        df = pd.DataFrame({
+            "id": [1, 2, 3],
+            "price": [1.5, 2.0, np.nan],
+            "active": [True, False, True],
+            "name": ["a", "b", "c"],
+            "day": ["2024-01-01", "2024-02-01", None],
+            "seen": ["2024-01-01T10:00:00Z", "2024-01-02T11:30:00+02:00", "2024-01-03 09:00:00Z"],
+        })
+        self.assertEqual(
+            {column: infer_sql_type(df[column]) for column in df.columns},
+            {
+                "id": SQL_BIGINT,
+                "price": SQL_DOUBLE,
+                "active": SQL_BOOLEAN,
+                "name": SQL_TEXT,
+                "day": SQL_TIMESTAMP,
+                "seen": SQL_TIMESTAMPTZ,
+            },
+        )
+
+    def test_integer_columns_with_gaps_stay_integers(self):
+        # pandas reads CSV integer columns with missing values as floats
+        series = pd.Series([1.0, np.nan, 3.0])
+        self.assertEqual(infer_sql_type(series), SQL_BIGINT)
+        self.assertEqual([coerce_value(v, SQL_BIGINT) for v in series], [1, None, 3])
+
+    def test_empty_columns_are_text(self):
+        self.assertEqual(infer_sql_type(pd.Series([None, None])), SQL_TEXT)
+        self.assertEqual(infer_sql_type(pd.Series([], dtype=object)), SQL_TEXT)
+
+
+class TestColumnTypes(unittest.TestCase):
+    def test_values_are_coerced_to_column_types(self):
+        types = ColumnTypes()
+        self.assertEqual(types.add(pd.DataFrame({"n": [1], "at": ["2024-03-01"]})), {"n": SQL_BIGINT, "at": SQL_TIMESTAMP})
+        values, widened = types.coerce_row({"n": np.int64(7), "at": "2024-03-01"})
+        self.assertEqual(values, {"n": 7, "at": datetime(2024, 3, 1)})
+        self.assertEqual(widened, {})
+        self.assertEqual(types.indexed_columns(), ["n", "at"])
+
+    def test_drifting_values_widen_their_column(self):
+        types = ColumnTypes()
+        types.add(pd.DataFrame({"n": [1, 2], "flag": [True, False]}))
+        # Columns seen first in a later batch are only inferred once
+        self.assertEqual(types.add(pd.DataFrame({"n": [3.5], "flag": ["yes"]})), {})
+
+        values, widened = types.coerce_row({"n": 3.5, "flag": "yes"})
+        self.assertEqual(values, {"n": 3.5, "flag": "yes"})
+        self.assertEqual(widened, {"n": SQL_DOUBLE, "flag": SQL_TEXT})
+
+        values, widened = types.coerce_row({"n": "n/a", "flag": True})
+        self.assertEqual(values, {"n": "n/a", "flag": "True"})
+        self.assertEqual(widened, {"n": SQL_TEXT})
+        self.assertEqual(types.types, {"n": SQL_TEXT, "flag": SQL_TEXT})
+
+    def test_offsets_widen_naive_timestamp_columns(self):
+        types = ColumnTypes()
+        types.add(pd.DataFrame({"at": ["2024-03-01 10:00"]}))
+
+        values, widened = types.coerce_row({"at": "2024-03-02T10:00:00+02:00"})
+        self.assertEqual(widened, {"at": SQL_TIMESTAMPTZ})
+        self.assertEqual(values["at"].utcoffset(), timedelta(hours=2))
+
+        # Naive values still fit the widened column
+        values, widened = types.coerce_row({"at": "2024-03-03 10:00"})
+        self.assertEqual(values, {"at": datetime(2024, 3, 3, 10)})
+        self.assertEqual(widened, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
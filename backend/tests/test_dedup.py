@@ -0,0 +1,126 @@
+import random
+import unittest
+
+from core.dedup import (
+    DEDUP_EXACT,
+    DEDUP_MINHASH,
+    DEDUP_SIMHASH,
+    SCOPE_GLOBAL,
+    ChunkDeduplicator,
+    DedupConfig,
+    DedupSession,
+    hamming_distance,
+    normalize_text,
+    simhash,
+    to_signed64,
+)
+from core.embeddings import EmbeddingService
+
+FOOTER = "This document is provided for internal use only. Do not distribute without written approval."
+PARAGRAPH = (
+    "Quarterly revenue grew in every region, driven by renewals in the enterprise segment "
+    "and a steady increase of new self-serve accounts across Europe and North America."
+)
+OTHER = "The migration plan moves the reporting database to the new cluster over two maintenance windows."
+WORDS = (
+    "revenue growth region segment account market plan cluster database report quarter "
+    "team customer product release service renewal forecast budget pipeline"
+).split()
+
+
+def _chunk_text(seed, words=160):
+    """Chunk-sized text; single-word edits of it are near-duplicates"""
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _edit(text, position, word="changed"):
+    words = text.split()
+    words[position] = word
+    return " ".join(words)
+
+
+def _index(method, texts):
+    deduplicator = ChunkDeduplicator(DedupConfig(method=method))
+    matches = []
+    for row_id, text in enumerate(texts):
+        fingerprint = deduplicator.fingerprint(text)
+        match = deduplicator.find(fingerprint)
+        matches.append(match)
+        if match is None:
+            deduplicator.add(fingerprint, row_id)
+    return matches
+
+
+class TestChunkDeduplicator(unittest.TestCase):
+    def test_exact_ignores_case_and_whitespace_only(self):
+        matches = _index(DEDUP_EXACT, [FOOTER, "  " + FOOTER.upper().replace(" ", "\n"), FOOTER + " Page 2"])
+        self.assertEqual(matches, [None, 0, None])
+
+    def test_simhash_matches_small_edits(self):
+        text = _chunk_text(1)
+        edited = _edit(text, 80)
+        self.assertLessEqual(hamming_distance(simhash(normalize_text(text)), simhash(normalize_text(edited))), 3)
+        self.assertEqual(_index(DEDUP_SIMHASH, [text, _chunk_text(2), edited]), [None, None, 0])
+
+    def test_minhash_matches_near_duplicates_only(self):
+        text = _chunk_text(3)
+        matches = _index(DEDUP_MINHASH, [text, PARAGRAPH, _edit(text, 40), _chunk_text(4)])
+        self.assertEqual(matches, [None, None, 0, None])
+
+    def test_signed_fingerprint_fits_bigint(self):
+        self.assertEqual(to_signed64((1 << 64) - 1), -1)
+        self.assertEqual(to_signed64(5), 5)
+
+
+class TestDedupSession(unittest.TestCase):
+    def test_stats_count_saved_embed_calls(self):
+        session = DedupSession(DedupConfig(method=DEDUP_SIMHASH), collection_id=1, table_name="t", embedding_model="m")
+        for row_id, text in enumerate([FOOTER, PARAGRAPH, FOOTER, FOOTER]):
+            decision = session.resolve(None, text)
+            session.register(None, decision, row_id)
+
+        stats = session.stats()
+        self.assertEqual(stats["checked_chunks"], 4)
+        self.assertEqual(stats["duplicates"], 2)
+        self.assertEqual(stats["embed_calls_saved"], 2)
+
+    def test_missing_source_table_is_no_match(self):
+        class Cursor:
+            def __init__(self):
+                self.queries = []
+                self.results = [("2", 5, "embeddings_collection_2"), (False,)]
+
+            def execute(self, sql, params=None):
+                self.queries.append(sql)
+
+            def fetchone(self):
+                return self.results.pop(0)
+
+        cur = Cursor()
+        session = DedupSession(
+            DedupConfig(method=DEDUP_EXACT, scope=SCOPE_GLOBAL), collection_id=1, table_name="t", embedding_model="m"
+        )
+        decision = session.resolve(cur, FOOTER)
+        self.assertIsNone(decision.copied_embedding)
+        self.assertFalse(any("SELECT embedding" in sql for sql in cur.queries))
+        self.assertIn("DELETE", cur.queries[-1])
+
+    def test_disabled_config(self):
+        self.assertFalse(DedupConfig(method="off").enabled)
+        self.assertFalse(DedupConfig().enabled)
+
+    def test_duplicates_copy_the_canonical_vector(self):
+        session = DedupSession(DedupConfig(method=DEDUP_EXACT), collection_id=1, table_name="t", embedding_model="m")
+        session.register(None, session.resolve(None, FOOTER), 10)
+        decision = session.resolve(None, FOOTER)
+
+        embedding_sql = EmbeddingService._dedup_embedding_sql(decision, "EMBED", "embeddings_collection_1")
+        self.assertNotIn("NULL", embedding_sql)
+        self.assertIn("FROM embeddings_collection_1", embedding_sql)
+        self.assertIn("id = %(duplicate_of)s", embedding_sql)
+        self.assertEqual(EmbeddingService._dedup_embedding_sql(None, "EMBED", "t"), "EMBED")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+
+from core.document_cache import DocumentCache, chunking_key, get_document_chunks, peek_document_chunks
+from core.document_parser import DocumentParser
+from core.text_chunking import ChunkingMethod
+
+
+class CountingParser(DocumentParser):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def parse(self, file_path):
+        self.calls += 1
+        return super().parse(file_path)
+
+
+class TestDocumentCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, "cache")
+        self.path = os.path.join(self.tmp.name, "doc.txt")
+        with open(self.path, "w") as f:
+            f.write("First paragraph of the document.\n\nSecond paragraph, a little longer than the first one.")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _cache(self, memory_bytes=1 << 20, disk_bytes=1 << 20):
+        return DocumentCache(self.cache_dir, memory_bytes=memory_bytes, disk_bytes=disk_bytes)
+
+    def test_chunks_are_computed_once_per_config(self):
+        cache = self._cache()
+        parser = CountingParser()
+        first = get_document_chunks(self.path, ChunkingMethod.PARAGRAPH, None, parser=parser, cache=cache)
+        second = get_document_chunks(self.path, ChunkingMethod.PARAGRAPH, {}, parser=parser, cache=cache)
+        self.assertEqual(parser.calls, 1)
+        self.assertEqual([c.content for c in first[1]], [c.content for c in second[1]])
+
+        get_document_chunks(self.path, ChunkingMethod.FIXED_SIZE, {"chunk_size": 40, "chunk_overlap": 10}, parser=parser, cache=cache)
+        self.assertEqual(parser.calls, 1)
+        self.assertIsNone(peek_document_chunks(self.path, ChunkingMethod.SEMANTIC, None, cache=cache))
+
+    def test_disk_tier_survives_a_new_process_cache(self):
+        get_document_chunks(self.path, ChunkingMethod.PARAGRAPH, None, cache=self._cache())
+        fresh = self._cache()
+        self.assertIsNotNone(peek_document_chunks(self.path, ChunkingMethod.PARAGRAPH, None, cache=fresh))
+        self.assertEqual(fresh.stats()["hits"], 2)
+
+    def test_lru_eviction_respects_budgets(self):
+        cache = self._cache(memory_bytes=2500, disk_bytes=2500)
+        for key in ("a", "b", "c"):
+            cache.put(key, "x" * 1000)
+        self.assertEqual(cache.stats()["memory_entries"], 2)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+        self.assertIsNone(self._cache().get("a"))
+        self.assertEqual(self._cache().get("c"), "x" * 1000)
+
+    def test_chunking_key_ignores_config_order(self):
+        self.assertEqual(
+            chunking_key(ChunkingMethod.TOKEN, {"max_tokens": 256, "overlap_tokens": 32}),
+            chunking_key(ChunkingMethod.TOKEN, {"overlap_tokens": 32, "max_tokens": 256})
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
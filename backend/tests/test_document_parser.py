@@ -0,0 +1,192 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from benchmarks.corpus import write_pdf
+from core.document_parser import DocumentParser, ElementMap, TextStats, detect_encoding
+
+
+class TestPdfPages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "doc.pdf")
+        # Page 2 has no text and must not shift the numbers of later pages
+        write_pdf(self.path, [["first page text"], [], ["third page text"], ["fourth page text"]])
+        self.parser = DocumentParser()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pages_are_numbered_from_one_and_empty_pages_skipped(self):
+        pages = list(self.parser.iter_pdf_pages(self.path))
+        self.assertEqual([number for number, _ in pages], [1, 3, 4])
+        self.assertIn("third page", pages[1][1])
+
+    def test_element_map_tracks_streamed_offsets(self):
+        element_map = ElementMap()
+        text = "".join(self.parser.iter_segments(self.path, element_map=element_map))
+        self.assertEqual(text, self.parser.parse(self.path).content)
+
+        third = text.index("third")
+        fourth = text.index("fourth")
+        self.assertEqual(
+            element_map.chunk_metadata(third, third + 5),
+            {"page_start": 3, "page_end": 3, "element_types": ["page"]}
+        )
+        self.assertEqual(
+            element_map.chunk_metadata(0, fourth + 6),
+            {"page_start": 1, "page_end": 4, "element_types": ["page"]}
+        )
+
+    def test_element_map_is_empty_for_unstructured_documents(self):
+        self.assertEqual(ElementMap().chunk_metadata(0, 10), {})
+
+
+class TestSectionedFormats(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.parser = DocumentParser()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_html_sections_split_at_headings_and_skip_scripts(self):
+        path = self._write("page.html", (
+            "<html><head><title>Doc</title><script>var x = 1;</script></head><body>"
+            "<p>Intro &amp; overview.</p><h2>Setup</h2><p>Install   the\n package.</p>"
+            "<table><tr><th>Key</th><th>Value</th></tr><tr><td>a</td><td>1</td></tr></table>"
+            "<h2>Usage</h2><ul><li>Run it</li></ul></body></html>"
+        ))
+        sections = list(self.parser._iter_html_sections(path))
+        self.assertEqual(sections, [
+            ((), "Doc\nIntro & overview."),
+            (("Setup",), "Setup\nInstall the package.\nKey | Value\na | 1"),
+            (("Usage",), "Usage\nRun it"),
+        ])
+        parsed = self.parser.parse(path)
+        self.assertEqual(parsed.metadata["section_count"], 3)
+        self.assertNotIn("var x", parsed.content)
+
+    def test_streamed_stats_match_parse(self):
+        path = self._write("guide.md", "# Guide\nintro text\n## Install\nsteps to follow\n# Reference\napi\n")
+        stats = TextStats()
+        for _ in stats.track(self.parser.iter_segments(path)):
+            pass
+        described = self.parser.describe(path, stats=stats)
+        parsed = self.parser.parse(path)
+        self.assertEqual(described.content, "")
+        self.assertEqual(
+            (described.word_count, described.char_count, described.page_count, described.metadata),
+            (parsed.word_count, parsed.char_count, parsed.page_count, parsed.metadata)
+        )
+
+    def test_stats_count_words_split_across_segments(self):
+        stats = TextStats()
+        for segment in ["hello wor", "ld and", " more ", "", "text"]:
+            stats.add(segment)
+        self.assertEqual(stats.word_count, len("hello world and more text".split()))
+        self.assertEqual(stats.char_count, len("hello world and more text"))
+
+    def test_markdown_headings_inside_code_fences_do_not_split(self):
+        path = self._write("notes.md", "Preface\n\n# One\ntext\n```\n# not a heading\n```\n## Two\nmore\n")
+        sections = list(self.parser._iter_markdown_sections(path))
+        self.assertEqual(sections, [
+            ((), "Preface"),
+            (("One",), "# One\ntext\n```\n# not a heading\n```"),
+            (("One", "Two"), "## Two\nmore"),
+        ])
+        self.assertEqual("".join(self.parser.iter_segments(path)), "\n\n".join(text for _, text in sections))
+
+    def test_section_metadata_follows_heading_path(self):
+        path = self._write("guide.md", "# Guide\nintro\n## Install\nsteps\n# Reference\napi\n")
+        parsed = self.parser.parse(path)
+        steps = parsed.content.index("steps")
+        self.assertEqual(parsed.element_map.chunk_metadata(steps, steps + 5), {
+            "heading_path": ["Guide", "Install"],
+            "section": "Install",
+            "element_types": ["section"],
+        })
+        api = parsed.content.index("api")
+        self.assertEqual(parsed.element_map.chunk_metadata(api, api + 3)["heading_path"], ["Reference"])
+
+    def test_docx_elements_keep_body_order(self):
+        import docx
+
+        document = docx.Document()
+        document.add_heading("Report", level=1)
+        document.add_paragraph("Summary text.")
+        table = document.add_table(rows=1, cols=2)
+        table.rows[0].cells[0].text = "a"
+        table.rows[0].cells[1].text = "1"
+        document.add_heading("Details", level=2)
+        document.add_paragraph("Closing text.")
+        path = os.path.join(self.tmp.name, "report.docx")
+        document.save(path)
+
+        elements = list(self.parser.iter_elements(path))
+        self.assertEqual(
+            [(e.element_type, e.text, e.heading_path, e.table_id) for e in elements],
+            [
+                ("heading", "Report", ("Report",), None),
+                ("paragraph", "Summary text.", ("Report",), None),
+                ("table", "a | 1", ("Report",), 1),
+                ("heading", "Details", ("Report", "Details"), None),
+                ("paragraph", "Closing text.", ("Report", "Details"), None),
+            ],
+        )
+        parsed = self.parser.parse(path)
+        self.assertEqual(parsed.content, "".join(self.parser.iter_segments(path)))
+        table_start = parsed.content.index("a | 1")
+        self.assertEqual(parsed.element_map.chunk_metadata(table_start, table_start + 5)["table_ids"], [1])
+
+
+class TestTextDecoding(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.parser = DocumentParser()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write_bytes(self, data):
+        path = os.path.join(self.tmp.name, "doc.txt")
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_encoding_is_detected_from_a_sample(self):
+        self.assertEqual(detect_encoding("naïve café".encode("utf-8"), complete=True), "utf-8")
+        self.assertEqual(detect_encoding("naïve café".encode("cp1252"), complete=True), "cp1252")
+        self.assertEqual(detect_encoding(b"\xef\xbb\xbfhello", complete=True), "utf-8-sig")
+        # A multi-byte character cut off at the end of a partial sample is still UTF-8
+        self.assertEqual(detect_encoding("abc é".encode("utf-8")[:-1], complete=False), "utf-8")
+
+    def test_windowed_decoding_matches_text_mode_read(self):
+        text = "Zürich\r\nMünchen\rÅrhus 日本語\r\n" * 40
+        path = self._write_bytes(text.encode("utf-8"))
+        with open(path, "r", encoding="utf-8") as f:
+            expected = f.read()
+
+        # Tiny windows split multi-byte characters and '\r\n' pairs
+        for window in (1, 2, 3, 5, 64):
+            with mock.patch("core.document_parser.TXT_DECODE_WINDOW_BYTES", window):
+                self.assertEqual("".join(self.parser._iter_txt_blocks(path)), expected)
+
+        parsed = self.parser.parse(path)
+        self.assertEqual(parsed.content, expected)
+        self.assertEqual(parsed.metadata["encoding"], "utf-8")
+
+    def test_bom_is_stripped_and_empty_files_parse(self):
+        self.assertEqual(self.parser.parse(self._write_bytes(b"\xef\xbb\xbfhello")).content, "hello")
+        self.assertEqual(self.parser.parse(self._write_bytes(b"")).content, "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+from core.embedding_store import (
+    LAYOUT_PARTITIONED,
+    PARTITIONED_TABLE,
+    legacy_table_name,
+    resolve_embeddings_location,
+)
+
+
+class TestResolveEmbeddingsLocation(unittest.TestCase):
+    def test_legacy_collections_use_their_own_table(self):
+        location = resolve_embeddings_location(7, None)
+        self.assertEqual(location.table_name, legacy_table_name(7))
+        self.assertEqual(location.collection_id, 7)
+        self.assertFalse(location.is_partitioned)
+
+    def test_duplicate_uploads_read_the_source_embeddings(self):
+        legacy = resolve_embeddings_location(9, {"source_collection_id": 4})
+        self.assertEqual(legacy.table_name, legacy_table_name(4))
+
+        partitioned = resolve_embeddings_location(9, {
+            "storage_layout": LAYOUT_PARTITIONED,
+            "table_name": PARTITIONED_TABLE,
+            "source_collection_id": 4,
+        })
+        self.assertTrue(partitioned.is_partitioned)
+        self.assertEqual(partitioned.collection_id, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
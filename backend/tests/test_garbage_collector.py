@@ -0,0 +1,127 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from core.garbage_collector import (
+    KIND_UPLOAD_SESSIONS,
+    KIND_UPLOADS,
+    CollectionState,
+    GarbageCollector,
+    SweepReport,
+    retained_collection_ids,
+)
+from core.uploads import UploadSessionNotFound, UploadSessionStore
+
+DAY = 24 * 3600
+
+
+class TestRetainedCollections(unittest.TestCase):
+    def test_failed_collections_are_released_after_the_grace_period(self):
+        now = time.time()
+        collections = [
+            CollectionState(id=1, embeddings_status='completed', updated_at=now - 10 * DAY),
+            CollectionState(id=2, embeddings_status='failed', updated_at=now - 10 * DAY),
+            CollectionState(id=3, embeddings_status='failed', updated_at=now - 60),
+            CollectionState(id=4, embeddings_status='processing'),
+        ]
+        self.assertEqual(retained_collection_ids(collections, now, DAY), {1, 3, 4})
+
+    def test_duplicate_uploads_keep_their_source(self):
+        # Collection 5 was deleted, but 6 still reads its embeddings
+        collections = [CollectionState(id=6, embeddings_status='completed', embeddings_metadata={'source_collection_id': 5})]
+        self.assertEqual(retained_collection_ids(collections, time.time(), DAY), {5, 6})
+
+
+class TestFileSweeps(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.upload_dir = os.path.join(self.tmp.name, "uploads")
+        os.makedirs(self.upload_dir)
+        self.sessions = UploadSessionStore(self.upload_dir, session_dir=os.path.join(self.upload_dir, ".sessions"))
+        self.collections = []
+        self.collector = GarbageCollector(
+            db_url="postgresql://unused",
+            upload_dir=self.upload_dir,
+            load_collections=lambda: self.collections,
+            session_store=self.sessions,
+            min_age=DAY,
+            session_ttl=DAY,
+            batch_size=2,
+            batch_pause=0
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, data=b"x" * 100, age=2 * DAY):
+        path = os.path.join(self.upload_dir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_unreferenced_old_uploads_are_removed(self):
+        kept = self._write("kept.csv")
+        parquet = self._write("kept.csv.parquet")
+        deleted = self._write("deleted.csv")
+        stale_part = self._write("interrupted.pdf.part")
+        fresh = self._write("just-uploaded.pdf", age=0)
+        self.collections = [CollectionState(id=1, file_path=kept)]
+
+        dry = SweepReport(dry_run=True)
+        self.collector._sweep_uploads(dry)
+        self.assertEqual(dry.reclaimed[KIND_UPLOADS]["count"], 2)
+        self.assertTrue(os.path.exists(deleted))
+
+        report = SweepReport(dry_run=False)
+        self.collector._sweep_uploads(report)
+        self.assertEqual(report.reclaimed[KIND_UPLOADS]["count"], 2)
+        self.assertGreater(report.total_bytes, 0)
+        self.assertFalse(os.path.exists(deleted))
+        self.assertFalse(os.path.exists(stale_part))
+        for path in (kept, parquet, fresh):
+            self.assertTrue(os.path.exists(path))
+
+    def test_archive_dir_receives_orphans(self):
+        self._write("deleted.csv")
+        self.collector.archive_dir = os.path.join(self.tmp.name, "archive")
+        self.collector._sweep_uploads(SweepReport(dry_run=False))
+        self.assertEqual(os.listdir(self.collector.archive_dir), ["deleted.csv"])
+
+    def test_idle_upload_sessions_expire(self):
+        idle = self.sessions.create("idle.csv", 10)
+        active = self.sessions.create("active.csv", 10)
+        self._backdate_session(idle.upload_id)
+
+        report = SweepReport(dry_run=False)
+        self.collector._sweep_upload_sessions(report)
+        self.assertEqual(report.reclaimed[KIND_UPLOAD_SESSIONS]["count"], 1)
+        with self.assertRaises(UploadSessionNotFound):
+            self.sessions.get(idle.upload_id)
+        self.assertFalse(os.path.exists(idle.part_path))
+        self.assertTrue(os.path.exists(active.part_path))
+
+        # The part file of the live session is not an orphan upload
+        self._age(active.part_path)
+        uploads = SweepReport(dry_run=False)
+        self.collector._sweep_uploads(uploads)
+        self.assertEqual(uploads.reclaimed, {})
+
+    def _age(self, path):
+        mtime = time.time() - 2 * DAY
+        os.utime(path, (mtime, mtime))
+
+    def _backdate_session(self, upload_id):
+        sidecar = os.path.join(self.sessions.session_dir, f"{upload_id}.json")
+        with open(sidecar) as f:
+            state = json.load(f)
+        state["updated_at"] = time.time() - 2 * DAY
+        with open(sidecar, "w") as f:
+            json.dump(state, f)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import asyncio
+import unittest
+
+import httpx
+
+from core.timing import latency_registry
+from services.ollama_service import OllamaClient, OllamaStreamError
+
+
+class TestOllamaClient(unittest.TestCase):
+    def setUp(self):
+        self.requests = []
+        self.responses = []
+        latency_registry.reset()
+
+    def _handler(self, request):
+        self.requests.append(request)
+        outcome = self.responses.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def _client(self, **kwargs):
+        return OllamaClient(
+            "http://ollama:11434/",
+            retry_backoff=0,
+            transport=httpx.MockTransport(self._handler),
+            **kwargs
+        )
+
+    def _chat(self, client):
+        async def run():
+            try:
+                return await client.chat("mistral:7b", [{"role": "user", "content": "hi"}])
+            finally:
+                await client.aclose()
+        return asyncio.run(run())
+
+    def test_transient_failures_are_retried(self):
+        self.responses = [
+            httpx.ConnectError("refused"),
+            httpx.Response(503),
+            httpx.Response(200, json={"message": {"content": "hello"}}),
+        ]
+        result = self._chat(self._client(max_retries=2))
+        self.assertEqual(result["message"]["content"], "hello")
+        self.assertEqual(len(self.requests), 3)
+        self.assertEqual(str(self.requests[0].url), "http://ollama:11434/api/chat")
+
+        endpoints = latency_registry.snapshot()["endpoints"]
+        self.assertEqual(endpoints["/api/chat"]["ollama_request"]["count"], 1)
+
+    def test_client_errors_and_read_timeouts_are_final(self):
+        self.responses = [httpx.Response(404, json={"error": "model not found"})]
+        with self.assertRaises(httpx.HTTPStatusError):
+            self._chat(self._client(max_retries=3))
+        self.assertEqual(len(self.requests), 1)
+
+        self.responses = [httpx.ReadTimeout("slow")]
+        with self.assertRaises(httpx.ReadTimeout):
+            self._chat(self._client(max_retries=3))
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(latency_registry.snapshot()["endpoints"]["/api/chat"]["ollama_error"]["count"], 2)
+
+    def test_retries_stop_after_max_retries(self):
+        self.responses = [httpx.Response(502), httpx.Response(502)]
+        client = self._client(max_retries=1)
+        with self.assertRaises(httpx.HTTPStatusError):
+            client.chat_sync("mistral:7b", [{"role": "user", "content": "hi"}])
+        self.assertEqual(len(self.requests), 2)
+
+    def test_blocking_calls_share_one_pool(self):
+        self.responses = [
+            httpx.Response(200, json={"message": {"content": "a"}}),
+            httpx.Response(200, json={"message": {"content": "b"}}),
+        ]
+        client = self._client()
+        first = client.chat_sync("m", [], options={"temperature": 0.0})
+        pool = client.sync_client
+        second = client.chat_sync("m", [])
+        self.assertIs(client.sync_client, pool)
+        self.assertEqual([first["message"]["content"], second["message"]["content"]], ["a", "b"])
+        self.assertIn(b'"options":{"temperature":0.0}', self.requests[0].content.replace(b" ", b""))
+
+    def test_retry_after_is_honoured(self):
+        client = self._client(retry_max_backoff=5)
+        delay = client._retry_delay(0, response=httpx.Response(429, headers={"Retry-After": "3"}))
+        self.assertEqual(delay, 3.0)
+        self.assertIsNone(client._retry_delay(0, response=httpx.Response(500)))
+
+    def _stream(self, client):
+        async def run():
+            try:
+                return [chunk async for chunk in client.stream_chat("m", [{"role": "user", "content": "hi"}])]
+            finally:
+                await client.aclose()
+        return asyncio.run(run())
+
+    def test_stream_chat_yields_chunks(self):
+        lines = [
+            b'{"message": {"content": "Hel"}, "done": false}',
+            b'{"message": {"content": "lo"}, "done": false}',
+            b'{"message": {"content": ""}, "done": true, "eval_count": 2}',
+        ]
+        self.responses = [httpx.Response(503), httpx.Response(200, content=b"\n".join(lines) + b"\n")]
+        chunks = self._stream(self._client(max_retries=1))
+        self.assertEqual([c["message"]["content"] for c in chunks], ["Hel", "lo", ""])
+        self.assertTrue(chunks[-1]["done"])
+        self.assertIn(b'"stream":true', self.requests[-1].content.replace(b" ", b""))
+
+        endpoints = latency_registry.snapshot()["endpoints"]["/api/chat"]
+        self.assertEqual(endpoints["ollama_ttft"]["count"], 1)
+        self.assertEqual(endpoints["ollama_request"]["count"], 1)
+
+    def test_stream_chat_error_chunk_raises(self):
+        self.responses = [httpx.Response(200, content=b'{"message": {"content": "a"}}\n{"error": "out of memory"}\n')]
+        with self.assertRaises(OllamaStreamError):
+            self._stream(self._client())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from core.parallel import get_timeout_pool, map_ordered, shutdown_process_pool
+
+
+def _worker_context(_):
+    return os.getpid(), threading.current_thread() is threading.main_thread()
+
+
+class TestMapOrdered(unittest.TestCase):
+    def test_results_in_order_with_bounded_read_ahead(self):
+        drawn = []
+
+        def items():
+            for i in range(20):
+                drawn.append(i)
+                yield i
+
+        def slow_square(x):
+            time.sleep(0.001 * (x % 3))
+            return x * x
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = map_ordered(slow_square, items(), pool=pool, window=3)
+            self.assertEqual(next(results), 0)
+            self.assertLessEqual(len(drawn), 3)
+            self.assertEqual(list(results), [x * x for x in range(1, 20)])
+
+    def test_early_close_cancels_pending_work(self):
+        started = []
+
+        def record(x):
+            started.append(x)
+            time.sleep(0.01)
+            return x
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            results = map_ordered(record, range(100), pool=pool, window=5)
+            self.assertEqual(next(results), 0)
+            results.close()
+        self.assertLess(len(started), 10)
+
+
+class TestTimeoutPool(unittest.TestCase):
+    def tearDown(self):
+        shutdown_process_pool()
+
+    def test_runs_on_the_main_thread_of_another_process(self):
+        pid, on_main_thread = next(map_ordered(_worker_context, [None], pool=get_timeout_pool(), window=1))
+        self.assertNotEqual(pid, os.getpid())
+        self.assertTrue(on_main_thread)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+from core.retrieval import neighbor_chunk_indexes, merge_contiguous_chunks
+
+
+def _chunk(index, text, start):
+    return {"chunk_index": index, "content": text, "start_char": start, "end_char": start + len(text), "filename": "doc.txt"}
+
+
+class TestNeighborExpansion(unittest.TestCase):
+    def test_neighbor_indexes_are_clamped_and_deduplicated(self):
+        self.assertEqual(neighbor_chunk_indexes([0, 2, 9], 1), [0, 1, 2, 3, 8, 9, 10])
+
+    def test_contiguous_chunks_are_merged_without_repeating_overlap(self):
+        text = "alpha beta gamma delta epsilon"
+        rows = [
+            _chunk(0, text[0:16], 0),   # "alpha beta gamma"
+            _chunk(1, text[11:22], 11),  # "gamma delta" (overlaps "gamma")
+            _chunk(5, "far away", 100),
+        ]
+        merged = merge_contiguous_chunks(rows, hit_indexes=[5, 1])
+
+        self.assertEqual(len(merged), 2)
+        # The span holding the best hit comes first
+        self.assertEqual(merged[0]["chunk_index_start"], 5)
+        self.assertEqual(merged[1]["content"], "alpha beta gamma delta")
+        self.assertEqual((merged[1]["start_char"], merged[1]["end_char"]), (0, 22))
+        self.assertEqual(merged[1]["filename"], "doc.txt")
+
+
+if __name__ == "__main__":
+    unittest.main()
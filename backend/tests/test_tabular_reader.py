@@ -0,0 +1,98 @@
+import json
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from core.tabular_reader import TabularReader
+
+
+class TestTabularReader(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.reader = TabularReader()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def test_parquet_batches_project_columns(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        path = self._path("rows.parquet")
+        table = pa.table({"id": list(range(25)), "name": [f"n{i}" for i in range(25)], "blob": ["x" * 10] * 25})
+        pq.write_table(table, path, row_group_size=10)
+
+        self.assertEqual(self.reader.read_columns(path), ["id", "name", "blob"])
+        self.assertEqual(self.reader.count_rows(path), 25)
+        batches = list(self.reader.iter_batches(path, columns=["id", "name"], batch_size=10))
+        self.assertEqual([len(b) for b in batches], [10, 10, 5])
+        self.assertEqual(batches[0].columns.tolist(), ["id", "name"])
+        self.assertEqual(batches[-1]["id"].tolist(), [20, 21, 22, 23, 24])
+
+    def test_jsonl_records_are_batched_and_nested_values_kept_as_json(self):
+        path = self._path("rows.jsonl")
+        with open(path, "w") as f:
+            f.write(json.dumps({"a": 1, "tags": ["x", "y"]}) + "\n\n")
+            f.write(json.dumps({"a": 2, "b": {"k": "v"}}) + "\n")
+            f.write(json.dumps({"a": 3}) + "\n")
+
+        self.assertEqual(self.reader.read_columns(path), ["a", "tags", "b"])
+        self.assertEqual(self.reader.count_rows(path), 3)
+        batches = list(self.reader.iter_batches(path, batch_size=2))
+        self.assertEqual([len(b) for b in batches], [2, 1])
+        self.assertEqual(batches[0].loc[0, "tags"], '["x", "y"]')
+        self.assertEqual(batches[0].loc[1, "b"], '{"k": "v"}')
+
+    def test_invalid_jsonl_line_is_reported(self):
+        path = self._path("bad.jsonl")
+        with open(path, "w") as f:
+            f.write('{"a": 1}\n{broken\n')
+        with self.assertRaisesRegex(ValueError, "line 2"):
+            self.reader.count_rows(path)
+
+    def test_csv_preview_reads_only_requested_rows(self):
+        path = self._path("rows.csv")
+        pd.DataFrame({"x": range(100)}).to_csv(path, index=False)
+        self.assertEqual(len(self.reader.preview(path, nrows=5)), 5)
+        self.assertEqual(self.reader.count_rows(path), 100)
+
+
+    def test_csv_is_read_through_its_parquet_copy(self):
+        path = self._path("rows.csv")
+        pd.DataFrame({"id": range(250), "city": ["Oslo", "Lima"] * 125}).to_csv(path, index=False)
+
+        columnar = self.reader.convert_to_parquet(path, row_group_rows=100)
+        self.assertEqual(columnar, path + ".parquet")
+        self.assertEqual(self.reader._parquet_file(columnar).metadata.num_row_groups, 3)
+        self.assertEqual(self.reader.count_rows(path), 250)
+
+        self.assertEqual(self.reader._resolve(path), (columnar, "parquet"))
+        batches = list(self.reader.iter_batches(path, columns=["id"], filters=[("id", ">=", 240)]))
+        self.assertEqual(pd.concat(batches)["id"].tolist(), list(range(240, 250)))
+        self.assertEqual(batches[0].columns.tolist(), ["id"])
+
+    def test_filters_apply_to_unconverted_files(self):
+        path = self._path("rows.csv")
+        pd.DataFrame({"id": range(30), "city": ["Oslo", "Lima", "Rome"] * 10}).to_csv(path, index=False)
+        batches = list(self.reader.iter_batches(path, columns=["id"], batch_size=10, filters=[("city", "in", ["Rome"])]))
+        self.assertEqual(pd.concat(batches)["id"].tolist(), list(range(2, 30, 3)))
+        self.assertEqual(batches[0].columns.tolist(), ["id"])
+
+    def test_conversion_is_skipped_when_types_drift(self):
+        path = self._path("rows.jsonl")
+        with open(path, "w") as f:
+            f.write(json.dumps({"a": 1}) + "\n" + json.dumps({"a": 2}) + "\n")
+            f.write(json.dumps({"a": "three"}) + "\n")
+
+        self.assertIsNone(self.reader.convert_to_parquet(path, row_group_rows=2))
+        self.assertFalse(os.path.exists(path + ".parquet"))
+        self.assertEqual(self.reader.count_rows(path), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,256 @@
+import os
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from core.text_chunking import TextChunker, ChunkingMethod, Chunk, get_text_chunker, _SEMANTIC_BOUNDARY, _load_punkt_tokenizer, _section_spans
+from core.sentence_embeddings import adjacent_window_similarity, semantic_breakpoints
+from core.tokenization import ModelTokenizer, get_tokenizer, model_spec, tokenization_cache, tokenizer_path
+
+
+WORDS_TEXT = " ".join(f"word{i}" for i in range(60))
+
+# Output of the previous (string-concatenating) recursive chunker for WORDS_TEXT
+# with chunk_size=50, chunk_overlap=0
+LEGACY_WORDS_CHUNKS = [
+    ("word0 word1 word2 word3 word4 word5 word6 word7", 0, 47),
+    ("word8 word9 word10 word11 word12 word13 word14", 48, 94),
+    ("word15 word16 word17 word18 word19 word20 word21", 95, 143),
+    ("word22 word23 word24 word25 word26 word27 word28", 144, 192),
+    ("word29 word30 word31 word32 word33 word34 word35", 193, 241),
+    ("word36 word37 word38 word39 word40 word41 word42", 242, 290),
+    ("word43 word44 word45 word46 word47 word48 word49", 291, 339),
+    ("word50 word51 word52 word53 word54 word55 word56", 340, 388),
+    ("word57 word58 word59", 389, 409),
+]
+
+# Legacy contents with chunk_size=50, chunk_overlap=12 (its offsets drifted)
+LEGACY_WORDS_OVERLAP_CONTENTS = [
+    "word0 word1 word2 word3 word4 word5 word6 word7",
+    "word6 word7 word8 word9 word10 word11 word12",
+    "word12 word13 word14 word15 word16 word17 word18",
+    "word18 word19 word20 word21 word22 word23 word24",
+    "word24 word25 word26 word27 word28 word29 word30",
+    "word30 word31 word32 word33 word34 word35 word36",
+    "word36 word37 word38 word39 word40 word41 word42",
+    "word42 word43 word44 word45 word46 word47 word48",
+    "word48 word49 word50 word51 word52 word53 word54",
+    "word54 word55 word56 word57 word58 word59",
+]
+
+DOCUMENT_TEXT = (
+    "First paragraph line one.\nLine two here.\n\n"
+    "Second paragraph is here and it is a bit longer than the others. Another sentence follows here.\n\n"
+    "Third."
+)
+
+
+class TestRecursiveChunker(unittest.TestCase):
+    def setUp(self):
+        self.chunker = TextChunker()
+
+    def _chunk(self, text, **config):
+        return self.chunker.chunk(text, method=ChunkingMethod.RECURSIVE, config=config)
+
+    def assert_offset_accurate(self, text, chunks, chunk_size):
+        self.assertEqual([c.index for c in chunks], list(range(len(chunks))))
+        for chunk in chunks:
+            self.assertIsInstance(chunk, Chunk)
+            self.assertEqual(chunk.metadata, {"method": "recursive"})
+            self.assertEqual(text[chunk.start_char:chunk.end_char], chunk.content)
+            self.assertLessEqual(len(chunk.content), chunk_size)
+
+    def test_parity_with_legacy_output(self):
+        chunks = self._chunk(WORDS_TEXT, chunk_size=50, chunk_overlap=0)
+        self.assertEqual([(c.content, c.start_char, c.end_char) for c in chunks], LEGACY_WORDS_CHUNKS)
+
+        chunks = self._chunk(WORDS_TEXT, chunk_size=50, chunk_overlap=12)
+        self.assertEqual([c.content for c in chunks], LEGACY_WORDS_OVERLAP_CONTENTS)
+        self.assert_offset_accurate(WORDS_TEXT, chunks, 50)
+
+    def test_offsets_are_exact_with_mixed_separators(self):
+        for overlap in (0, 12):
+            chunks = self._chunk(DOCUMENT_TEXT, chunk_size=50, chunk_overlap=overlap)
+            self.assert_offset_accurate(DOCUMENT_TEXT, chunks, 50)
+            self.assertEqual(chunks[0].start_char, 0)
+            self.assertEqual(chunks[-1].end_char, len(DOCUMENT_TEXT))
+
+    def test_unbroken_text_is_cut_into_windows(self):
+        text = "x" * 130
+        chunks = self._chunk(text, chunk_size=50, chunk_overlap=10)
+        self.assertEqual([(c.start_char, c.end_char) for c in chunks], [(0, 50), (50, 100), (100, 130)])
+
+
+class TestChunkStream(unittest.TestCase):
+    def setUp(self):
+        self.chunker = TextChunker(sentence_embedder=topic_embedder)
+        self.text = "\n\n".join(
+            f"Section {n}. " + " ".join(f"Sentence {n}.{i} has words." for i in range(12))
+            for n in range(40)
+        )
+
+    def test_stream_matches_whole_document_chunking(self):
+        segments = [self.text[i:i + 700] for i in range(0, len(self.text), 700)]
+        for method in ChunkingMethod:
+            expected = self.chunker.chunk(self.text, method=method)
+            streamed = list(self.chunker.chunk_stream(segments, method=method, window_chars=4000))
+            self.assertEqual(
+                [(c.index, c.content, c.start_char, c.end_char) for c in streamed],
+                [(c.index, c.content, c.start_char, c.end_char) for c in expected],
+                method.value
+            )
+
+    def test_small_input_is_flushed_at_the_end(self):
+        chunks = list(self.chunker.chunk_stream(["short ", "text"]))
+        self.assertEqual([(c.content, c.start_char, c.end_char) for c in chunks], [("short text", 0, 10)])
+
+
+class TestTokenChunker(unittest.TestCase):
+    def setUp(self):
+        self.chunker = TextChunker()
+        self.tokenizer = ModelTokenizer("regex", "regex", context_tokens=40)
+
+    def test_model_spec_ignores_tag(self):
+        self.assertEqual(model_spec("bge-m3:567m").context_tokens, 8192)
+        self.assertEqual(model_spec("unknown-model"), model_spec(None))
+
+    def test_missing_tokenizer_file_falls_back_to_regex(self):
+        if os.path.exists(tokenizer_path(model_spec("all-minilm").tokenizer)):
+            self.skipTest("tokenizer file is present")
+        tokenizer = get_tokenizer("all-minilm")
+        self.assertEqual(tokenizer.backend, "regex")
+        self.assertEqual(tokenizer.count("日本語"), 3)
+
+    def test_chunks_respect_token_budget_and_offsets(self):
+        chunks = self.chunker.chunk(DOCUMENT_TEXT, method=ChunkingMethod.TOKEN,
+                                    config={"max_tokens": 20, "overlap_tokens": 4, "embedding_model": "all-minilm"})
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertEqual(DOCUMENT_TEXT[chunk.start_char:chunk.end_char], chunk.content)
+            self.assertLessEqual(chunk.metadata["token_count"], 20)
+            self.assertFalse(chunk.content[0].isspace() or chunk.content[-1].isspace())
+        self.assertEqual(chunks[-1].end_char, len(DOCUMENT_TEXT.rstrip()))
+
+    def test_tokenization_is_cached_per_document(self):
+        tokenization_cache.clear()
+        first = tokenization_cache.token_spans(self.tokenizer, WORDS_TEXT)
+        self.assertIs(tokenization_cache.token_spans(self.tokenizer, WORDS_TEXT), first)
+        self.assertIsNot(tokenization_cache.token_spans(self.tokenizer, WORDS_TEXT + "!"), first)
+
+
+class TestSentenceSegmentation(unittest.TestCase):
+    def test_chunker_is_shared(self):
+        self.assertIs(get_text_chunker(), get_text_chunker())
+
+    def test_vendored_punkt_keeps_abbreviations(self):
+        text = "Dr. Smith met Mr. Jones at 5 p.m. yesterday. They talked about U.S. policy.  Done!"
+        spans = get_text_chunker()._sentence_spans(text)
+        self.assertEqual([text[a:b] for a, b in spans], [
+            "Dr. Smith met Mr. Jones at 5 p.m. yesterday.",
+            "They talked about U.S. policy.",
+            "Done!",
+        ])
+
+    def test_vendored_punkt_matches_nltk_model(self):
+        tokenizer = _load_punkt_tokenizer()
+        self.assertGreater(len(tokenizer._params.ortho_context), 10000)
+        try:
+            from nltk.tokenize import sent_tokenize
+            text = DOCUMENT_TEXT + " The U.S. Fed met on Jan. 5 at 10 a.m. in Washington. Prices rose 2.5%."
+            expected = sent_tokenize(text, language="english")
+        except LookupError:
+            self.skipTest("nltk punkt data is not installed")
+        self.assertEqual([text[a:b] for a, b in tokenizer.span_tokenize(text)], expected)
+
+    def test_semantic_boundaries(self):
+        for sentence in ["However, it changed.", "in short it works", "12. Item", "- bullet", "• dot"]:
+            self.assertIsNotNone(_SEMANTIC_BOUNDARY.match(sentence), sentence)
+        for sentence in ["The however case.", "Item 12.", "Thesis"]:
+            self.assertIsNone(_SEMANTIC_BOUNDARY.match(sentence), sentence)
+
+
+class TestParallelChunking(unittest.TestCase):
+    def test_sections_cut_at_paragraph_breaks(self):
+        text = "\n\n".join("para %d " % i + "x" * 30 for i in range(20))
+        spans = _section_spans(text, 100)
+        self.assertEqual(spans[0][0], 0)
+        self.assertEqual(spans[-1][1], len(text))
+        for (_, end), (start, _) in zip(spans, spans[1:]):
+            self.assertEqual(end, start)
+            self.assertTrue(text[:end].endswith("\n\n"))
+
+    def test_sections_reassemble_with_global_offsets(self):
+        chunker = get_text_chunker()
+        text = DOCUMENT_TEXT * 40
+        config = dict(TextChunker.DEFAULT_CONFIGS[ChunkingMethod.RECURSIVE], chunk_size=80, chunk_overlap=10)
+        with mock.patch("core.text_chunking.PARALLEL_CHUNKING_MIN_CHARS", 400):
+            chunks = chunker._chunk_parallel(text, ChunkingMethod.RECURSIVE, config)
+        self.assertEqual(chunks[-1].end_char, len(text))
+        self.assertEqual([c.index for c in chunks], list(range(len(chunks))))
+        for chunk in chunks:
+            self.assertEqual(text[chunk.start_char:chunk.end_char], chunk.content)
+
+    def test_large_streams_use_the_pool(self):
+        chunker = TextChunker()
+        text = "\n\n".join(
+            f"Section {n}. " + " ".join(f"Sentence {n}.{i} has words." for i in range(12))
+            for n in range(60)
+        )
+        segments = [text[i:i + 700] for i in range(0, len(text), 700)]
+        with mock.patch("core.text_chunking.parallel_enabled", return_value=True), \
+                mock.patch("core.text_chunking.PARALLEL_CHUNKING_MIN_CHARS", 8000), \
+                mock.patch("core.text_chunking.map_ordered", side_effect=lambda func, items: map(func, items)) as pooled:
+            chunks = list(chunker.chunk_stream(segments, window_chars=1000))
+        self.assertGreater(pooled.call_count, 1)
+        self.assertEqual([c.index for c in chunks], list(range(len(chunks))))
+        self.assertEqual(chunks[-1].end_char, len(text))
+        for previous, chunk in zip(chunks, chunks[1:]):
+            self.assertGreater(chunk.start_char, previous.start_char)
+            self.assertEqual(text[previous.end_char:chunk.start_char].strip(), "")
+        for chunk in chunks:
+            self.assertEqual(text[chunk.start_char:chunk.end_char], chunk.content)
+
+
+def topic_embedder(sentences, model):
+    """One-hot embedding per topic word, standing in for Ollama"""
+    topics = ["cats", "stocks", "rain"]
+    return np.array([[1.0 if topic in s else 0.0 for topic in topics] for s in sentences], dtype=np.float32)
+
+
+class TestEmbeddingSemanticChunker(unittest.TestCase):
+    def test_similarity_drops_at_topic_change(self):
+        embeddings = topic_embedder(["cats"] * 4 + ["stocks"] * 4, None)
+        similarity = adjacent_window_similarity(embeddings, window=2)
+        self.assertEqual(int(np.argmin(similarity)), 3)
+        self.assertEqual(semantic_breakpoints(embeddings, window=2, percentile=80), [4])
+
+    def test_chunks_follow_topics(self):
+        text = " ".join(
+            [f"The cats sleep {i}." for i in range(4)]
+            + [f"The stocks fell {i}." for i in range(4)]
+            + [f"The rain came {i}." for i in range(4)]
+        )
+        chunker = TextChunker(sentence_embedder=topic_embedder)
+        chunks = chunker.chunk(text, method=ChunkingMethod.EMBEDDING_SEMANTIC,
+                               config={"min_chunk_size": 10, "window_sentences": 2, "breakpoint_percentile": 80})
+        self.assertEqual(len(chunks), 3)
+        self.assertTrue(all("cats" in chunks[0].content.split(".")[i] for i in range(4)))
+        self.assertIn("stocks", chunks[1].content)
+        self.assertNotIn("stocks", chunks[2].content)
+        for chunk in chunks:
+            self.assertEqual(text[chunk.start_char:chunk.end_char], chunk.content)
+            self.assertEqual(chunk.metadata, {"method": "embedding_semantic"})
+
+    def test_falls_back_without_embeddings(self):
+        def unavailable(sentences, model):
+            raise ConnectionError("ollama down")
+
+        chunker = TextChunker(sentence_embedder=unavailable)
+        chunks = chunker.chunk("One sentence here. Another one there.", method=ChunkingMethod.EMBEDDING_SEMANTIC,
+                               config={"embedding_model": "offline-test"})
+        self.assertEqual(chunks[0].metadata["method"], "semantic")
+
+
+if __name__ == "__main__":
+    unittest.main()
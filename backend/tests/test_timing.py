@@ -0,0 +1,46 @@
+import unittest
+
+from core.timing import RequestTimer, LatencyHistogram, LatencyRegistry, ollama_ttft_ms
+
+
+class TestRequestTimer(unittest.TestCase):
+    def test_spans_accumulate_and_render_server_timing(self):
+        timer = RequestTimer()
+        timer.record("db_connect", 2.0)
+        timer.record("db_connect", 3.0)
+        with timer.span("vector_search"):
+            pass
+        timer.finish()
+
+        self.assertEqual(timer.spans["db_connect"], 5.0)
+        header = timer.server_timing_header()
+        self.assertTrue(header.startswith("db_connect;dur=5.0, vector_search;dur="))
+        self.assertIn("total;dur=", header)
+
+    def test_ollama_ttft_from_durations(self):
+        self.assertEqual(ollama_ttft_ms({"load_duration": 2_000_000, "prompt_eval_duration": 3_000_000}), 5.0)
+        self.assertIsNone(ollama_ttft_ms({"message": {"content": "hi"}}))
+
+
+class TestLatencyRegistry(unittest.TestCase):
+    def test_histogram_percentiles(self):
+        hist = LatencyHistogram(buckets=[10, 100])
+        for value in [1, 2, 50, 500]:
+            hist.observe(value)
+        self.assertEqual(hist.counts, [2, 1, 1])
+        self.assertEqual(hist.percentile(50), 10.0)
+        self.assertEqual(hist.percentile(99), 500)
+
+    def test_observe_per_collection_and_model(self):
+        registry = LatencyRegistry()
+        timer = RequestTimer()
+        timer.record("query_embedding", 12.0)
+        registry.observe(timer, collection_id=7, model="mistral:7b")
+
+        snapshot = registry.snapshot()
+        self.assertEqual(snapshot["collections"]["7"]["query_embedding"]["count"], 1)
+        self.assertEqual(snapshot["models"]["mistral:7b"]["query_embedding"]["avg_ms"], 12.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
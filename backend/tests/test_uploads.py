@@ -0,0 +1,106 @@
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+
+from fastapi import UploadFile
+
+from core.uploads import (
+    ChecksumMismatch,
+    UploadSessionError,
+    UploadSessionStore,
+    UploadTooLarge,
+    parse_content_range,
+    save_upload,
+)
+
+
+class TestSaveUpload(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "nested", "upload.bin")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _save(self, data, **kwargs):
+        upload = UploadFile(file=io.BytesIO(data), filename="upload.bin")
+        return asyncio.run(save_upload(upload, self.path, **kwargs))
+
+    def test_streams_blocks_and_hashes_on_the_way(self):
+        data = os.urandom(10_000)
+        stored = self._save(data, max_bytes=len(data), chunk_size=1024)
+
+        self.assertEqual(stored.size, len(data))
+        self.assertEqual(stored.sha256, hashlib.sha256(data).hexdigest())
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), data)
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["upload.bin"])
+
+    def test_oversized_upload_is_rejected_without_leaving_files(self):
+        with self.assertRaises(UploadTooLarge):
+            self._save(b"x" * 5000, max_bytes=4096, chunk_size=1024)
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), [])
+
+
+async def _blocks(data, size=1000):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+class TestUploadSessions(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = UploadSessionStore(self.tmp.name, os.path.join(self.tmp.name, ".sessions"))
+        self.data = os.urandom(5000)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _put(self, upload_id, start, end, sha256=None, body=None):
+        body = self.data[start:end] if body is None else body
+        return asyncio.run(self.store.write_part(upload_id, start, end, _blocks(body), sha256=sha256))
+
+    def test_parts_in_any_order_are_assembled_in_place(self):
+        session = self.store.create("data.csv", len(self.data), owner_id="u1",
+                                    sha256=hashlib.sha256(self.data).hexdigest())
+        self._put(session.upload_id, 3000, 5000)
+        resumed = self.store.get(session.upload_id)
+        self.assertEqual(resumed.missing_ranges(), [[0, 3000]])
+
+        part = self.data[0:3000]
+        self._put(session.upload_id, 0, 3000, sha256=hashlib.sha256(part).hexdigest())
+        finalized, stored = self.store.finalize(session.upload_id)
+
+        self.assertEqual(stored.path, session.file_path)
+        self.assertEqual(stored.sha256, hashlib.sha256(self.data).hexdigest())
+        with open(stored.path, "rb") as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertEqual(self.store.list_sessions(), [])
+        self.assertFalse(os.path.exists(session.part_path))
+
+    def test_bad_parts_are_not_recorded(self):
+        session = self.store.create("doc.pdf", len(self.data))
+        with self.assertRaises(ChecksumMismatch):
+            self._put(session.upload_id, 0, 1000, sha256="0" * 64)
+        with self.assertRaises(UploadSessionError):
+            self._put(session.upload_id, 0, 1000, body=self.data[:999])
+        with self.assertRaises(UploadSessionError):
+            self._put(session.upload_id, 4000, 6000)
+        self.assertEqual(self.store.get(session.upload_id).received, [])
+        with self.assertRaises(UploadSessionError):
+            self.store.finalize(session.upload_id)
+
+    def test_content_range_and_size_limit(self):
+        self.assertEqual(parse_content_range("bytes 0-999/5000"), (0, 1000, 5000))
+        self.assertEqual(parse_content_range("bytes 10-19/*"), (10, 20, None))
+        with self.assertRaises(UploadSessionError):
+            parse_content_range("0-999")
+        with self.assertRaises(UploadTooLarge):
+            self.store.create("big.csv", 10_000, max_bytes=4096)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -564,7 +564,7 @@ const DataCollections = () => {
             width: 200,
             render: (_, record) => {
                 const status = record.embeddings_status || 'pending';
-                const isProcessing = status === 'processing' || status === 'pending';
+                const isProcessing = status === 'processing' || status === 'pending' || status === 'pending_analysis';
 
                 return (
                     <Space>
@@ -578,7 +578,7 @@ const DataCollections = () => {
                                     status === 'failed' ? <CloseCircleOutlined /> : <ClockCircleOutlined />
                             }
                         >
-                            {status.charAt(0).toUpperCase() + status.slice(1)}
+                            {status.charAt(0).toUpperCase() + status.slice(1).replace('_', ' ')}
                         </Tag>
                         {isProcessing && (
                             <Button
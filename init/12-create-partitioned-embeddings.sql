@@ -0,0 +1,29 @@
+-- Single embeddings store, list-partitioned by collection_id
+-- Replaces the one-table-per-collection layout (embeddings_collection_{id})
+-- when EMBEDDINGS_STORAGE_LAYOUT=partitioned. Partitions are created by the
+-- backend on first ingestion: collection_embeddings_p{collection_id}
+
+CREATE TABLE IF NOT EXISTS collection_embeddings (
+    id BIGSERIAL,
+    collection_id INTEGER NOT NULL,
+    chunk_index INTEGER,
+    content TEXT,
+    start_char INTEGER,
+    end_char INTEGER,
+    chunking_method TEXT,
+    filename TEXT,
+    file_type TEXT,
+    source JSONB,
+    metadata JSONB,
+    embedding VECTOR(768),
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (collection_id, id)
+) PARTITION BY LIST (collection_id);
+
+-- Propagated to every partition; used for ordered chunk lookups
+CREATE INDEX IF NOT EXISTS idx_collection_embeddings_chunk_index
+ON collection_embeddings (collection_id, chunk_index);
+
+COMMENT ON TABLE collection_embeddings IS 'Embeddings for all data collections, one LIST partition per collection';
+COMMENT ON COLUMN collection_embeddings.source IS 'Original source columns of tabular rows';
+COMMENT ON COLUMN collection_embeddings.metadata IS 'Chunk metadata for document collections';
@@ -0,0 +1,34 @@
+-- Near-duplicate chunk elimination
+-- Chunks repeating an earlier chunk of the same collection (PDF headers,
+-- footers, disclaimers, repeated rows) are stored without a vector and point
+-- at the embedded original through duplicate_of. Per-collection tables
+-- (embeddings_collection_{id}) get the column when they are next ingested.
+
+ALTER TABLE collection_embeddings ADD COLUMN IF NOT EXISTS duplicate_of BIGINT;
+
+COMMENT ON COLUMN collection_embeddings.duplicate_of IS 'Id of the chunk whose vector this near-duplicate chunk shares; embedding is NULL';
+
+-- Fingerprints of embedded chunks, used when DEDUP_SCOPE=global to reuse
+-- vectors across collections that share an embedding model
+CREATE TABLE IF NOT EXISTS chunk_fingerprints (
+    collection_id INTEGER NOT NULL,
+    row_id BIGINT NOT NULL,
+    table_name TEXT NOT NULL,
+    embedding_model TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    simhash BIGINT,
+    band0 INTEGER,
+    band1 INTEGER,
+    band2 INTEGER,
+    band3 INTEGER,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (collection_id, row_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_chunk_fingerprints_hash ON chunk_fingerprints (embedding_model, content_hash);
+CREATE INDEX IF NOT EXISTS idx_chunk_fingerprints_band0 ON chunk_fingerprints (embedding_model, band0);
+CREATE INDEX IF NOT EXISTS idx_chunk_fingerprints_band1 ON chunk_fingerprints (embedding_model, band1);
+CREATE INDEX IF NOT EXISTS idx_chunk_fingerprints_band2 ON chunk_fingerprints (embedding_model, band2);
+CREATE INDEX IF NOT EXISTS idx_chunk_fingerprints_band3 ON chunk_fingerprints (embedding_model, band3);
+
+COMMENT ON TABLE chunk_fingerprints IS 'Content hash and SimHash bands of embedded chunks for cross-collection deduplication';
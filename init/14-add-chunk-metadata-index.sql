@@ -0,0 +1,11 @@
+-- Structure-aware chunk metadata
+-- Document chunks carry their page range, heading path, section, table ids
+-- and element types in metadata. A jsonb_path_ops GIN index makes the
+-- containment filters used by retrieval (metadata @> '{"section": "..."}')
+-- cheap. Per-collection tables (embeddings_collection_{id}) get the index
+-- when they are next ingested.
+
+CREATE INDEX IF NOT EXISTS idx_collection_embeddings_metadata
+ON collection_embeddings USING GIN (metadata jsonb_path_ops);
+
+COMMENT ON COLUMN collection_embeddings.metadata IS 'Chunk structure: page_start, page_end, heading_path, section, table_ids, element_types';
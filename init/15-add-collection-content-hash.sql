@@ -0,0 +1,13 @@
+-- Add content_hash column to data_collections table
+-- SHA-256 of the uploaded file, computed while the upload is streamed to
+-- disk. A new upload whose bytes, file type, embedding model and chunking
+-- config match a completed collection reuses that collection's embeddings
+-- (embeddings_metadata.source_collection_id) instead of re-ingesting.
+ALTER TABLE data_collections 
+ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+
+-- Create index for faster lookups
+CREATE INDEX IF NOT EXISTS idx_data_collections_content_hash 
+ON data_collections(content_hash);
+
+COMMENT ON COLUMN data_collections.content_hash IS 'SHA-256 (hex) of the uploaded file';
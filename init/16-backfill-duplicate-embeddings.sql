@@ -0,0 +1,15 @@
+-- Deduplicated chunks used to be stored with a NULL embedding, which vector
+-- search skips. They now copy the vector of the chunk they duplicate; fill
+-- it in for rows stored before that. Per-collection tables
+-- (embeddings_collection_{id}) are filled in when they are next ingested.
+
+UPDATE collection_embeddings d
+SET embedding = c.embedding
+FROM collection_embeddings c
+WHERE d.embedding IS NULL
+  AND d.duplicate_of IS NOT NULL
+  AND c.collection_id = d.collection_id
+  AND c.id = d.duplicate_of
+  AND c.embedding IS NOT NULL;
+
+COMMENT ON COLUMN collection_embeddings.duplicate_of IS 'Id of the chunk this duplicate chunk copied its vector from instead of being embedded';